@@ -0,0 +1,154 @@
+"""
+Check of the Accept-Encoding header the retailer sessions actually send.
+
+Starts a local aiohttp server that records the Accept-Encoding header of
+every request and answers with the page compressed in the encoding given in
+the query string. Each retailer's default headers are sent through a
+`RetailerSession`, and the Continente headers once more as per-request
+headers. The header received must be the retailer's value trimmed to
+`http_engine.SUPPORTED_ENCODINGS`, and a page compressed with each
+advertised encoding must decode to the original. zstd is only advertised
+when aiohttp can decode it (`backports.zstd` before Python 3.14); with
+`--require-zstd` its absence is a failure too.
+
+Usage:
+    python benchmarks/bench_accept_encoding.py [--require-zstd]
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import threading
+import zlib
+
+from aiohttp import web
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from auchan.auchan import AUCHAN_HEADERS  # noqa: E402
+from continente.catalog import CONTINENTE_HEADERS  # noqa: E402
+from http_engine import (  # noqa: E402
+    SUPPORTED_ENCODINGS, FetchEngine, supported_accept_encoding)
+
+PAGE = b"<html><body>" + b"<div class='product-tile'></div>" * 50 + \
+    b"</body></html>"
+
+
+def compressors():
+    """Content encoding -> compress function, for the codecs installed."""
+    codecs = {"gzip": gzip.compress, "deflate": zlib.compress}
+    try:
+        import brotli
+        codecs["br"] = brotli.compress
+    except ImportError:
+        pass
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            from backports import zstd
+        except ImportError:
+            zstd = None
+    if zstd is not None:
+        codecs["zstd"] = zstd.compress
+    return codecs
+
+
+def start_recording_server(received, host="127.0.0.1"):
+    """
+    Runs a server in a background thread that appends the Accept-Encoding
+    header of every request to `received`.
+
+    Returns:
+        tuple: (base_url, stop) where `stop()` shuts the server down.
+    """
+    loop = asyncio.new_event_loop()
+    codecs = compressors()
+    state = {}
+
+    async def handle(request):
+        received.append(request.headers.get("Accept-Encoding"))
+        encoding = request.query.get("encoding")
+        if encoding is None:
+            return web.Response(body=PAGE, content_type="text/html")
+        return web.Response(body=codecs[encoding](PAGE),
+                            content_type="text/html",
+                            headers={"Content-Encoding": encoding})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(),
+                                         loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://{host}:{state['port']}", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--require-zstd", action="store_true",
+                        help="fail if zstd is not advertised")
+    args = parser.parse_args()
+
+    print(f"decodable encodings: {', '.join(SUPPORTED_ENCODINGS)}")
+    failures = []
+    received = []
+    base_url, stop = start_recording_server(received)
+    engine = FetchEngine()
+    try:
+        cases = [("continente", CONTINENTE_HEADERS, None),
+                 ("auchan", AUCHAN_HEADERS, None),
+                 ("per-request", None, CONTINENTE_HEADERS)]
+        for name, session_headers, request_headers in cases:
+            session = engine.session(name, headers=session_headers)
+            value = (session_headers or request_headers)["Accept-Encoding"]
+            expected = supported_accept_encoding(value)
+            del received[:]
+            session.get(f"{base_url}/page", headers=request_headers)
+            print(f"{name:12s} configured {value!r}, sent {received[0]!r}")
+            if received[0] != expected:
+                failures.append(f"{name} sent {received[0]!r}, expected "
+                                f"{expected!r}")
+
+            advertised = [enc.split(";")[0].strip()
+                          for enc in received[0].split(",")]
+            for encoding in advertised:
+                response = session.get(f"{base_url}/page",
+                                       params={"encoding": encoding},
+                                       headers=request_headers)
+                if response.body != PAGE:
+                    failures.append(f"{name}: a {encoding} body did not "
+                                    f"decode to the page")
+            if args.require_zstd and "zstd" in value \
+                    and "zstd" not in advertised:
+                failures.append(f"{name} does not advertise zstd")
+    finally:
+        engine.close()
+        stop()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: only decodable encodings are advertised, and they decode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Cost of assembling a category from its pages as the page count grows.
+
+The Auchan grid fixture is parsed once into a column batch and appended
+`n` times (n = 8, 16, ... `--max-pages`), comparing:
+
+- "concat": the previous pattern of concatenating every page onto the
+  accumulated frame (`all_data = pd.concat([all_data, page])`), which
+  copies the whole category on every page;
+- "buffer": `pipeline.ColumnBuffer`, appending each page's columns and
+  building the DataFrame once.
+
+Reports total time, time per page and the peak RSS growth of the build
+(each measurement runs in a fresh subprocess, so Arrow string buffers and
+NumPy arrays are counted). The buffer's time and memory per page should
+stay flat; the script exits with a non-zero status if the frames differ.
+
+Usage:
+    python benchmarks/bench_column_buffer.py [--max-pages 256]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from auchan.auchan import PRODUCT_SCHEMA, parse_product_columns  # noqa: E402
+from auchan.auchan import products_to_frame  # noqa: E402
+from pipeline import ColumnBuffer  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+
+
+def build_concat(batch, pages):
+    all_data = pd.DataFrame()
+    for _ in range(pages):
+        all_data = pd.concat([all_data, products_to_frame(batch)],
+                             ignore_index=True)
+    return all_data
+
+
+def build_buffer(batch, pages):
+    products = ColumnBuffer(PRODUCT_SCHEMA, PRODUCT_SCHEMA)
+    for _ in range(pages):
+        products.extend(batch)
+    return products.to_frame()
+
+
+BUILDERS = {"concat": build_concat, "buffer": build_buffer}
+
+
+def load_batch():
+    with open(os.path.join(FIXTURES_DIR, "auchan_grid.html"), "rb") as f:
+        return parse_product_columns(f.read(), encoding="utf-8")
+
+
+def measure(mode, pages):
+    """Runs in the child process; prints a JSON result line."""
+    batch = load_batch()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    frame = BUILDERS[mode](batch, pages)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"rows": len(frame), "seconds": elapsed,
+                      "peak_kb": rss_after - rss_before}))
+
+
+def run_child(mode, pages):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, str(pages)],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-pages", type=int, default=256)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PAGES"))
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'pages':>5} {'rows':>7} {'mode':<7} {'seconds':>8} "
+          f"{'ms/page':>8} {'peak MiB':>9} {'KiB/page':>9}")
+    pages = 8
+    while pages <= args.max_pages:
+        for mode in BUILDERS:
+            result = run_child(mode, pages)
+            print(f"{pages:>5} {result['rows']:>7} {mode:<7} "
+                  f"{result['seconds']:>8.3f} "
+                  f"{result['seconds'] * 1000 / pages:>8.2f} "
+                  f"{result['peak_kb'] / 1024:>9.1f} "
+                  f"{result['peak_kb'] / pages:>9.1f}")
+        pages *= 2
+
+    # Check the frames in-process last: a child inherits the peak RSS of
+    # the process that started it, which would hide the measurements
+    batch = load_batch()
+    pages = 8
+    while pages <= args.max_pages:
+        try:
+            pd.testing.assert_frame_equal(build_concat(batch, pages),
+                                          build_buffer(batch, pages))
+        except AssertionError as e:
+            print(f"FAIL: frames differ for {pages} pages: {e}")
+            sys.exit(1)
+        pages *= 2
+    print("OK: both builds produce identical frames")
+
+if __name__ == "__main__":
+    main()
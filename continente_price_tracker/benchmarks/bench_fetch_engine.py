@@ -0,0 +1,112 @@
+"""
+Stub-server harness for the shared fetch engine.
+
+Starts a local aiohttp server that answers every request after a fixed
+latency, then fetches the same batch of pages through `FetchEngine` with
+increasing per-host concurrency. Wall-clock time must drop as concurrency
+goes up; the script exits with a non-zero status if it does not.
+
+Usage:
+    python benchmarks/bench_fetch_engine.py [--requests 48] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from http_engine import FetchEngine  # noqa: E402
+
+PAGE = b"<html><body>" + b"<div class='product-tile'></div>" * 50 + \
+    b"</body></html>"
+
+
+def start_stub_server(latency, host="127.0.0.1"):
+    """
+    Runs a stub server in a background thread.
+
+    Returns:
+        tuple: (base_url, stop) where `stop()` shuts the server down.
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    async def handle(request):
+        await asyncio.sleep(latency)
+        return web.Response(body=PAGE, content_type="text/html")
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop).result()
+    started.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(),
+                                         loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://{host}:{state['port']}", stop
+
+
+def run_batch(base_url, concurrency, n_requests, rate=None):
+    engine = FetchEngine()
+    engine.configure_host("127.0.0.1", concurrency=concurrency, rate=rate,
+                          burst=concurrency)
+    requests = [{"url": f"{base_url}/Search-UpdateGrid",
+                 "params": {"start": i}} for i in range(n_requests)]
+    try:
+        started = time.perf_counter()
+        engine.get_many(requests)
+        return time.perf_counter() - started
+    finally:
+        engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--levels", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    base_url, stop = start_stub_server(args.latency)
+    try:
+        timings = []
+        print(f"{'concurrency':>11} {'wall (s)':>9} {'pages/s':>8}")
+        for level in args.levels:
+            elapsed = run_batch(base_url, level, args.requests)
+            timings.append(elapsed)
+            print(f"{level:>11} {elapsed:>9.2f} "
+                  f"{args.requests / elapsed:>8.1f}")
+    finally:
+        stop()
+
+    if any(later >= earlier for earlier, later in zip(timings, timings[1:])):
+        print("FAIL: wall-clock time did not drop with concurrency")
+        sys.exit(1)
+    print("OK: wall-clock time drops as concurrency goes up")
+
+
+if __name__ == "__main__":
+    main()
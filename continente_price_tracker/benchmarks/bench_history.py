@@ -0,0 +1,93 @@
+"""
+Size and query cost of the incremental price history.
+
+Ingests every recorded day under data/raw into a temporary history with
+`history.update_history`, then reports, per retailer, the size of the raw
+CSV snapshots versus the history, the ingest time, and the time to answer
+"what changed on the last day" and to rebuild the last day's snapshot.
+Every rebuilt day must equal that day's deduplicated snapshot; the script
+exits with a non-zero status otherwise.
+
+Usage:
+    python benchmarks/bench_history.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from history import RETAILER_HISTORIES, open_history, update_history  # noqa: E402
+from storage import read_snapshots  # noqa: E402
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+RAW_DIR = os.path.join(REPO_ROOT, "data", "raw")
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def same_snapshot(history, expected, rebuilt):
+    expected = history._normalize(expected)
+    columns = list(rebuilt.columns)
+    expected = expected[columns].sort_values(history.key, ignore_index=True)
+    rebuilt = rebuilt.sort_values(history.key, ignore_index=True)
+    try:
+        pd.testing.assert_frame_equal(expected, rebuilt, check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_history_")
+    failures = []
+    print(f"{'retailer':<11} {'days':>4} {'raw MiB':>8} {'history MiB':>11} "
+          f"{'ratio':>6} {'ingest s':>8} {'changed':>8} {'changes s':>9} "
+          f"{'rebuild s':>9}")
+    try:
+        for retailer in RETAILER_HISTORIES:
+            raw_dir = os.path.join(RAW_DIR, retailer)
+            days, ingest = timed(update_history, retailer, RAW_DIR, workdir)
+            history = open_history(retailer, workdir)
+
+            changes, changes_s = timed(history.changes, days[-1])
+            _, rebuild_s = timed(history.snapshot, days[-1])
+            raw_size = directory_size(raw_dir)
+            history_size = directory_size(history.path)
+            print(f"{retailer:<11} {len(days):>4} {raw_size / 2 ** 20:>8.1f} "
+                  f"{history_size / 2 ** 20:>11.2f} "
+                  f"{raw_size / history_size:>5.0f}x {ingest:>8.2f} "
+                  f"{len(changes):>8} {changes_s:>9.3f} {rebuild_s:>9.3f}")
+
+            for day in days:
+                expected = read_snapshots(raw_dir, days=[day])
+                if not same_snapshot(history, expected, history.snapshot(day)):
+                    failures.append((retailer, day))
+    finally:
+        shutil.rmtree(workdir)
+
+    for retailer, day in failures:
+        print(f"FAIL: rebuilt {retailer} snapshot of {day} differs")
+    if failures:
+        sys.exit(1)
+    print("OK: every day rebuilds to its original snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Parallel typed loading of the snapshot history against serial reads.
+
+Loads every snapshot under `<data-dir>/raw` (all retailers, all days) once
+with `storage.read_snapshots`, one retailer and one file after the other
+with pandas' type inference, and once with `loader.load`, and checks that
+both give the same rows per retailer and day. Each side is timed `--repeat`
+times and the median is kept; the script exits with a non-zero status if
+the rows differ or `loader.load` takes longer than `--max-seconds`.
+
+Usage:
+    python benchmarks/bench_loader.py [--data-dir DIR] [--workers 8]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+import loader  # noqa: E402
+from observations import SOURCES  # noqa: E402
+from storage import list_days, read_snapshots  # noqa: E402
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+
+def serial(raw_path):
+    frames = []
+    for retailer in SOURCES:
+        frame = read_snapshots(os.path.join(raw_path, retailer))
+        frame["source"] = retailer
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def median_seconds(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=loader.WORKERS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    raw_path = os.path.join(args.data_dir, "raw")
+    if not any(list_days(os.path.join(raw_path, retailer))
+               for retailer in SOURCES):
+        print(f"No snapshots under {raw_path}")
+        sys.exit(1)
+    serial_seconds, expected = median_seconds(lambda: serial(raw_path),
+                                              args.repeat)
+    load_seconds, result = median_seconds(
+        lambda: loader.load(base_path=raw_path, workers=args.workers),
+        args.repeat)
+    print(f"{len(result)} rows, {result['date'].nunique()} days, "
+          f"{result.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB")
+    print(f"serial       {serial_seconds:.3f}s ({len(expected) / serial_seconds:.0f} rows/s)")
+    print(f"load         {load_seconds:.3f}s ({len(result) / load_seconds:.0f} rows/s), "
+          f"{serial_seconds / load_seconds:.1f}x")
+
+    failures = []
+    expected_counts = expected.groupby(["source", "day"]).size()
+    result_counts = result.groupby(
+        [result["source"].astype(str), result["date"].dt.strftime("%Y%m%d")],
+        observed=True).size()
+    if not expected_counts.sort_index().equals(result_counts.sort_index()):
+        failures.append("rows per retailer and day differ from read_snapshots")
+    if load_seconds > args.max_seconds:
+        failures.append(f"load took {load_seconds:.3f}s, expected at most "
+                        f"{args.max_seconds:.1f}s")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: same rows as read_snapshots")
+
+
+if __name__ == "__main__":
+    main()
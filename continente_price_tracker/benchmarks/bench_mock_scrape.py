@@ -0,0 +1,130 @@
+"""
+End-to-end scrape against the local mock retailers, with no network access.
+
+Starts `mock_retailers` in-process, points the fetch engine at it with its
+host override and runs the orchestrator over `--categories` categories of
+each retailer, with the host budgets given on the command line. Reports the
+run's metrics (pages/s, latency percentiles, time slept) and the statuses
+the mock answered, so that concurrency and rate settings can be tuned and
+the backoff behaviour observed under injected latency, errors and 429s.
+Every category must be saved with all its products, in its snapshot and
+its observations; the script exits with a non-zero status otherwise.
+
+Usage:
+    python benchmarks/bench_mock_scrape.py [--concurrency 4] [--rate 4]
+        [--latency 0.05] [--error-rate 0.05] [--rate-limit 6]
+"""
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+from mock_retailers import (PINGO_DOCE_PAGE_SIZE, add_options, mock_options,
+                            start_mock_server)
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+import orchestrator  # noqa: E402
+from auchan import auchan  # noqa: E402
+from continente import catalog  # noqa: E402
+from http_engine import engine  # noqa: E402
+from metrics import metrics  # noqa: E402
+from observations import read_observations  # noqa: E402
+from pingo_doce import pingo_doce  # noqa: E402
+from storage import read_snapshot, snapshot_files  # noqa: E402
+
+
+def expected_rows(retailer, products):
+    """Rows of one category snapshot scraped from the mock."""
+    if retailer == "continente":
+        # Every grid page repeats the fixture's 36 tiles
+        return 36 * math.ceil(products / catalog.PAGE_SIZE)
+    if retailer == "pingo_doce":
+        return PINGO_DOCE_PAGE_SIZE * math.ceil(products / PINGO_DOCE_PAGE_SIZE)
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--categories", type=int, default=2,
+                        help="categories scraped per retailer")
+    parser.add_argument("--workers", type=int, default=orchestrator.WORKERS)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="requests in flight per retailer")
+    parser.add_argument("--rate", type=float, default=4.0,
+                        help="initial requests/s per retailer")
+    parser.add_argument("--max-rate", type=float, default=16.0)
+    add_options(parser)
+    args = parser.parse_args()
+
+    catalog.CATEGORIES = catalog.CATEGORIES[:args.categories]
+    pingo_doce.CATEGORIES = pingo_doce.CATEGORIES[:args.categories]
+    auchan.CGIDS = auchan.CGIDS[:args.categories]
+    for host in orchestrator.HOSTS.values():
+        engine.configure_host(host, concurrency=args.concurrency,
+                              rate=args.rate, burst=2,
+                              min_rate=min(args.rate, 0.2),
+                              max_rate=args.max_rate)
+
+    base_url, mock, stop = start_mock_server(**mock_options(args))
+    engine.set_host_override(base_url)
+    raw_path = tempfile.mkdtemp(prefix="bench_mock_scrape_")
+    metrics.reset()
+    try:
+        scheduler = orchestrator.run(raw_path=raw_path, workers=args.workers)
+        summary = metrics.as_dict()
+        rates = {host: str(engine.throttle(host))
+                 for host in orchestrator.HOSTS.values()}
+        snapshots = {retailer: [read_snapshot(path) for _, path in snapshot_files(
+                                    os.path.join(raw_path, retailer))]
+                     for retailer in orchestrator.RETAILERS}
+        observations = {retailer: len(read_observations(
+                            os.path.join(raw_path, retailer)))
+                        for retailer in orchestrator.RETAILERS}
+    finally:
+        engine.set_host_override(None)
+        engine.close()
+        stop()
+        shutil.rmtree(raw_path)
+
+    makespan = scheduler.finished - scheduler.started
+    print(f"makespan {makespan:.1f}s, {summary['counters'].get('pages', 0)} pages "
+          f"({summary['pages_per_s']} pages/s), {summary['rows_per_s']} rows/s, "
+          f"slept {summary['sleeps']}")
+    print(f"{'host':<20} {'requests':>8} {'failed':>7} {'MiB':>6} "
+          f"{'p50 s':>7} {'p95 s':>7} {'mock statuses'}")
+    for retailer, host in orchestrator.HOSTS.items():
+        stats = summary["hosts"].get(host, {})
+        print(f"{host:<20} {stats.get('requests', 0):>8} {stats.get('failed', 0):>7} "
+              f"{stats.get('bytes', 0) / 2 ** 20:>6.1f} "
+              f"{stats.get('latency_p50') or 0:>7.3f} "
+              f"{stats.get('latency_p95') or 0:>7.3f} "
+              f"{mock.stats.get(retailer, {})}")
+        print(f"{'':<20} request rate: {rates[host]}")
+
+    failures = []
+    for retailer, frames in snapshots.items():
+        if len(frames) != args.categories:
+            failures.append(f"{retailer}: {len(frames)} of {args.categories} "
+                            f"categories saved")
+        if observations[retailer] != sum(len(frame) for frame in frames):
+            failures.append(f"{retailer}: {observations[retailer]} observations "
+                            f"for {sum(len(frame) for frame in frames)} snapshot rows")
+        expected = expected_rows(retailer, args.products)
+        for frame in frames:
+            if len(frame) != expected:
+                failures.append(f"{retailer}: a snapshot has {len(frame)} rows, "
+                                f"expected {expected}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: every category was scraped completely from the mock")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Column-wise quantity extraction against the row-wise reference.
+
+Loads the product names of a retailer's whole history (every snapshot under
+`<data-dir>/raw/<retailer>`), standardizes their quantities row by row with
+`normalize.parse_quantity` / `convert_quantities_to_standard` (the former
+notebook code) and column-wise with `normalize.extract_quantities`, and
+checks that both give the same values. Each side is timed `--repeat` times
+and the median is kept; the script exits with a non-zero status if the
+results differ or the speedup is below `--min-speedup`. Most of the gain
+comes from parsing each distinct name once, so it grows with the number of
+days in the history (Continente's few snapshots repeat names much less than
+Auchan's).
+
+Usage:
+    python benchmarks/bench_normalize.py [--data-dir DIR] [--retailer auchan]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+import normalize  # noqa: E402
+from storage import read_snapshots  # noqa: E402
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+# Product name column of each retailer's snapshots
+NAME_COLUMNS = {"continente": "Product Name", "auchan": "product_name",
+                "pingo_doce": "product_name"}
+
+
+def row_wise(names):
+    return pd.DataFrame(
+        [normalize.convert_quantities_to_standard(normalize.parse_quantity(name))
+         for name in names],
+        columns=normalize.QUANTITY_COLUMNS)
+
+
+def median_seconds(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--retailer", default="auchan", choices=NAME_COLUMNS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args()
+
+    column = NAME_COLUMNS[args.retailer]
+    base_path = os.path.join(args.data_dir, "raw", args.retailer)
+    names = read_snapshots(base_path, columns=[column])[column].dropna()
+    if names.empty:
+        print(f"No snapshots under {base_path}")
+        sys.exit(1)
+    print(f"{len(names)} rows, {names.nunique()} distinct names")
+
+    row_seconds, expected = median_seconds(lambda: row_wise(names), args.repeat)
+    column_seconds, result = median_seconds(
+        lambda: normalize.extract_quantities(names), args.repeat)
+    speedup = row_seconds / column_seconds
+    print(f"row-wise     {row_seconds:.4f}s ({len(names) / row_seconds:.0f} rows/s)")
+    print(f"column-wise  {column_seconds:.4f}s "
+          f"({len(names) / column_seconds:.0f} rows/s), {speedup:.1f}x")
+
+    failures = []
+    expected = expected.astype({"weight_value": "float64", "quantity": "float64",
+                                "weight_unit": "object"})
+    try:
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    except AssertionError as e:
+        failures.append(f"results differ from the row-wise reference: {e}")
+    if speedup < args.min_speedup:
+        failures.append(f"speedup {speedup:.1f}x, expected {args.min_speedup:.0f}x")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: same quantities as the row-wise reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Parse throughput of fetcher threads versus a process-pool parse stage.
+
+Simulates a scrape where `--pages` raw grid responses arrive from the
+network with `--latency` seconds each, fetched by `--threads` threads. In
+the "threads" mode each fetcher parses its page itself, so parsing is
+serialised by the GIL; in the "stage" mode the raw bytes are handed to a
+`pipeline.ParseStage` with 1, 2, 4... worker processes and the fetchers move
+on to the next request. The parsed rows must match the in-thread parse.
+
+Usage:
+    python benchmarks/bench_parse_stage.py [--pages 64] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from continente.catalog import parse_product_columns  # noqa: E402
+from pipeline import ParseStage  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+
+
+def run(body, pages, latency, threads, parse_stage=None):
+    def fetch_and_parse(page):
+        time.sleep(latency)  # network round trip
+        if parse_stage is not None:
+            return parse_stage.submit(parse_product_columns, body, "bebe",
+                                      encoding="utf-8")
+        return parse_product_columns(body, "bebe", encoding="utf-8")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        batches = list(executor.map(fetch_and_parse, range(pages)))
+    batches = [batch.result() if parse_stage is not None else batch
+               for batch in batches]
+    return time.perf_counter() - started, batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES_DIR, "continente_grid.html"), "rb") as f:
+        body = f.read()
+
+    elapsed, reference = run(body, args.pages, args.latency, args.threads)
+    rows = sum(len(batch["Product ID"]) for batch in reference)
+    print(f"{'mode':<12} {'workers':>7} {'seconds':>8} {'rows/s':>9}")
+    print(f"{'threads':<12} {'-':>7} {elapsed:>8.2f} {rows / elapsed:>9.0f}")
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ParseStage(workers=workers) as stage:
+            # Warm up the worker processes (spawn + imports)
+            run(body, workers, 0, workers, stage)
+            elapsed, batches = run(body, args.pages, args.latency,
+                                   args.threads, stage)
+        if batches != reference:
+            print(f"FAIL: parse stage output differs with {workers} workers")
+            sys.exit(1)
+        print(f"{'stage':<12} {workers:>7} {elapsed:>8.2f} "
+              f"{rows / elapsed:>9.0f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Parser backend benchmark over the saved HTML fixtures.
+
+For every retailer parser and every backend in `html_parser.BACKENDS`,
+parses the fixture repeatedly and reports pages/s. The output of each
+backend is compared column for column with the html.parser reference; the
+script exits with a non-zero status on any difference.
+
+Usage:
+    python benchmarks/bench_parsers.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from html_parser import BACKENDS  # noqa: E402
+from continente.catalog import parse_product_data, parse_total_products  # noqa: E402
+from auchan.auchan import parse_products_from_html as parse_auchan  # noqa: E402
+from pingo_doce.pingo_doce import parse_last_page  # noqa: E402
+from pingo_doce.pingo_doce import parse_products_from_html as parse_pingo_doce  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+
+CASES = [
+    ("continente products", "continente_grid.html",
+     lambda html, backend: parse_product_data(html, "bebe", backend)),
+    ("continente total", "continente_grid.html", parse_total_products),
+    ("auchan products", "auchan_grid.html", parse_auchan),
+    ("pingo doce products", "pingo_doce_listing.html", parse_pingo_doce),
+    ("pingo doce last page", "pingo_doce_listing.html", parse_last_page),
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def same_output(reference, result):
+    if isinstance(reference, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(reference, result)
+        except AssertionError:
+            return False
+        return True
+    return reference == result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mismatches = []
+    print(f"{'case':<22} {'backend':<12} {'pages/s':>8} {'speedup':>8}")
+    for name, fixture, parse in CASES:
+        html = load_fixture(fixture)
+        reference = parse(html, "html.parser")
+        baseline = None
+        for backend in BACKENDS:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                result = parse(html, backend)
+            pages_per_s = args.repeat / (time.perf_counter() - started)
+            baseline = baseline or pages_per_s
+            print(f"{name:<22} {backend:<12} {pages_per_s:>8.1f} "
+                  f"{pages_per_s / baseline:>7.1f}x")
+            if not same_output(reference, result):
+                mismatches.append((name, backend))
+
+    if mismatches:
+        for name, backend in mismatches:
+            print(f"FAIL: {backend} output differs from html.parser for {name}")
+        sys.exit(1)
+    print("OK: all backends produce identical output")
+
+
+if __name__ == "__main__":
+    main()
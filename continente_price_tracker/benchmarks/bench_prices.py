@@ -0,0 +1,118 @@
+"""
+Column-wise price parsing against the row-wise reference.
+
+Builds a price column like the notebooks' `price_data.csv` (the day's
+Continente "Price per unit", Pingo Doce "product_price" and Auchan
+"product_price" stacked into one mixed column, `--rows` rows by default),
+parses it row by row with `normalize.parse_price` (the notebooks'
+`process_price` plus the unit) and column-wise with `normalize.parse_prices`,
+and checks that both give the same prices and units. Each side is timed
+`--repeat` times and the median is kept; the script exits with a non-zero
+status if the results differ or the speedup is below `--min-speedup`.
+
+Usage:
+    python benchmarks/bench_prices.py [--data-dir DIR] [--day 20241113]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+import normalize  # noqa: E402
+from storage import list_days, read_snapshots  # noqa: E402
+
+# Price column of each retailer's snapshots, as stacked in price_data.csv
+PRICE_COLUMNS = {"continente": "Price per unit", "pingo_doce": "product_price",
+                 "auchan": "product_price"}
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+# Rows of price_data.csv
+ROWS = 29241
+
+
+def price_column(data_dir, day, rows):
+    """The retailers' prices of `day` in one object column of `rows` rows."""
+    columns = []
+    for retailer, column in PRICE_COLUMNS.items():
+        base_path = os.path.join(data_dir, "raw", retailer)
+        days = [d for d in list_days(base_path) if day is None or d == day]
+        if days:
+            prices = read_snapshots(base_path, columns=[column], days=days[:1])
+            columns.append(prices[column].astype(object))
+    if not columns:
+        return pd.Series(dtype=object)
+    prices = pd.concat(columns, ignore_index=True)
+    return prices.iloc[np.arange(rows) % len(prices)].reset_index(drop=True)
+
+
+def row_wise(prices):
+    return pd.DataFrame([normalize.parse_price(price) for price in prices],
+                        columns=normalize.PRICE_COLUMNS)
+
+
+def median_seconds(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--day", default=None,
+                        help="snapshot day (YYYYMMDD); defaults to the first")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-speedup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    prices = price_column(args.data_dir, args.day, args.rows)
+    if prices.empty:
+        day = f" of {args.day}" if args.day else ""
+        print(f"No snapshots{day} under {os.path.join(args.data_dir, 'raw')}")
+        sys.exit(1)
+    print(f"{len(prices)} rows, {prices.nunique()} distinct prices")
+
+    row_seconds, expected = median_seconds(lambda: row_wise(prices), args.repeat)
+    column_seconds, result = median_seconds(
+        lambda: normalize.parse_prices(prices), args.repeat)
+    speedup = row_seconds / column_seconds
+    print(f"row-wise     {row_seconds:.4f}s ({len(prices) / row_seconds:.0f} rows/s)")
+    print(f"column-wise  {column_seconds:.4f}s "
+          f"({len(prices) / column_seconds:.0f} rows/s), {speedup:.1f}x")
+    print(result["price_unit"].value_counts(dropna=False).to_string())
+
+    failures = []
+    expected = expected.astype({"price": "float64", "price_unit": "object"})
+    result = result.astype({"price_unit": "object"})
+    try:
+        pd.testing.assert_frame_equal(result.fillna({"price_unit": np.nan}),
+                                      expected.fillna({"price_unit": np.nan}),
+                                      check_dtype=False)
+    except AssertionError as e:
+        failures.append(f"results differ from the row-wise reference: {e}")
+    if speedup < args.min_speedup:
+        failures.append(f"speedup {speedup:.1f}x, expected {args.min_speedup:.0f}x")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: same prices and units as the row-wise reference")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Disk size and load time of the recorded snapshots: CSV versus Parquet.
+
+Every CSV snapshot under data/raw is rewritten with `storage.write_snapshot`
+in Parquet format (same retailer/day layout) into a temporary directory.
+For each retailer the script reports the total size on disk, the time to
+load every day with `storage.read_snapshots`, and the time to load only a
+few columns of the last `--days` days. The Parquet data must load back
+equal to the CSV data; the script exits with a non-zero status otherwise.
+
+Usage:
+    python benchmarks/bench_storage.py [--days 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from storage import list_days, read_snapshots, snapshot_files, write_snapshot  # noqa: E402
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+RAW_DIR = os.path.join(REPO_ROOT, "data", "raw")
+
+# retailer directory, float columns, columns loaded in the partial read
+RETAILERS = {
+    "continente": (["Price"], ["Product ID", "Price", "cgid"]),
+    "auchan": (["product_price"], ["product_id", "product_price"]),
+    "pingo_doce": ([], ["product_id", "product_price"]),
+}
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def convert(csv_dir, parquet_dir, float_columns):
+    for day, path in snapshot_files(csv_dir):
+        name = os.path.splitext(os.path.basename(path))[0]
+        write_snapshot(pd.read_csv(path), os.path.join(parquet_dir, day),
+                       name, float_columns, format="parquet")
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_storage_")
+    failures = []
+    print(f"{'retailer':<11} {'format':<8} {'MiB':>7} {'ratio':>6} "
+          f"{'load all s':>10} {'load cols s':>11} {'rows':>8}")
+    try:
+        for retailer, (float_columns, columns) in RETAILERS.items():
+            csv_dir = os.path.join(RAW_DIR, retailer)
+            parquet_dir = os.path.join(workdir, retailer)
+            convert(csv_dir, parquet_dir, float_columns)
+            recent = list_days(csv_dir)[-args.days:]
+
+            results = {}
+            for format, directory in (("csv", csv_dir),
+                                      ("parquet", parquet_dir)):
+                full, load_all = timed(read_snapshots, directory)
+                _, load_cols = timed(read_snapshots, directory,
+                                     columns=columns, days=recent)
+                results[format] = (full, directory_size(directory),
+                                   load_all, load_cols)
+
+            csv_size = results["csv"][1]
+            for format, (full, size, load_all, load_cols) in results.items():
+                print(f"{retailer:<11} {format:<8} {size / 2 ** 20:>7.1f} "
+                      f"{csv_size / size:>5.1f}x {load_all:>10.2f} "
+                      f"{load_cols:>11.2f} {len(full):>8}")
+
+            csv_full, parquet_full = results["csv"][0], results["parquet"][0]
+            for column in float_columns:
+                csv_full[column] = pd.to_numeric(csv_full[column],
+                                                 errors="coerce")
+            try:
+                pd.testing.assert_frame_equal(csv_full, parquet_full,
+                                              check_dtype=False)
+            except AssertionError as e:
+                failures.append((retailer, e))
+    finally:
+        shutil.rmtree(workdir)
+
+    for retailer, error in failures:
+        print(f"FAIL: {retailer} Parquet data differs from CSV: {error}")
+    if failures:
+        sys.exit(1)
+    print("OK: Parquet snapshots load back equal to the CSVs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Price-history queries on the SQLite store against loading the snapshots.
+
+Copies `<data-dir>/raw` to a temporary directory, writes its observation
+files (`observations.convert_snapshots`) and loads them into a
+`price_store.PriceStore`, once from scratch and once more incrementally
+(which must load nothing). Then a product's price series, the daily
+min/max of its category and its promotion windows are queried from the
+store, and the same price series is computed the old way, by loading every
+observation with `loader.load`. Each query is timed `--repeat` times and
+the median is kept; the whole-history queries (every category, every
+product) are timed too, for reference.
+
+The script exits with a non-zero status if the store's rows or price
+series differ from the observations, the incremental update loads rows, or
+a product or category query takes longer than `--max-ms`.
+
+Usage:
+    python benchmarks/bench_store.py [--data-dir DIR] [--source auchan]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+import loader  # noqa: E402
+from observations import SOURCES, convert_snapshots  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from storage import list_days  # noqa: E402
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+
+def median_seconds(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--source", default="auchan", choices=SOURCES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    if not any(list_days(os.path.join(args.data_dir, "raw", source))
+               for source in SOURCES):
+        print(f"No snapshots under {os.path.join(args.data_dir, 'raw')}")
+        sys.exit(1)
+
+    failures = []
+    work_dir = tempfile.mkdtemp(prefix="bench_store_")
+    try:
+        raw_path = os.path.join(work_dir, "raw")
+        shutil.copytree(os.path.join(args.data_dir, "raw"), raw_path)
+        started = time.perf_counter()
+        for source in SOURCES:
+            convert_snapshots(os.path.join(raw_path, source), source)
+        print(f"observations written in {time.perf_counter() - started:.1f}s")
+
+        store = PriceStore(os.path.join(work_dir, "prices.sqlite3"))
+        started = time.perf_counter()
+        rows = store.update(raw_path)
+        print(f"store loaded: {rows} rows in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        again = store.update(raw_path)
+        print(f"incremental update: {again} rows in "
+              f"{(time.perf_counter() - started) * 1000:.1f}ms")
+        if again:
+            failures.append(f"the incremental update loaded {again} rows again")
+
+        observations = loader.load(observations=True, base_path=raw_path)
+        keys = observations.dropna(subset=["product_id"]).drop_duplicates(
+            ["source", "product_id", "date"])
+        stored = store.query("SELECT COUNT(*) AS n FROM prices")["n"][0]
+        if stored != len(keys):
+            failures.append(f"{stored} rows stored, expected {len(keys)}")
+
+        # The product of the source seen on the most days, and its category
+        product = store.query(
+            "SELECT product_id, category, COUNT(*) AS days FROM prices "
+            "WHERE source = ? GROUP BY product_id ORDER BY days DESC LIMIT 1",
+            (args.source,)).iloc[0]
+        print(f"{args.source} product {product['product_id']} "
+              f"({product['category']}), {product['days']} days")
+
+        def load_series():
+            df = loader.load(args.source, columns=["product_id", "price"],
+                             observations=True, base_path=raw_path)
+            df = df[df["product_id"] == product["product_id"]]
+            return df.drop_duplicates("date", keep="last").sort_values("date")
+
+        cases = [
+            ("price series (load)", load_series, False),
+            ("price series", lambda: store.price_series(
+                args.source, product["product_id"]), True),
+            ("daily min/max", lambda: store.daily_min_max(
+                product["category"], args.source), True),
+            ("promo windows", lambda: store.promo_windows(
+                args.source, product["product_id"]), True),
+            ("daily min/max, all categories", store.daily_min_max, False),
+            ("promo windows, all products", store.promo_windows, False),
+        ]
+        results = {}
+        for name, run, gated in cases:
+            seconds, results[name] = median_seconds(run, args.repeat)
+            print(f"{name:32s} {seconds * 1000:8.1f}ms "
+                  f"({len(results[name])} rows)")
+            if gated and seconds * 1000 > args.max_ms:
+                failures.append(f"{name} took {seconds * 1000:.1f}ms, expected "
+                                f"at most {args.max_ms:.0f}ms")
+
+        expected = results["price series (load)"]["price"].to_numpy("float64")
+        series = results["price series"]["price"].to_numpy("float64")
+        if not np.allclose(series, expected, equal_nan=True):
+            failures.append("the price series differs from the observations")
+        store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: the store matches the observations")
+
+
+if __name__ == "__main__":
+    main()
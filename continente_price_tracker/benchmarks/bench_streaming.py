@@ -0,0 +1,104 @@
+"""
+Full-DOM versus streaming tile extraction on the saved HTML fixtures.
+
+For each retailer page and backend, measures parse time and the peak
+memory growth of parsing one page, once by building the whole document and
+once with `html_parser.iter_elements` fed in 64 KiB chunks. Each
+measurement runs in a fresh subprocess so peak RSS (which also covers
+lxml's C allocations) is not polluted by earlier runs.
+
+Usage:
+    python benchmarks/bench_streaming.py [--repeat 10]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+
+# fixture, tag, class
+CASES = {
+    "continente": ("continente_grid.html", "div", "product-tile"),
+    "auchan": ("auchan_grid.html", "div", "product"),
+    "pingo doce": ("pingo_doce_listing.html", "div", "product-cards"),
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def extract(body, tag, class_, backend, mode):
+    """Extracts the attributes of every matching element."""
+    from html_parser import iter_elements, parse_html
+
+    if mode == "full":
+        elements = parse_html(body, backend).find_all(tag, class_=class_)
+    else:
+        chunks = (body[i:i + CHUNK_SIZE]
+                  for i in range(0, len(body), CHUNK_SIZE))
+        elements = iter_elements(chunks, tag, class_, backend,
+                                 encoding="utf-8")
+    return [element.get_text(strip=True) for element in elements]
+
+
+def measure(case, backend, mode, repeat):
+    """Runs in the child process; prints a JSON result line."""
+    import html_parser  # noqa: F401  (import cost is not measured)
+
+    fixture, tag, class_ = CASES[case]
+    with open(os.path.join(FIXTURES_DIR, fixture), "rb") as f:
+        body = f.read()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rows = len(extract(body, tag, class_, backend, mode))
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        extract(body, tag, class_, backend, mode)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    print(json.dumps({"rows": rows, "ms": elapsed * 1000,
+                      "peak_kb": rss_after - rss_before}))
+
+
+def run_child(case, backend, mode, repeat):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", case, backend, mode,
+         "--repeat", str(repeat)],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--child", nargs=3, metavar=("CASE", "BACKEND", "MODE"))
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child, repeat=args.repeat)
+        return
+
+    from html_parser import BACKENDS
+
+    print(f"{'page':<11} {'backend':<12} {'mode':<7} {'rows':>5} "
+          f"{'ms/page':>8} {'peak KiB':>9}")
+    for case in CASES:
+        for backend in BACKENDS:
+            for mode in ("full", "stream"):
+                result = run_child(case, backend, mode, args.repeat)
+                print(f"{case:<11} {backend:<12} {mode:<7} {result['rows']:>5} "
+                      f"{result['ms']:>8.1f} {result['peak_kb']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Offline regression suite for the parsers and the snapshot writer.
+
+Every case runs on the recorded fixtures (see fixtures/make_fixtures.py),
+with no network access:
+
+- parse: each retailer's listing parser and
+  `individual_items.parse_nutritional_info` on a product page, in rows/s;
+- write: the parsed pages of each retailer, repeated `--pages` times,
+  built into a DataFrame and written with `storage.write_snapshot` in every
+  format of `storage.FORMATS`, end to end, in rows/s.
+
+Like asv, each case is timed `--repeat` times and the median is kept; the
+peak Python memory of one more run is measured with tracemalloc (buffers
+allocated by pyarrow are not included). Results can be saved as a baseline
+(`--save-baseline`), and later runs on the same machine are compared with
+it: the script exits with a non-zero status if a case got slower, or its
+memory peak larger, by more than `--tolerance`.
+
+Usage:
+    python benchmarks/bench_suite.py --save-baseline    # before a change
+    python benchmarks/bench_suite.py                    # after it
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from auchan import auchan  # noqa: E402
+from continente import catalog  # noqa: E402
+from continente.individual_items import parse_nutritional_info  # noqa: E402
+from pingo_doce import pingo_doce  # noqa: E402
+from pipeline import ColumnBuffer  # noqa: E402
+from storage import FORMATS, write_snapshot  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "results", "baseline.json")
+
+# Memory growth ignored whatever the tolerance (tiny peaks are noisy)
+PEAK_SLACK = 2 ** 20
+
+# retailer: (fixture, parse function, columns, dtypes, float columns)
+LISTINGS = {
+    "continente": ("continente_grid.html",
+                   lambda html: catalog.parse_product_columns(html, "bebe"),
+                   catalog.PRODUCT_COLUMNS + ["cgid"], None, ["Price"]),
+    "auchan": ("auchan_grid.html", auchan.parse_product_columns,
+               auchan.PRODUCT_SCHEMA, auchan.PRODUCT_SCHEMA,
+               ["product_price"]),
+    "pingo_doce": ("pingo_doce_listing.html", pingo_doce.parse_product_columns,
+                   pingo_doce.PRODUCT_SCHEMA, pingo_doce.PRODUCT_SCHEMA, []),
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def batch_rows(batch):
+    return len(next(iter(batch.values()), []))
+
+
+def parse_cases():
+    """(name, run) pairs; `run()` parses a fixture and returns its rows."""
+    cases = []
+    for retailer, (fixture, parse, _, _, _) in LISTINGS.items():
+        html = load_fixture(fixture)
+        cases.append((f"parse/{retailer}",
+                      lambda html=html, parse=parse: batch_rows(parse(html))))
+    product_page = load_fixture("continente_product.html")
+    cases.append(("parse/continente_product",
+                  lambda: len(parse_nutritional_info(product_page)["Nutrients"])))
+    return cases
+
+
+def write_cases(workdir, pages):
+    """(name, run) pairs; `run()` writes a snapshot and returns its rows."""
+    cases = []
+    for retailer, (fixture, parse, columns, dtypes, float_columns) in LISTINGS.items():
+        batch = parse(load_fixture(fixture))
+        for format in FORMATS:
+            def run(batch=batch, columns=columns, dtypes=dtypes,
+                    float_columns=float_columns, format=format,
+                    retailer=retailer):
+                buffer = ColumnBuffer(columns, dtypes)
+                for _ in range(pages):
+                    buffer.extend(batch)
+                df = buffer.to_frame()
+                write_snapshot(df, workdir, f"{retailer}_{format}",
+                               float_columns, format=format)
+                return len(df)
+            cases.append((f"write/{retailer}/{format}", run))
+    return cases
+
+
+def measure(run, repeat):
+    """Median seconds of `repeat` runs, rows and tracemalloc peak (bytes)."""
+    rows = run()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    seconds = statistics.median(timings)
+    return {"rows": rows, "seconds": round(seconds, 6),
+            "rows_per_s": round(rows / seconds, 1), "peak_bytes": peak}
+
+
+def regressions(results, baseline, tolerance):
+    """Cases slower or larger than the baseline by more than `tolerance`."""
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            found.append(f"{name}: {result['rows_per_s']:.0f} rows/s, "
+                         f"baseline {before['rows_per_s']:.0f}")
+        if result["peak_bytes"] > before["peak_bytes"] * (1 + tolerance) + PEAK_SLACK:
+            found.append(f"{name}: peak {result['peak_bytes'] / 2 ** 20:.1f} MiB, "
+                         f"baseline {before['peak_bytes'] / 2 ** 20:.1f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20,
+                        help="pages per snapshot in the write cases")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth, as a fraction")
+    parser.add_argument("--filter", default="",
+                        help="only run the cases whose name contains this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    results = {}
+    print(f"{'case':<28} {'rows':>7} {'median s':>9} {'rows/s':>10} {'peak MiB':>9}")
+    try:
+        for name, run in parse_cases() + write_cases(workdir, args.pages):
+            if args.filter not in name:
+                continue
+            result = results[name] = measure(run, args.repeat)
+            print(f"{name:<28} {result['rows']:>7} {result['seconds']:>9.4f} "
+                  f"{result['rows_per_s']:>10.0f} "
+                  f"{result['peak_bytes'] / 2 ** 20:>9.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        found = regressions(results, json.load(f), args.tolerance)
+    for regression in found:
+        print(f"FAIL: {regression}")
+    if found:
+        sys.exit(1)
+    print(f"OK: no case regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
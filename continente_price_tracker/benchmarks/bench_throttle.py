@@ -0,0 +1,165 @@
+"""
+Fixed versus adaptive (AIMD) request rate against a stub server.
+
+The stub server answers quickly, except during an overload window in which
+it is slow and answers one request in three with 429. The same batch of
+pages is fetched once with the fixed politeness rate and once with the
+rate adapting between `--min-rate` and `--max-rate`; the adaptive rate is
+sampled over time. The adaptive run must finish sooner, back off during
+the overload (at least one decrease and a lower rate than before it) and
+climb above the fixed rate while the server is healthy; the script exits
+with a non-zero status otherwise.
+
+Usage:
+    python benchmarks/bench_throttle.py [--requests 80] [--rate 1.0]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+src_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(src_path)
+
+from http_engine import FetchEngine  # noqa: E402
+
+HOST = "127.0.0.1"
+
+
+def start_stub_server(latency, overload):
+    """
+    Runs a stub server that is overloaded between `overload` (start, end)
+    seconds after its first request.
+
+    Returns:
+        tuple: (base_url, stop, reset) where `reset()` restarts the clock.
+    """
+    loop = asyncio.new_event_loop()
+    state = {"first": None, "count": 0}
+
+    async def handle(request):
+        now = time.monotonic()
+        if state["first"] is None:
+            state["first"] = now
+        state["count"] += 1
+        elapsed = now - state["first"]
+        if overload[0] <= elapsed < overload[1]:
+            await asyncio.sleep(latency * 10)
+            if state["count"] % 3 == 0:
+                return web.Response(status=429)
+        else:
+            await asyncio.sleep(latency)
+        return web.Response(body=b"<html></html>", content_type="text/html")
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, HOST, 0)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(),
+                                         loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    def reset():
+        state["first"] = None
+
+    return f"http://{HOST}:{state['port']}", stop, reset
+
+
+def run_batch(base_url, n_requests, rate, min_rate=None, max_rate=None,
+              sample_every=0.5):
+    engine = FetchEngine()
+    engine.configure_host(HOST, concurrency=4, rate=rate, burst=2,
+                          min_rate=min_rate, max_rate=max_rate)
+    requests = [{"url": f"{base_url}/Search-UpdateGrid",
+                 "params": {"start": i}} for i in range(n_requests)]
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        started = time.perf_counter()
+        while not done.wait(sample_every):
+            throttle = engine.throttle(HOST)
+            if throttle is not None:
+                samples.append((time.perf_counter() - started, throttle.rate))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        started = time.perf_counter()
+        results = engine.get_many(requests, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        throttle = engine.throttle(HOST)
+        decreases = throttle.decreases if throttle is not None else 0
+    finally:
+        done.set()
+        sampler.join()
+        engine.close()
+    errors = sum(isinstance(result, Exception) for result in results)
+    return elapsed, errors, decreases, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--min-rate", type=float, default=0.2)
+    parser.add_argument("--max-rate", type=float, default=8.0)
+    parser.add_argument("--overload", type=float, nargs=2, default=[10, 15],
+                        help="overload window, in seconds after the first request")
+    args = parser.parse_args()
+
+    base_url, stop, reset = start_stub_server(args.latency, args.overload)
+    try:
+        fixed, fixed_errors, _, _ = run_batch(base_url, args.requests, args.rate)
+        reset()
+        adaptive, adaptive_errors, decreases, samples = run_batch(
+            base_url, args.requests, args.rate, args.min_rate, args.max_rate)
+    finally:
+        stop()
+
+    print(f"{'mode':<9} {'wall (s)':>9} {'pages/s':>8} {'errors':>7}")
+    for mode, elapsed, errors in (("fixed", fixed, fixed_errors),
+                                  ("adaptive", adaptive, adaptive_errors)):
+        print(f"{mode:<9} {elapsed:>9.2f} {args.requests / elapsed:>8.2f} "
+              f"{errors:>7}")
+    print("adaptive rate (req/s) over time:")
+    print("  " + "  ".join(f"{t:.0f}s:{rate:.1f}" for t, rate in samples[::2]))
+
+    start, end = args.overload
+    before = [rate for t, rate in samples if t < start]
+    during = [rate for t, rate in samples if start <= t < end + 1]
+    failures = []
+    if adaptive >= fixed:
+        failures.append("the adaptive run was not faster")
+    if not before or max(before) <= args.rate:
+        failures.append("the rate did not climb while the server was healthy")
+    if decreases == 0 or (before and during and min(during) >= before[-1]):
+        failures.append("the rate did not back off during the overload")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: adaptive rate is {fixed / adaptive:.1f}x faster and backed "
+          f"off {decreases} times during the overload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Builds the HTML fixtures used by the benchmarks.
+
+Only the Continente Search-UpdateGrid response was ever saved to disk (the
+`data.html` written by the scraper), so the Auchan grid and Pingo Doce
+listing pages, and the Continente product page read by
+`individual_items.parse_nutritional_info`, are rebuilt from the recorded
+CSV snapshots in `data/raw`, using the markup the parsers read plus
+surrounding page chrome (menus, scripts, footer) of realistic size.
+
+Usage:
+    python benchmarks/fixtures/make_fixtures.py
+"""
+import ast
+import html
+import json
+import os
+import shutil
+
+import pandas as pd
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(FIXTURES_DIR, "..", "..", ".."))
+RAW_DIR = os.path.join(REPO_ROOT, "data", "raw")
+
+AUCHAN_SNAPSHOT = os.path.join(
+    RAW_DIR, "auchan", "20241125", "bebidas-e-garrafeira_20241125.csv")
+PINGO_DOCE_SNAPSHOT = os.path.join(
+    RAW_DIR, "pingo_doce", "20241114", "pingo-doce-mercearia.csv")
+CONTINENTE_SNAPSHOT = os.path.join(
+    RAW_DIR, "continente", "20241113", "mercearias.csv")
+
+# Nutrition declaration per 100 g: (nutrient, quantity, unit)
+NUTRIENTS = [
+    ("Energia", "1550", "kJ"), ("Energia", "367", "kcal"),
+    ("Lípidos", "1.2", "g"), ("dos quais saturados", "0.3", "g"),
+    ("Hidratos de carbono", "78", "g"), ("dos quais açúcares", "0.5", "g"),
+    ("Fibra", "3.1", "g"), ("Proteínas", "8.4", "g"), ("Sal", "0.01", "g"),
+]
+
+
+def attr(value):
+    return html.escape(str(value), quote=True)
+
+
+def page_chrome(title, n_links=250):
+    """Header, menu and script blocks surrounding the product grid."""
+    menu = "\n".join(
+        f'<li class="nav-item"><a class="nav-link" href="/pt/categoria-{i}/">'
+        f'Categoria {i}</a></li>' for i in range(n_links))
+    tracking = json.dumps({"products": [{"id": i, "name": f"item {i}"}
+                                        for i in range(300)]})
+    header = (
+        f"<!DOCTYPE html><html lang=\"pt\"><head><title>{title}</title>"
+        f"<script>window.dataLayer = {tracking};</script></head><body>"
+        f"<header class=\"site-header\"><nav><ul class=\"navbar-nav\">"
+        f"{menu}</ul></nav></header><main class=\"container\">")
+    footer = (
+        f"</main><footer class=\"site-footer\"><ul>{menu}</ul></footer>"
+        f"<script>var tracking = {tracking};</script></body></html>")
+    return header, footer
+
+
+def auchan_tile(row):
+    labels = ast.literal_eval(row.product_labels) \
+        if isinstance(row.product_labels, str) else []
+    labels_html = "".join(
+        f'<img class="auc-product-labels__icon" src="/labels/{i}.svg" '
+        f'alt="{attr(label["alt"])}" title="{attr(label["title"])}"/>'
+        for i, label in enumerate(labels))
+    gtm = json.dumps({
+        "item_id": str(row.product_id),
+        "item_name": row.product_name,
+        "item_category": row.product_category,
+        "item_category2": row.product_category2,
+        "item_category3": row.product_category3,
+        "price": row.product_price,
+    }, ensure_ascii=False)
+    promotion = (
+        f'<div class="auc-price__promotion__label">{html.escape(row.product_promotions)}</div>'
+        if isinstance(row.product_promotions, str) else "")
+    return f"""
+<div class="col-6 col-sm-4 col-lg-3 product-tile-wrapper">
+  <div class="product" data-pid="{attr(row.product_id)}">
+    <div class="product-tile auc-product-tile" data-urls="{attr(row.product_urls)}" data-gtm-new="{attr(gtm)}">
+      <div class="image-container">
+        <a href="/pt/produto/{attr(row.product_id)}.html"><img class="tile-image" src="{attr(row.product_image)}" alt="{attr(row.product_name)}"/></a>
+        <div class="auc-product-labels">{labels_html}</div>
+      </div>
+      <div class="tile-body">
+        <div class="pdp-link"><a class="link" href="/pt/produto/{attr(row.product_id)}.html">{html.escape(row.product_name)}</a></div>
+        <div class="auc-product-tile__bazaarvoice--ratings" data-bv-product-id="{attr(row.product_ratings)}"></div>
+        <div class="price"><span class="sales"><span class="value" content="{row.product_price}">{row.product_price} &euro;</span></span></div>
+        {promotion}
+      </div>
+    </div>
+  </div>
+</div>"""
+
+
+def make_auchan_grid(path, sz=212):
+    data = pd.read_csv(AUCHAN_SNAPSHOT).head(sz)
+    header, footer = page_chrome("Bebidas e Garrafeira | Auchan")
+    tiles = "".join(auchan_tile(row) for row in data.itertuples())
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + f'<div class="row product-grid">{tiles}</div>'
+                + footer)
+
+
+def pingo_doce_card(row):
+    rating = (f'<div class="bv_text">{html.escape(str(row.product_rating))}</div>'
+              if isinstance(row.product_rating, str) else "")
+    return f"""
+<div class="product-cards">
+  <a class="product-cards__link" href="{attr(row.product_url)}">
+    <img class="product-cards__image" src="{attr(row.product_image)}" alt="{attr(row.product_name)}"/>
+    <h3 class="product-cards__title">{html.escape(row.product_name)}</h3>
+    <span class="product-cards_price">{html.escape(row.product_price)}</span>
+  </a>
+  {rating}
+</div>"""
+
+
+def make_pingo_doce_listing(path, per_page=48, last_page=15):
+    data = pd.read_csv(PINGO_DOCE_SNAPSHOT).head(per_page)
+    header, footer = page_chrome("Mercearia | Pingo Doce")
+    cards = "".join(pingo_doce_card(row) for row in data.itertuples())
+    pagination = "".join(
+        f'<div class="page js-change-page" data-page="{page}">{page}</div>'
+        for page in range(1, last_page + 1))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + f'<div class="products-list">{cards}</div>'
+                f'<div class="pagination">{pagination}</div>' + footer)
+
+
+def detail_block(css_class, label, value):
+    return (f'<div class="{css_class}"><p class="label">{label}</p>'
+            f'<p class="value">{html.escape(value)}</p></div>')
+
+
+def make_continente_product_page(path):
+    row = pd.read_csv(CONTINENTE_SNAPSHOT).iloc[0]
+    header, footer = page_chrome(f"{row['Product Name']} | Continente")
+    nutrients = "".join(
+        f'<div class="nutrients-row">'
+        f'<div class="nutriInfo-details">{name}</div>'
+        f'<div class="nutriInfo-details">{quantity}</div>'
+        f'<div class="nutriInfo-details">{unit}</div></div>'
+        for name, quantity, unit in NUTRIENTS)
+    sections = {
+        "Marca": row.Brand,
+        "Categoria": row.Category,
+        "Ingredientes": "Ver embalagem.",
+        "Conservação": "Conservar em local fresco e seco.",
+        "Origem": "Portugal",
+    }
+    description = "".join(
+        f'<p class="mb-0">{html.escape(header_)}:</p>'
+        f'<p>{html.escape(str(content))}</p>'
+        for header_, content in sections.items())
+    page = (
+        f'<div class="ct-pdp--description-content">{description}</div>'
+        f'<div class="nutritional-info">'
+        + detail_block("daily-value-intake-reference",
+                       "Dose de referência", "Adulto médio (8400 kJ/2000 kcal)")
+        + detail_block("serving-size", "Porção", "100")
+        + detail_block("serving-size--uom", "Unidade", "g")
+        + '<div class="nutrients-table"><div class="nutrients-row">'
+          '<div class="nutriInfo-details">Nutriente</div>'
+          '<div class="nutriInfo-details">Quantidade</div>'
+          f'<div class="nutriInfo-details">Unidade</div></div>{nutrients}</div>'
+        + "</div>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + f'<div class="product-detail" data-pid="{attr(row["Product ID"])}">'
+                f'<h1 class="product-name">{html.escape(row["Product Name"])}</h1>{page}</div>'
+                + footer)
+
+
+def main():
+    shutil.copyfile(os.path.join(REPO_ROOT, "data.html"),
+                    os.path.join(FIXTURES_DIR, "continente_grid.html"))
+    make_auchan_grid(os.path.join(FIXTURES_DIR, "auchan_grid.html"))
+    make_pingo_doce_listing(os.path.join(FIXTURES_DIR,
+                                         "pingo_doce_listing.html"))
+    make_continente_product_page(os.path.join(FIXTURES_DIR,
+                                              "continente_product.html"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the three retailers, serving the recorded fixtures.
+
+The server answers the endpoints the scrapers call, on their real paths:
+
+- Continente `Search-UpdateGrid` (`cgid`, `start`, `sz`): the grid fixture,
+  with the product counter set to `--products`;
+- Auchan `Search-UpdateGrid` (`cgid`, `start`, `sz`): full pages of the
+  grid fixture up to `--products`, then a short last page;
+- Pingo Doce listing (`categoria`, `cp`): the listing fixture, with
+  pagination up to `--products` / 48 pages;
+- the Continente home page requested as warm-up.
+
+Every response waits `--latency` seconds (+/- `--jitter`), `--error-rate`
+of them fail with 503, and each retailer accepts at most `--rate-limit`
+requests per second (burst `--burst`), answering 429 with a Retry-After
+header beyond that. `/__stats` returns the counts of each status per
+retailer as JSON.
+
+Point the scrapers at it with the engine's host override:
+
+    python benchmarks/mock_retailers.py --port 8080 --latency 0.05 &
+    python src/main.py --host-override http://127.0.0.1:8080 --data-dir /tmp/mock
+
+`start_mock_server(...)` runs it in a background thread, for benchmarks.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures")
+
+CONTINENTE_GRID = "/on/demandware.store/Sites-continente-Site/default/Search-UpdateGrid"
+AUCHAN_GRID = "/on/demandware.store/Sites-AuchanPT-Site/pt_PT/Search-UpdateGrid"
+PINGO_DOCE_LISTING = "/produtos/marca-propria-pingo-doce/pingo-doce/"
+
+# Products on a Pingo Doce listing page (as in the fixture)
+PINGO_DOCE_PAGE_SIZE = 48
+
+COUNTER = re.compile(r'(<div class="search-results-products-counter[^"]*">)[^<]*(</div>)')
+PAGINATION = re.compile(r'<div class="pagination">.*?</div></div>', re.S)
+AUCHAN_TILE = '<div class="col-6 col-sm-4 col-lg-3 product-tile-wrapper">'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class RateLimit:
+    """Token bucket of the mock: `allow()` is False once it is empty."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class MockRetailers:
+    """
+    The request handlers and their fault injection.
+
+    Args:
+        products (int): Products per category, for every retailer.
+        latency (float): Mean response time, in seconds.
+        jitter (float): Maximum deviation from `latency`, in seconds.
+        error_rate (float): Fraction of requests answered with 503.
+        rate_limit (float): Requests per second accepted per retailer, or
+            None for no limit; more are answered with 429.
+        burst (int): Requests accepted at once by the rate limit.
+        seed (int): Seed of the error injection, for repeatable runs.
+    """
+
+    def __init__(self, products=1000, latency=0.05, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, burst=4, seed=None):
+        self.products = products
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.limits = {retailer: RateLimit(rate_limit, burst)
+                       for retailer in ("continente", "auchan", "pingo_doce")} \
+            if rate_limit else {}
+        self.stats = {}
+
+        self.continente_grid = load_fixture("continente_grid.html")
+        auchan_grid = load_fixture("auchan_grid.html")
+        head, *tiles = auchan_grid.split(AUCHAN_TILE)
+        last, footer = tiles[-1].split("</div></main>", 1)
+        tiles[-1] = last
+        self.auchan_parts = (head, [AUCHAN_TILE + tile for tile in tiles],
+                             "</div></main>" + footer)
+        self.pingo_doce_listing = load_fixture("pingo_doce_listing.html")
+
+    def count(self, retailer, status):
+        counts = self.stats.setdefault(retailer, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    async def respond(self, retailer, render):
+        """Applies latency, rate limit and errors, then renders the page."""
+        await asyncio.sleep(max(0.0, self.latency + self.random.uniform(
+            -self.jitter, self.jitter)))
+        limit = self.limits.get(retailer)
+        if limit is not None and not limit.allow():
+            self.count(retailer, 429)
+            retry_after = math.ceil((1 - limit.tokens) / limit.rate)
+            return web.Response(status=429,
+                                headers={"Retry-After": str(retry_after)})
+        if self.random.random() < self.error_rate:
+            self.count(retailer, 503)
+            return web.Response(status=503)
+        self.count(retailer, 200)
+        return web.Response(text=render(), content_type="text/html",
+                            charset="utf-8")
+
+    async def continente(self, request):
+        start = int(request.query.get("start", 0))
+        sz = int(request.query.get("sz", 24))
+        shown = min(start + sz, self.products)
+        return await self.respond("continente", lambda: COUNTER.sub(
+            rf"\g<1>{shown} de {self.products} produtos\g<2>",
+            self.continente_grid))
+
+    async def auchan(self, request):
+        start = int(request.query.get("start", 0))
+        sz = int(request.query.get("sz", 24))
+        head, tiles, footer = self.auchan_parts
+        n_tiles = max(0, min(sz, len(tiles), self.products - start))
+        return await self.respond(
+            "auchan", lambda: head + "".join(tiles[:n_tiles]) + footer)
+
+    async def pingo_doce(self, request):
+        last_page = max(1, math.ceil(self.products / PINGO_DOCE_PAGE_SIZE))
+        pagination = '<div class="pagination">' + "".join(
+            f'<div class="page js-change-page" data-page="{page}">{page}</div>'
+            for page in range(1, last_page + 1)) + "</div></div>"
+        return await self.respond("pingo_doce", lambda: PAGINATION.sub(
+            pagination, self.pingo_doce_listing, count=1))
+
+    async def home(self, request):
+        return web.Response(text="<html><body>mock</body></html>",
+                            content_type="text/html")
+
+    async def stats_page(self, request):
+        return web.json_response({retailer: {str(status): n
+                                             for status, n in counts.items()}
+                                  for retailer, counts in self.stats.items()})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get(CONTINENTE_GRID, self.continente)
+        app.router.add_get(AUCHAN_GRID, self.auchan)
+        app.router.add_get(PINGO_DOCE_LISTING, self.pingo_doce)
+        app.router.add_get("/__stats", self.stats_page)
+        app.router.add_get("/", self.home)
+        return app
+
+
+def start_mock_server(host="127.0.0.1", port=0, **options):
+    """
+    Runs the mock in a background thread.
+
+    Args:
+        port (int): The port to listen on; 0 picks a free one.
+        **options: Passed to `MockRetailers`.
+
+    Returns:
+        tuple: (base_url, mock, stop), where `mock.stats` holds the counts
+        of each status per retailer and `stop()` shuts the server down.
+    """
+    mock = MockRetailers(**options)
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    async def serve():
+        runner = web.AppRunner(mock.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        state["runner"] = runner
+        state["port"] = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(),
+                                         loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://{host}:{state['port']}", mock, stop
+
+
+def add_options(parser):
+    """Adds the mock's fault injection options to an argument parser."""
+    parser.add_argument("--products", type=int, default=1000,
+                        help="products per category")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="requests/s accepted per retailer (429 beyond)")
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def mock_options(args):
+    return {"products": args.products, "latency": args.latency,
+            "jitter": args.jitter, "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit, "burst": args.burst,
+            "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_options(parser)
+    args = parser.parse_args()
+    mock = MockRetailers(**mock_options(args))
+    web.run_app(mock.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,15 @@
 import pandas as pd
-import glob
+import os
+import sys
 
-# Function to read and concatenate all CSV files in a given path
-def read_and_concat_csvs(directory_path):
-    csv_files = glob.glob(f"{directory_path}/*.csv")
-    dataframes = [pd.read_csv(file) for file in csv_files]
-    concatenated_df = pd.concat(dataframes, ignore_index=True)
-    return concatenated_df
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from loader import load  # Parallel, typed reader of the snapshot files
+from normalize import parse_prices  # Column-wise version of process_price below
 
-# Reading and concatenating CSV files for each directory
-continente_df = read_and_concat_csvs(r"data/raw/continente/20241113")
-pingo_doce_df = read_and_concat_csvs(r"data/raw/pingo_doce/20241113")
-auchan_df = read_and_concat_csvs(r"data/raw/auchan/20241113")
+# Reading the day's snapshots of each retailer
+continente_df = load("continente", "20241113", "20241113")
+pingo_doce_df = load("pingo_doce", "20241113", "20241113")
+auchan_df = load("auchan", "20241113", "20241113")
 
 # continente_df["Product Name"] = continente_df["Product Name"] + continente_df["Brand"]
 
@@ -68,8 +66,8 @@ def process_price(price):
     except ValueError:
         return None
 
-# Apply the function to the price column
-merged_df['price'] = merged_df['price'].apply(process_price).dropna()
+# Parse the whole price column at once (same rules as process_price)
+merged_df[['price', 'price_unit']] = parse_prices(merged_df['price'])
 merged_df.to_csv("price_data.csv")
 
 # Display the results
@@ -1,8 +1,12 @@
 import pandas as pd
 import re
+import sys
 from glob import glob
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from normalize import extract_quantities  # Column-wise version of the functions below
+
 data2 = pd.read_csv("data/auchan/limpeza-da-casa-e-roupa_20241112_111011.csv")
 data = data2["product_name"]
 
@@ -176,12 +180,9 @@ def process_and_calculate_price(path_to_files):
         # Load the data (assumes each file has a column named 'product_name' and 'product_description')
         data = pd.read_csv(file)
 
-        # Parse the quantities and convert them
-        parsed_data = [parse_quantity(product) for product in data['product_name']]
-        parsed_data = [convert_quantities_to_standard(product) for product in parsed_data]
-        
-        # Convert the parsed data into a DataFrame
-        df = pd.DataFrame(parsed_data, columns=['Weight_Value', 'Weight_Unit', 'Quantity'])
+        # Parse the quantities and convert them, for the whole column at once
+        df = extract_quantities(data['product_name'])
+        df.columns = ['Weight_Value', 'Weight_Unit', 'Quantity']
 
         # Join with the original data to add product details like name and price
         df2 = df.join(data[["product_name", "product_price"]])
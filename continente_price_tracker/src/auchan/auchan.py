@@ -1,145 +1,219 @@
-import requests
-from bs4 import BeautifulSoup
 from tqdm import tqdm
 import os
-import pandas as pd
-import time
 import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from utils import retry_on_failure
+from utils import retry_on_failure, dump_debug_html
+from retry import CATEGORY_RETRY, PAGE_RETRY
 from logger import setup_logger
+from http_engine import FetchError, engine
+from html_parser import find_elements
+from metrics import timed
+from pipeline import ColumnBuffer, ParseStage, rows_to_columns
+from storage import write_snapshot
+from observations import write_observations
+from page_cache import fetch_columns
+
+AUCHAN_HOST = "www.auchan.pt"
+
+AUCHAN_HEADERS = {
+    "User-Agent":
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/86.0.4240.75 Safari/537.36",
+    "Accept":
+    "text/html,application/xhtml+xml,application/xml;q=0.9,"
+    "image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "TE": "Trailers"
+}
+
+# Politeness budget shared by every cgid fetched in parallel; the rate
+# adapts to the site's latency and errors (see http_engine.AdaptiveThrottle)
+engine.configure_host(AUCHAN_HOST, concurrency=4, rate=1.0, burst=2,
+                      min_rate=0.2, max_rate=4.0)
+
+# Category groups scraped every run, with the grid's store filter and page
+# size: the lists of the former main.py and main_concurrency.py, merged
+CGIDS = [
+    "alimentacao-", "biologico-e-escolhas-alimentares",
+    "limpeza-da-casa-e-roupa", "bebidas-e-garrafeira", "marcas-auchan",
+    "saude-e-bem-estar/acne/", "produtos-frescos", "Páginasbe_Antimanchas",
+    "Páginasbe_Antiidade", "Páginasbe_Acne", "produtos-solares",
+    "multivitaminicos", "PaginaSBE_pelesecaatopica", "maquilhagem"
+]
+PREFN1 = "soldInStores"
+PREFV1 = "000"
+PAGE_SIZE = 212
+BASE_URL = ("https://www.auchan.pt/on/demandware.store/Sites-AuchanPT-Site/"
+            "pt_PT/Search-UpdateGrid")
+
+# Keep-alive pool shared by every request to Auchan
+session = engine.session("auchan", pool_size=4, headers=AUCHAN_HEADERS)
+
+
+def parse_product_tile(product):
+    """
+    Extracts one product's information from a `div.product` element.
+
+    Args:
+        product: The product element (BeautifulSoup-compatible node).
+
+    Returns:
+        dict: The product's fields, keyed by the product schema columns.
+    """
+    product_data = {}
+
+    # Extract product ID
+    product_data['product_id'] = product['data-pid']
+
+    # Extract product URLs
+    product_urls = product.find('div', class_='product-tile')['data-urls']
+    product_data['product_urls'] = product_urls
+
+    # Extract product name
+    product_name = product.find('div',
+                                class_='pdp-link').find('a').text.strip()
+    product_data['product_name'] = product_name
+
+    # Extract product price
+    product_price = product.find('span', class_='value')['content']
+    product_data['product_price'] = float(product_price)
+
+    # Extract product category
+    product_category = product.find('div',
+                                    class_='product-tile')['data-gtm-new']
+    product_data['product_category'] = product_category
+
+    # Extract nested product categories
+    product_category_data = json.loads(product_category)
+    product_data['product_category'] = product_category_data.get(
+        'item_category', None)
+    product_data['product_category2'] = product_category_data.get(
+        'item_category2', None)
+    product_data['product_category3'] = product_category_data.get(
+        'item_category3', None)
+
+    # Extract product image URL
+    product_image = product.find(
+        'div', class_='image-container').find('img')['src']
+    product_data['product_image'] = product_image
+
+    # Extract product ratings
+    product_ratings = product.find(
+        'div', class_='auc-product-tile__bazaarvoice--ratings'
+    )['data-bv-product-id']
+    product_data['product_ratings'] = product_ratings
+
+    # Extract product labels
+    product_labels = []
+    labels = product.find_all('img', class_='auc-product-labels__icon')
+    for label in labels:
+        product_labels.append({
+            'alt': label['alt'],
+            'title': label['title'],
+            # 'src': label['src']
+        })
+    product_data['product_labels'] = product_labels
+
+    # Extract product promotions (assign None if not found)
+    product_promotions = product.find('div',
+                                      class_='auc-price__promotion__label')
+    product_data['product_promotions'] = product_promotions.text.strip(
+    ) if product_promotions else None
+
+    # Extract quantity selector details (assign None if not found)
+    # quantity_selector = product.find('div', class_='auc-qty-selector')
+    # if quantity_selector:
+    #     product_data['quantity_selector'] = quantity_selector
+    # else:
+    #     product_data['quantity_selector'] = None
+
+    # Convert nested dictionaries to JSON strings for DataFrame compatibility
+    product_data["product_urls"] = str(product_data["product_urls"])
+    product_data["product_ratings"] = str(product_data["product_ratings"])
+    product_data["product_labels"] = str(product_data["product_labels"])
+    # product_data["quantity_selector"] = str(
+    #     product_data["quantity_selector"])
+
+    return product_data
+
+
+# Schema of the product information DataFrame
+PRODUCT_SCHEMA = {
+    "product_id": 'str',
+    "product_name": 'str',
+    "product_price": 'float',
+    "product_category": 'str',
+    "product_category2": 'str',
+    "product_category3": 'str',
+    "product_image": 'str',
+    "product_urls": 'str',
+    "product_ratings": 'str',
+    "product_labels": 'str',
+    "product_promotions": 'str',
+    # "quantity_selector": 'str'
+}
+
+
+@timed("parse")
+def parse_product_columns(html_content, backend=None, encoding=None):
+    """
+    Parses a grid page into a column batch. Top-level so it can run in a
+    `pipeline.ParseStage` worker process.
 
+    Args:
+        html_content (str, bytes or document): The page to be parsed.
+        backend (str): The HTML parser backend (see html_parser.BACKENDS).
+        encoding (str): Encoding of a bytes body.
 
-def parse_products_from_html(html_content):
+    Returns:
+        dict: Column name -> list of values, one column per schema field.
+    """
+    # Find all product elements in the HTML; raw HTML only builds the
+    # product subtrees
+    products = find_elements(html_content, 'div', 'product', backend, encoding)
+
+    return rows_to_columns(
+        (parse_product_tile(product) for product in products),
+        list(PRODUCT_SCHEMA))
+
+
+def products_to_frame(batch):
+    """
+    Builds the product DataFrame from a column batch.
+
+    Args:
+        batch (dict): Column batch returned by `parse_product_columns`.
+
+    Returns:
+        pd.DataFrame: The products, with the columns and dtypes of the
+        schema.
+    """
+    buffer = ColumnBuffer(PRODUCT_SCHEMA, PRODUCT_SCHEMA)
+    return buffer.extend(batch).to_frame()
+
+
+def parse_products_from_html(html_content, backend=None):
     """
     Parses HTML content to extract product information and returns it as a DataFrame.
 
     Args:
         html_content (str): The raw HTML content of the page to be parsed.
+        backend (str): The HTML parser backend (see html_parser.BACKENDS).
 
     Returns:
         pd.DataFrame: A DataFrame containing parsed product information, such as product ID, name, price, categories, image, and other attributes.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Define the schema for the product information DataFrame
-    product_schema = {
-        "product_id": pd.Series(dtype='str'),
-        "product_name": pd.Series(dtype='str'),
-        "product_price": pd.Series(dtype='float'),
-        "product_category": pd.Series(dtype='str'),
-        "product_category2": pd.Series(dtype='str'),
-        "product_category3": pd.Series(dtype='str'),
-        "product_image": pd.Series(dtype='str'),
-        "product_urls": pd.Series(dtype='str'),
-        "product_ratings": pd.Series(dtype='str'),
-        "product_labels": pd.Series(dtype='str'),
-        "product_promotions": pd.Series(dtype='str'),
-        # "quantity_selector": pd.Series(dtype='str')
-    }
+    return products_to_frame(parse_product_columns(html_content, backend))
+
 
-    # Create an empty DataFrame with the defined schema
-    product_df = pd.DataFrame(product_schema)
-
-    # Find all product elements in the HTML
-    products = soup.find_all('div', class_='product')
-
-    product_list = []
-
-    for product in products:
-        product_data = {}
-
-        # Extract product ID
-        product_data['product_id'] = product['data-pid']
-
-        # Extract product URLs
-        product_urls = product.find('div', class_='product-tile')['data-urls']
-        product_data['product_urls'] = product_urls
-
-        # Extract product name
-        product_name = product.find('div',
-                                    class_='pdp-link').find('a').text.strip()
-        product_data['product_name'] = product_name
-
-        # Extract product price
-        product_price = product.find('span', class_='value')['content']
-        product_data['product_price'] = float(product_price)
-
-        # Extract product category
-        product_category = product.find('div',
-                                        class_='product-tile')['data-gtm-new']
-        product_data['product_category'] = product_category
-
-        # Extract nested product categories
-        product_category_data = json.loads(product_category)
-        product_data['product_category'] = product_category_data.get(
-            'item_category', None)
-        product_data['product_category2'] = product_category_data.get(
-            'item_category2', None)
-        product_data['product_category3'] = product_category_data.get(
-            'item_category3', None)
-
-        # Extract product image URL
-        product_image = product.find(
-            'div', class_='image-container').find('img')['src']
-        product_data['product_image'] = product_image
-
-        # Extract product ratings
-        product_ratings = product.find(
-            'div', class_='auc-product-tile__bazaarvoice--ratings'
-        )['data-bv-product-id']
-        product_data['product_ratings'] = product_ratings
-
-        # Extract product labels
-        product_labels = []
-        labels = product.find_all('img', class_='auc-product-labels__icon')
-        for label in labels:
-            product_labels.append({
-                'alt': label['alt'],
-                'title': label['title'],
-                # 'src': label['src']
-            })
-        product_data['product_labels'] = product_labels
-
-        # Extract product promotions (assign None if not found)
-        product_promotions = product.find('div',
-                                          class_='auc-price__promotion__label')
-        product_data['product_promotions'] = product_promotions.text.strip(
-        ) if product_promotions else None
-
-        # Extract quantity selector details (assign None if not found)
-        # quantity_selector = product.find('div', class_='auc-qty-selector')
-        # if quantity_selector:
-        #     product_data['quantity_selector'] = quantity_selector
-        # else:
-        #     product_data['quantity_selector'] = None
-
-        # Convert nested dictionaries to JSON strings for DataFrame compatibility
-        product_data["product_urls"] = str(product_data["product_urls"])
-        product_data["product_ratings"] = str(product_data["product_ratings"])
-        product_data["product_labels"] = str(product_data["product_labels"])
-        # product_data["quantity_selector"] = str(
-        #     product_data["quantity_selector"])
-
-        # Append the product data to the list
-        product_list.append(product_data)
-
-    # Convert the list of product data to a DataFrame
-    product_df = pd.concat([product_df, pd.DataFrame(product_list)],
-                           ignore_index=True)
-
-    # Reindex the DataFrame to ensure it has the same columns as the schema
-    product_df = product_df.reindex(columns=product_schema.keys())
-
-    # Assert that the DataFrame structure is consistent with the schema
-    assert list(product_df.columns) == list(
-        product_schema.keys()), "DataFrame structure does not match the schema"
-
-    return product_df
-
-
-@retry_on_failure(retries=3, delay=60)
-def get_auchan_data(cgid, prefn1, prefv1, start, sz, next, selectedUrl):
+@retry_on_failure(policy=PAGE_RETRY)
+def get_auchan_data(cgid, prefn1, prefv1, start, sz, next, selectedUrl,
+                    raw=False, headers=None):
     """
     Fetches HTML data from the Auchan store's search API endpoint.
 
@@ -151,22 +225,15 @@ def get_auchan_data(cgid, prefn1, prefv1, start, sz, next, selectedUrl):
         sz (int): The number of products to fetch per request.
         next (str): Whether or not to fetch the next page of products (usually "true").
         selectedUrl (str): The URL that includes the parameters for the request.
+        raw (bool): Return the `http_engine.Response` (body bytes and
+            encoding) instead of the decoded text. Defaults to False.
+        headers (dict): Extra request headers, e.g. conditional request
+            headers.
 
     Returns:
         str: The raw HTML content from the Auchan store's search results.
     """
     url = "https://www.auchan.pt/on/demandware.store/Sites-AuchanPT-Site/pt_PT/Search-UpdateGrid"
-    headers = {
-        "User-Agent":
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.75 Safari/537.36",
-        "Accept":
-        "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "TE": "Trailers"
-    }
     params = {
         "cgid": cgid,
         "prefn1": prefn1,
@@ -176,18 +243,77 @@ def get_auchan_data(cgid, prefn1, prefv1, start, sz, next, selectedUrl):
         "next": next
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    # Raises FetchError for non-successful status codes
+    response = session.get(url, params=params, headers=headers)
+    dump_debug_html(response.body, f"auchan_{cgid}_{start}")
+    return response if raw else response.text
 
-    if response.status_code == 200:
-        return response.text
-    else:
-        response.raise_for_status()
 
+def fetch_page(cgid, prefn1, prefv1, start, sz, base_url, logger,
+               parse_stage=None, page_cache=None, checkpoints=None, done=None):
+    """
+    Fetches and parses the page at offset `start` of a cgid into a column
+    batch (a Future of it with a `parse_stage`).
+
+    Args:
+        See `get_and_parse_auchan_data`; `start` is the page's offset and
+        `done` the checkpointed pages, which are not fetched again.
 
-@retry_on_failure(retries=3, delay=60)
-def get_and_parse_auchan_data(cgid, prefn1, prefv1, sz, base_url, logger):
+    Returns:
+        dict or concurrent.futures.Future: The page's column batch.
+    """
+    if done and start in done:
+        return done[start].batch
+    selectedUrl = (f"{base_url}?cgid={cgid}&prefn1={prefn1}&prefv1={prefv1}"
+                   f"&start={start}&sz={sz}&next=true")
+    key = ("auchan", cgid, start)
+    try:
+        page = fetch_columns(
+            key,
+            lambda headers: get_auchan_data(
+                cgid, prefn1, prefv1, start, sz, "true", selectedUrl,
+                raw=True, headers=headers),
+            parse_product_columns,
+            page_cache=page_cache, parse_stage=parse_stage)
+        if checkpoints is not None:
+            checkpoints.track(key, page)
+        logger.info(f"Successful GET request for URL: {selectedUrl}")
+        return page
+    except Exception as e:
+        logger.error(f"Error fetching data for URL {selectedUrl}: {str(e)}")
+        raise
+
+
+def _page_batch(future, start, cgid, checkpoints):
+    """
+    The column batch of a fetched page, waiting for its parse if any, or
+    None if the page failed. With checkpoints a failed page raises
+    FetchError instead, so that the retry resumes from it.
+    """
+    try:
+        batch = future.result()
+        if isinstance(batch, Future):
+            batch = batch.result()
+    except Exception:
+        if checkpoints is not None:
+            raise FetchError(f"Page at offset {start} of cgid {cgid} "
+                             f"failed; the completed pages are checkpointed")
+        return None
+    return batch
+
+
+@retry_on_failure(policy=CATEGORY_RETRY)
+def get_and_parse_auchan_data(cgid, prefn1, prefv1, sz, base_url, logger,
+                              prefetch=2, parse_stage=None, page_cache=None,
+                              checkpoints=None):
     """
-    Retrieves and parses product data from the Auchan store in a paginated manner.
+    Retrieves and parses product data from the Auchan store in a paginated
+    manner.
+
+    The number of pages is not known in advance, so up to `prefetch` offsets
+    beyond the current one are requested speculatively. When a short page
+    (fewer than `sz` products) shows up, the outstanding requests are
+    cancelled and their results discarded.
 
     Args:
         cgid (str): The category group ID used for filtering the products.
@@ -196,38 +322,159 @@ def get_and_parse_auchan_data(cgid, prefn1, prefv1, sz, base_url, logger):
         sz (int): The number of products to fetch per request.
         base_url (str): The base URL of the search results.
         logger (logging.Logger): The logger object for logging messages.
+        prefetch (int): Number of offsets fetched ahead of the current one.
+            Defaults to 2.
+        parse_stage (pipeline.ParseStage): If given, pages are parsed in its
+            worker processes so the fetcher threads only download.
+        page_cache (page_cache.PageCache): If given, requests are conditional
+            and pages unchanged since the last run reuse their stored rows.
+        checkpoints (checkpoint.CheckpointJournal): If given, completed pages
+            are recorded and those of an earlier attempt are not fetched
+            again; a failed page then raises FetchError so that the retry
+            resumes from it.
 
     Returns:
-        pd.DataFrame: A DataFrame containing parsed product information across multiple pages.
+        pd.DataFrame: A DataFrame containing parsed product information
+        across multiple pages.
     """
-    start = 0
-    all_data = pd.DataFrame()
-
-    with tqdm(total=30, unit='batch') as pbar:
-        while True:
-            selectedUrl = f"{base_url}?cgid={cgid}&prefn1={prefn1}&prefv1={prefv1}&start={start}&sz={sz}&next=true"
-
-            try:
-                data = get_auchan_data(cgid, prefn1, prefv1, start, sz, "true", selectedUrl)
-                logger.info(f"Successful GET request for URL: {selectedUrl}")
-                parsed_data = parse_products_from_html(data)
+    done = {}
+    if checkpoints is not None:
+        done = checkpoints.pages("auchan", cgid)
+    if done:
+        logger.info(f"Resuming cgid {cgid}: {len(done)} pages checkpointed")
+
+    # Pages are appended column-wise and materialised once at the end
+    products = ColumnBuffer(PRODUCT_SCHEMA, PRODUCT_SCHEMA)
+    pending = deque()
+    next_start = 0
+    executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+
+    def schedule():
+        nonlocal next_start
+        future = executor.submit(fetch_page, cgid, prefn1, prefv1, next_start,
+                                 sz, base_url, logger, parse_stage,
+                                 page_cache, checkpoints, done)
+        pending.append((next_start, future))
+        next_start += sz
+
+    try:
+        with tqdm(total=30, unit='batch') as pbar:
+            for _ in range(prefetch + 1):
+                schedule()
+
+            while pending:
+                start, future = pending.popleft()
+                parsed_data = _page_batch(future, start, cgid, checkpoints)
+                if parsed_data is None:
+                    break
+
+                products.extend(parsed_data)
+                pbar.update(1)
+
+                if len(parsed_data["product_id"]) < sz:
+                    break
+
+                schedule()
+                pbar.total += 1  # Increase the total count dynamically
+    finally:
+        # Drop the speculative requests past the last page
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return products.to_frame()
+
+
+def save_data_for_cgid(cgid, prefn1, prefv1, sz, base_url, data_directory,
+                       timestamp, logger, parse_stage=None, page_cache=None,
+                       checkpoints=None):
+    """
+    Fetches and processes product data for a single cgid and saves it as a
+    snapshot file (see storage.write_snapshot).
 
-            except Exception as e:
-                logger.error(f"Error fetching data for URL {selectedUrl}: {str(e)}")
-                return all_data
+    Args:
+        cgid (str): The cgid value for which data will be fetched.
+        prefn1 (str): The first filter parameter for fetching data.
+        prefv1 (str): The value corresponding to the prefn1 filter.
+        sz (int): The number of items to fetch per request.
+        base_url (str): The base URL for fetching data.
+        data_directory (str): The directory where the snapshot file will be
+            saved.
+        timestamp (str): The run date, used in the filename.
+        logger (logging.Logger): The logger object for logging messages.
+        parse_stage (pipeline.ParseStage): Optional process pool for parsing.
+        page_cache (page_cache.PageCache): Optional store of unchanged pages.
+        checkpoints (checkpoint.CheckpointJournal): Optional journal of
+            completed pages and cgids, to resume an interrupted run.
+    """
+    if checkpoints is not None:
+        file_path = checkpoints.finished("auchan", cgid)
+        if file_path is not None:
+            logger.info(f"cgid {cgid} already saved to {file_path}, skipping")
+            return
+
+    logger.info(f"Processing cgid: {cgid}")
+
+    try:
+        # Fetch and parse the data for the given cgid
+        final_data = get_and_parse_auchan_data(cgid, prefn1, prefv1, sz,
+                                               base_url, logger,
+                                               parse_stage=parse_stage,
+                                               page_cache=page_cache,
+                                               checkpoints=checkpoints)
+        final_data["source"] = "auchan"
+        final_data["timestamp"] = timestamp
+
+        if not final_data.empty:
+            # Save the snapshot, named with cgid and timestamp; the format
+            # is set by storage.DEFAULT_FORMAT
+            file_path = write_snapshot(final_data, data_directory,
+                                       f"{cgid}_{timestamp}",
+                                       float_columns=["product_price"])
+            # The same rows in the schema shared by every retailer
+            write_observations(final_data, "auchan", data_directory,
+                               f"{cgid}_{timestamp}", category=cgid,
+                               date=timestamp)
+            if checkpoints is not None:
+                checkpoints.finish("auchan", cgid, file_path)
+            logger.info(f"Data for {cgid} saved to {file_path}")
+        else:
+            logger.warning(f"No data found for {cgid}. Skipping...")
+    except Exception as e:
+        logger.error(f"Error processing cgid {cgid}: {str(e)}", exc_info=True)
+
+
+def run_logger(timestamp):
+    """Returns the logger of a run, writing to logs/auchan_<timestamp>.log."""
+    log_directory = "logs"
+    os.makedirs(log_directory, exist_ok=True)
+    return setup_logger(os.path.join(log_directory, f"auchan_{timestamp}.log"))
 
-            all_data = pd.concat([all_data, parsed_data], ignore_index=True)
 
-            pbar.update(1)
-            time.sleep(3)
+def start_run(pool_size=None, host_concurrency=None, page_cache=None):
+    """
+    Applies the connection settings and resets the run's counters.
 
-            if len(parsed_data) < sz:
-                break
+    Args:
+        pool_size (int): Size of the keep-alive connection pool.
+        host_concurrency (int): Maximum requests in flight to Auchan.
+        page_cache (page_cache.PageCache): Its Auchan counters are reset.
+    """
+    if pool_size is not None:
+        session.configure(pool_size=pool_size)
+    if host_concurrency is not None:
+        engine.set_host_concurrency(AUCHAN_HOST, host_concurrency)
+    session.stats.reset()
+    if page_cache is not None:
+        page_cache.stats("auchan").reset()
 
-            start += sz
-            pbar.total += 1  # Increase the total count dynamically
 
-    return all_data
+def log_run_stats(logger, page_cache=None):
+    """Logs the connection, request rate and page cache counters of the run."""
+    logger.info(f"Connection stats: {session.stats}")
+    logger.info(f"Request rate: {engine.throttle(AUCHAN_HOST)}")
+    if page_cache is not None:
+        logger.info(f"Page cache stats: {page_cache.stats('auchan')}")
 
 
 def save_data_for_all_cgids(cgid_list,
@@ -235,9 +482,16 @@ def save_data_for_all_cgids(cgid_list,
                             prefv1,
                             sz,
                             base_url,
-                            base_path="data/raw"):
+                            base_path="data/raw",
+                            max_workers=4,
+                            pool_size=None,
+                            host_concurrency=None,
+                            parse_workers=None,
+                            page_cache=None,
+                            checkpoints=None):
     """
-    Fetches and processes product data for each cgid in the list and saves it to CSV files in the specified directory.
+    Fetches and processes product data for each cgid in the list and saves
+    it as snapshot files in the specified directory.
 
     Args:
         cgid_list (list): List of cgid values for which data will be fetched.
@@ -245,18 +499,28 @@ def save_data_for_all_cgids(cgid_list,
         prefv1 (str): The value corresponding to the prefn1 filter.
         sz (int): The number of items to fetch per request.
         base_url (str): The base URL for fetching data.
-        base_path (str): The directory where the CSV files will be saved. Defaults to "data".
+        base_path (str): The directory where the snapshot files will be
+            saved. Defaults to "data".
+        max_workers (int): Number of cgids fetched concurrently. Defaults
+            to 4.
+        pool_size (int): Size of the keep-alive connection pool. Defaults
+            to the session's.
+        host_concurrency (int): Maximum requests in flight to Auchan across
+            all cgids.
+        parse_workers (int): Number of parser processes. Defaults to
+            parsing in the fetcher threads.
+        page_cache (page_cache.PageCache): Conditional fetching and reuse of
+            unchanged pages.
+        checkpoints (checkpoint.CheckpointJournal): Journal of completed
+            pages and cgids; a run restarted on the same day resumes where
+            it stopped.
     """
     # Create a timestamp for unique filenames and logging
     timestamp = datetime.now().strftime("%Y%m%d")
-
-    # Set up logging
-    log_directory = "logs"
-    os.makedirs(log_directory, exist_ok=True)
-    log_path = os.path.join(log_directory, f"auchan_{timestamp}.log")
-    logger = setup_logger(log_path)
+    logger = run_logger(timestamp)
 
     logger.info(f"Starting data fetch process for {len(cgid_list)} cgids")
+    start_run(pool_size, host_concurrency, page_cache)
 
     # Ensure the base path exists; if not, create it
     if not os.path.exists(base_path):
@@ -268,34 +532,22 @@ def save_data_for_all_cgids(cgid_list,
     os.makedirs(data_directory, exist_ok=True)
     logger.info(f"Data will be saved in '{data_directory}'")
 
-    # Loop through each cgid and fetch & save the corresponding data
-    for cgid in cgid_list:
-        logger.info(f"Processing cgid: {cgid}")
-
-        try:
-            # Fetch and parse the data for the given cgid
-            final_data = get_and_parse_auchan_data(cgid, prefn1, prefv1, sz, base_url, logger)
-            final_data["source"] = "auchan"
-            final_data["timestamp"] = timestamp
-
-            if not final_data.empty:
-                # Create a filename with timestamp and cgid
-                filename = f"{cgid}_{timestamp}.csv"
-                file_path = os.path.join(data_directory, filename)
-
-                # Save the data to CSV
-                final_data.to_csv(file_path, index=False)
-                logger.info(f"Data for {cgid} saved to {file_path}")
-            else:
-                logger.warning(f"No data found for {cgid}. Skipping...")
-        except Exception as e:
-            logger.error(f"Error processing cgid {cgid}: {str(e)}", exc_info=True)
-
+    parse_stage = ParseStage(workers=parse_workers) if parse_workers else None
+
+    # Fetch cgids concurrently; the engine enforces the host budget
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(save_data_for_cgid, cgid, prefn1, prefv1, sz,
+                                base_url, data_directory, timestamp, logger,
+                                parse_stage, page_cache, checkpoints)
+                for cgid in cgid_list
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        if parse_stage is not None:
+            parse_stage.close()
+
+    log_run_stats(logger, page_cache)
     logger.info("Data fetch process completed")
-
-
-# List of cgid values
-# cgid_list = [
-#     "alimentacao-", "biologico-e-escolhas-alimentares",
-#     "limpeza-da-casa-e-roupa", "bebidas-e-garrafeira", "marcas-auchan"
-# ]
@@ -0,0 +1,155 @@
+"""
+Checkpoint journal for resumable scraping.
+
+Every listing page completed during a run is recorded, with its parsed
+column batch, under its (retailer, category, page) key; every category
+whose snapshot was written is marked as finished. When a category fails
+halfway and is retried, or when the whole run is restarted on the same
+day, the recorded pages are taken from the journal and only the missing
+ones are fetched, and finished categories are skipped altogether.
+
+Entries belong to a run (the day, YYYYMMDD, by default); those of earlier
+runs are dropped when the journal is opened.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    run TEXT NOT NULL,
+    retailer TEXT NOT NULL,
+    category TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    rows BLOB NOT NULL,
+    extra TEXT,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (run, retailer, category, page)
+);
+CREATE TABLE IF NOT EXISTS categories (
+    run TEXT NOT NULL,
+    retailer TEXT NOT NULL,
+    category TEXT NOT NULL,
+    path TEXT NOT NULL,
+    finished REAL NOT NULL,
+    PRIMARY KEY (run, retailer, category)
+);
+"""
+
+
+class Checkpoint:
+    """A recorded page: its column batch and extra values."""
+
+    def __init__(self, rows, extra):
+        self._rows = rows
+        self.extra = json.loads(extra) if extra else {}
+
+    @property
+    def batch(self):
+        """The recorded column batch."""
+        return json.loads(zlib.decompress(self._rows))
+
+
+class CheckpointJournal:
+    """
+    Completed pages and finished categories of the current run.
+
+    Args:
+        path (str): The SQLite file. Created on first use.
+        run (str): The run the entries belong to. Defaults to today
+            (YYYYMMDD), so that a re-run on the same day resumes.
+
+    Example:
+        >>> journal = CheckpointJournal("data/cache/checkpoints.sqlite3")
+        >>> done = journal.pages("auchan", cgid)     # {start: Checkpoint}
+        >>> journal.track(("auchan", cgid, start), batch)
+        >>> journal.finish("auchan", cgid, file_path)
+    """
+
+    def __init__(self, path="data/cache/checkpoints.sqlite3", run=None):
+        self.path = path
+        self.run = run or datetime.now().strftime("%Y%m%d")
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        # Entries of earlier runs cannot be resumed
+        self._db.execute("DELETE FROM pages WHERE run != ?", (self.run,))
+        self._db.execute("DELETE FROM categories WHERE run != ?", (self.run,))
+        self._db.commit()
+
+    def pages(self, retailer, category):
+        """Returns the recorded pages of a category, as {page: Checkpoint}."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page, rows, extra FROM pages "
+                "WHERE run = ? AND retailer = ? AND category = ?",
+                (self.run, retailer, category)).fetchall()
+        return {page: Checkpoint(data, extra) for page, data, extra in rows}
+
+    def record(self, key, batch, extra=None):
+        """Records the column batch of a completed (retailer, category,
+        page)."""
+        rows = zlib.compress(json.dumps(batch).encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.run, *key, rows, json.dumps(extra) if extra else None,
+                 time.time()))
+            self._db.commit()
+
+    def track(self, key, page):
+        """
+        Records `page` as soon as it is available and returns it unchanged.
+
+        Args:
+            key (tuple): (retailer, category, page offset or number).
+            page (dict or Future): The column batch, a Future of it (parsed
+                in a `pipeline.ParseStage`), or None for a failed page,
+                which is not recorded.
+        """
+        if isinstance(page, Future):
+            def record(done):
+                if not done.cancelled() and done.exception() is None:
+                    self.record(key, done.result())
+            page.add_done_callback(record)
+        elif page is not None:
+            self.record(key, page)
+        return page
+
+    def finished(self, retailer, category):
+        """
+        Returns the snapshot path of a category finished in this run, or
+        None if it must be (re)scraped.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path FROM categories "
+                "WHERE run = ? AND retailer = ? AND category = ?",
+                (self.run, retailer, category)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None
+        return row[0]
+
+    def finish(self, retailer, category, path):
+        """Marks a category as saved to `path` and drops its pages."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?, ?)",
+                (self.run, retailer, category, path, time.time()))
+            self._db.execute(
+                "DELETE FROM pages "
+                "WHERE run = ? AND retailer = ? AND category = ?",
+                (self.run, retailer, category))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,19 +1,58 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import pandas as pd
 import re
-import time
-import random
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from utils import retry_on_failure
+from utils import retry_on_failure, dump_debug_html
+from retry import CATEGORY_RETRY, PAGE_RETRY
 import os
 from logger import setup_logger
-
-
-def parse_total_products(html_content):
+from metrics import metrics, timed
+from http_engine import FetchError, engine
+from html_parser import parse_html, find_elements
+from pipeline import ColumnBuffer, ParseStage, rows_to_columns
+from storage import write_snapshot
+from normalize import add_prices
+from observations import write_observations
+from page_cache import PageCache, fetch_columns
+
+CONTINENTE_HOST = "www.continente.pt"
+
+CONTINENTE_HEADERS = {
+    "Accept":
+    "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding":
+    "gzip, deflate, br, zstd",
+    "Accept-Language":
+    "pt-PT,pt;q=0.8,en;q=0.5,en-US;q=0.3",
+    "Connection":
+    "keep-alive",
+    "User-Agent":
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) "
+    "Gecko/20100101 Firefox/133.0"
+}
+
+# Politeness budget shared by every category fetched in parallel; the rate
+# adapts to the site's latency and errors (see http_engine.AdaptiveThrottle)
+engine.configure_host(CONTINENTE_HOST, concurrency=4, rate=0.5, burst=2,
+                      min_rate=0.1, max_rate=2.0)
+
+# Categories scraped every run, with the grid's page size and filters
+CATEGORIES = [
+    "congelados", "frescos", "mercearias", "bebidas", "biologicos",
+    "limpeza", "higiene-beleza", "bebe"
+]
+PAGE_SIZE = 216
+PMIN = "0.01"
+SRULE = "FRESH-Peixaria"
+
+# Keep-alive pool with the cookies set by the warm-up request
+session = engine.session("continente", pool_size=4, headers=CONTINENTE_HEADERS)
+
+
+def parse_total_products(html_content, backend=None):
     # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = parse_html(html_content, backend)
 
     # Find the div with the specific class
     counter_div = soup.find(
@@ -34,98 +73,103 @@ def parse_total_products(html_content):
     return None
 
 
-def parse_product_data(html_content, cgid):
-    # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
+PRODUCT_COLUMNS = [
+    "Product Name", "Product ID", "Price", "Price per unit", "Brand",
+    "Category", "Image URL", "Minimum Quantity", "Product Link"
+]
 
-    # Find all product tiles
-    product_tiles = soup.find_all("div", class_="product-tile")
 
-    # Initialize lists to store product data
-    product_data = []
+def parse_product_tile(tile):
+    """Extracts one product row from a `div.product-tile` element."""
+    name = ""
+    product_id = ""
+    price_per_kg = 0.0
+    brand = ""
+    category = ""
 
-    # Loop through each product tile and extract data
-    for tile in product_tiles:
-        # Extract data from data-product-tile-impression JSON
-        product_info_json = tile.get("data-product-tile-impression")
-        if product_info_json:
-            try:
-                # Replace unescaped single quotes with escaped single quotes
-                product_info_json = product_info_json.replace("'", "\\'")
-                product_info = json.loads(product_info_json)
-
-                # Get product details from the JSON object
-                name = product_info.get("name", "")
-                product_id = product_info.get("id", "")
-                price_per_kg = product_info.get("price", 0.0)
-                brand = product_info.get("brand", "")
-                category = product_info.get("category", "")
-
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON: {product_info_json}")
-                name = ""
-                product_id = ""
-                price_per_kg = 0.0
-                brand = ""
-                category = ""
-
-        # Get product image URL
-        image_tag = tile.find("img", class_="ct-tile-image")
-        image_url = image_tag["data-src"] if image_tag else ""
-
-        # Get price per unit (if available)
-        price_per_unit_tag = tile.find("div",
-                                       class_="pwc-tile--price-secondary")
-        price_per_unit = price_per_unit_tag.get_text(
-            strip=True) if price_per_unit_tag else None
-
-        # Get minimum quantity information
-        min_quantity_tag = tile.find("p", class_="pwc-tile--quantity")
-        min_quantity = min_quantity_tag.get_text(
-            strip=True) if min_quantity_tag else None
-
-        # Get product link
-        product_link_tag = tile.find("a", href=True)
-        product_link = product_link_tag["href"] if product_link_tag else ""
-
-        # Append extracted data to list
-        product_data.append({
-            "Product Name": name,
-            "Product ID": product_id,
-            "Price": price_per_kg,
-            "Price per unit": price_per_unit,
-            "Brand": brand,
-            "Category": category,
-            "Image URL": image_url,
-            "Minimum Quantity": min_quantity,
-            "Product Link": product_link
-        })
-
-    # Create a DataFrame from the list of dictionaries
-    df = pd.DataFrame(product_data)
-    df["cgid"] = cgid
-    return df
+    # Extract data from data-product-tile-impression JSON
+    product_info_json = tile.get("data-product-tile-impression")
+    if product_info_json:
+        try:
+            # Replace unescaped single quotes with escaped single quotes
+            product_info_json = product_info_json.replace("'", "\\'")
+            product_info = json.loads(product_info_json)
+
+            # Get product details from the JSON object
+            name = product_info.get("name", "")
+            product_id = product_info.get("id", "")
+            price_per_kg = product_info.get("price", 0.0)
+            brand = product_info.get("brand", "")
+            category = product_info.get("category", "")
+
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON: {product_info_json}")
+
+    # Get product image URL
+    image_tag = tile.find("img", class_="ct-tile-image")
+    image_url = image_tag["data-src"] if image_tag else ""
+
+    # Get price per unit (if available)
+    price_per_unit_tag = tile.find("div",
+                                   class_="pwc-tile--price-secondary")
+    price_per_unit = price_per_unit_tag.get_text(
+        strip=True) if price_per_unit_tag else None
+
+    # Get minimum quantity information
+    min_quantity_tag = tile.find("p", class_="pwc-tile--quantity")
+    min_quantity = min_quantity_tag.get_text(
+        strip=True) if min_quantity_tag else None
+
+    # Get product link
+    product_link_tag = tile.find("a", href=True)
+    product_link = product_link_tag["href"] if product_link_tag else ""
+
+    return {
+        "Product Name": name,
+        "Product ID": product_id,
+        "Price": price_per_kg,
+        "Price per unit": price_per_unit,
+        "Brand": brand,
+        "Category": category,
+        "Image URL": image_url,
+        "Minimum Quantity": min_quantity,
+        "Product Link": product_link
+    }
+
+
+@timed("parse")
+def parse_product_columns(html_content, cgid, backend=None, encoding=None):
+    """
+    Parses a Search-UpdateGrid page into a column batch (column name ->
+    list of values). Top-level so it can run in a ParseStage worker.
+    """
+    # Raw HTML is streamed through the tile extractor; a parsed document
+    # (e.g. the first page, also used for the total count) is searched
+    product_tiles = find_elements(html_content, "div", "product-tile", backend,
+                                  encoding)
+
+    # Extract one row per product tile
+    batch = rows_to_columns(
+        (parse_product_tile(tile) for tile in product_tiles), PRODUCT_COLUMNS)
+    batch["cgid"] = [cgid] * len(batch["Product ID"])
+    return batch
+
+
+def parse_product_data(html_content, cgid, backend=None):
+    # Create a DataFrame from the column batch
+    return pd.DataFrame(parse_product_columns(html_content, cgid, backend))
 
 
 # Function to fetch a page of products with caching and retry behavior
 # @lru_cache(maxsize=None)
-@retry_on_failure(retries=3, delay=120)
-def fetch_page(start, sz, cgid, pmin, srule):
+@retry_on_failure(policy=PAGE_RETRY)
+def fetch_page(start, sz, cgid, pmin, srule, raw=False, headers=None):
+    """
+    Fetches one Search-UpdateGrid page. Returns the HTML text, or the
+    `http_engine.Response` (raw body bytes and encoding) when `raw` is True.
+    `headers` are added to the request, e.g. conditional request headers.
+    """
     url = "https://www.continente.pt/on/demandware.store/Sites-continente-Site/default/Search-UpdateGrid"
-    headers = {
-        "Accept":
-        "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Encoding":
-        "gzip, deflate, br, zstd",
-        "Accept-Language":
-        "pt-PT,pt;q=0.8,en;q=0.5,en-US;q=0.3",
-        "Connection":
-        "keep-alive",
-        "Host":
-        "www.continente.pt",
-        "User-Agent":
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) Gecko/20100101 Firefox/133.0"
-    }
     params = {
         "cgid": cgid,
         "pmin": pmin,
@@ -133,84 +177,307 @@ def fetch_page(start, sz, cgid, pmin, srule):
         "start": start,
         "sz": sz,
     }
-    response = requests.get(url, params=params, headers=headers)
-    response.raise_for_status()  # Raise an error if the request failed
+    # Raises FetchError if the request failed
+    response = session.get(url, params=params, headers=headers)
 
-    # check this
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # Sampled, opt-in dump of the raw response (see utils.dump_debug_html)
+    dump_debug_html(response.body, f"continente_{cgid}_{start}")
 
-    # Find all product tiles
-    product_tiles = soup.find_all("div", class_="product-tile")
-
-    # Initialize lists to store product data
-    product_data = []
-
-    with open('data.html', 'w') as f:
-        f.write(response.text)
-
-    return response.text
+    return response if raw else response.text
 
 
 # Main function to fetch all products for a given category
 logger = setup_logger("logs/continente_scraper.log")
 
-@retry_on_failure(retries=3, delay=360)
-def fetch_all_products_for_category(cgid, sz=216, pmin="0.01", srule="FRESH-Peixaria"):
-    logger.info(f"Starting to fetch products for category: {cgid}")
-    products = []
-    current_start = 0
-    total_products = None
 
-    while total_products is None or current_start < total_products:
-        try:
-            # Fetch the current page with caching and retry
-            html_content = fetch_page(current_start, sz, cgid, pmin, srule)
-            logger.debug(f"Fetched page for category {cgid}, start: {current_start}")
-
-            # Parse total products only on the first page load
-            if total_products is None:
-                total_products = parse_total_products(html_content)
-                if total_products is None:
-                    logger.warning(f"Failed to retrieve total products count for category {cgid}.")
-                    return pd.DataFrame(products)
-                logger.info(f"Total products for category {cgid}: {total_products}")
-
-            # Parse products from current page
-            page_products = parse_product_data(html_content, cgid)
-            products.append(page_products)
-
-            logger.info(f"Fetched {min(current_start + sz, total_products)} of {total_products} products for category {cgid}")
-
-            # Move to the next batch
-            current_start += sz
-            delay = random.randint(5, 10)
-            logger.debug(f"Waiting for {delay} seconds before next request")
-            time.sleep(delay)  # Random delay to avoid server overload
-
-        except Exception as e:
-            logger.error(f"Error fetching products for category {cgid}: {str(e)}", exc_info=True)
-            break
-
-    df = pd.concat(products)
+def fetch_products_at_offset(start, sz, cgid, pmin, srule, total_products,
+                             parse_stage=None, page_cache=None,
+                             checkpoints=None):
+    """
+    Fetches and parses the page starting at `start` into a column batch.
+    Returns None if the page could not be fetched.
+
+    With a `parse_stage` the raw page is queued for parsing in a worker
+    process and a future of its column batch is returned instead, so the
+    calling thread can go on fetching. With a `page_cache` the request is
+    conditional and an unchanged page reuses its stored rows. With a
+    `checkpoints` journal the page is recorded once parsed.
+    """
+    key = ("continente", cgid, start)
+    try:
+        page_products = fetch_columns(
+            key,
+            lambda headers: fetch_page(start, sz, cgid, pmin, srule, raw=True,
+                                       headers=headers),
+            parse_product_columns, cgid,
+            page_cache=page_cache, parse_stage=parse_stage)
+        if checkpoints is not None:
+            checkpoints.track(key, page_products)
+        logger.info(f"Fetched {min(start + sz, total_products)} of "
+                    f"{total_products} products for category {cgid}")
+        return page_products
+    except Exception as e:
+        logger.error(f"Error fetching products for category {cgid}, "
+                     f"start: {start}: {str(e)}", exc_info=True)
+        return None
+
+
+def fetch_first_page(cgid, sz=PAGE_SIZE, pmin=PMIN, srule=SRULE,
+                     page_cache=None, checkpoints=None, done=None):
+    """
+    Fetches and parses the first page of a category, which also gives the
+    total product count (and so every other `start` offset).
+
+    Args:
+        cgid (str): The category id.
+        page_cache (page_cache.PageCache): If given, an unchanged first page
+            reuses its stored rows and count.
+        checkpoints (checkpoint.CheckpointJournal): If given, the page is
+            recorded with its count.
+        done (dict): The pages checkpointed by an earlier attempt (see
+            `CheckpointJournal.pages`); a recorded first page is not fetched.
+
+    Returns:
+        tuple: (column batch, total products), or (None, None) if the page
+        has no product count.
+
+    Raises:
+        http_engine.FetchError: If the first page cannot be fetched.
+    """
+    key = ("continente", cgid, 0)
+    if done and 0 in done:
+        return done[0].batch, done[0].extra.get("total_products")
+
+    entry = page_cache.lookup(key) if page_cache is not None else None
+    try:
+        response = fetch_page(0, sz, cgid, pmin, srule, raw=True,
+                              headers=PageCache.conditional_headers(entry))
+        logger.debug(f"Fetched page for category {cgid}, start: 0")
+    except Exception as e:
+        logger.error(f"Error fetching products for category {cgid}: "
+                     f"{str(e)}", exc_info=True)
+        raise
+
+    if page_cache is not None and page_cache.reuse(key, entry, response):
+        # Unchanged first page: the stored rows and total count still hold
+        total_products = entry.extra.get("total_products")
+        first_page = entry.batch
+    else:
+        # Parse the first page once; the document feeds both the total count
+        # and the product tiles
+        with metrics.timer("parse_document"):
+            document = parse_html(response.text)
+        total_products = parse_total_products(document)
+        first_page = parse_product_columns(document, cgid)
+        if page_cache is not None and total_products is not None:
+            page_cache.store(key, response, first_page,
+                             {"total_products": total_products})
+    if total_products is None:
+        logger.warning(f"Failed to retrieve total products count for "
+                       f"category {cgid}.")
+        return None, None
+    if checkpoints is not None:
+        checkpoints.record(key, first_page, {"total_products": total_products})
+    logger.info(f"Total products for category {cgid}: {total_products}")
+    return first_page, total_products
+
+
+def collect_pages(cgid, pages, checkpoints=None):
+    """
+    Builds the category DataFrame from its pages, in offset order.
+
+    Args:
+        cgid (str): The category id.
+        pages (list): (start, page) pairs, where a page is a column batch,
+            a Future of one, or None for a page that could not be fetched.
+        checkpoints (checkpoint.CheckpointJournal): If given, a missing page
+            raises FetchError instead of returning partial data.
+
+    Returns:
+        pd.DataFrame: The products, with the tracking date and source.
+    """
+    # Pages are appended column-wise and materialised once per category
+    products = ColumnBuffer(PRODUCT_COLUMNS + ["cgid"])
+    failed = 0
+    for start, page in pages:
+        if isinstance(page, Future):
+            try:
+                page = page.result()
+            except Exception as e:
+                logger.error(f"Error parsing products for category "
+                             f"{cgid}, start: {start}: {str(e)}",
+                             exc_info=True)
+                page = None
+        if page is not None:
+            products.extend(page)
+        else:
+            failed += 1
+
+    if failed and checkpoints is not None:
+        raise FetchError(f"{failed} pages of category {cgid} failed; "
+                         f"the completed pages are checkpointed")
+
+    df = products.to_frame()
+    # "€7,08/kg" as a number and its unit
+    add_prices(df, "Price per unit", "Unit Price", "Price Unit")
     df["tracking_date"] = datetime.now().strftime("%Y-%m-%d")
     df["source"] = "Continente"
 
     logger.info(f"Completed fetching products for category {cgid}. Total products: {len(df)}")
     return df
 
-def process_and_save_categories(base_path="data/raw/continente"):
-    logger.info("Starting process_and_save_categories")
 
-    # Base URL to make requests (could be useful for fetching pages etc.)
+@retry_on_failure(policy=CATEGORY_RETRY)
+def fetch_all_products_for_category(cgid, sz=PAGE_SIZE, pmin=PMIN,
+                                    srule=SRULE, max_workers=4,
+                                    parse_stage=None, page_cache=None,
+                                    checkpoints=None):
+    """
+    Fetches every product of a category. The first page gives the total
+    product count; the remaining `start` offsets are then known up front and
+    fetched in parallel by up to `max_workers` threads, within the host's
+    concurrency budget. If a `pipeline.ParseStage` is given, those pages are
+    parsed in its worker processes. If a `page_cache.PageCache` is given,
+    pages that did not change since the last run are not parsed again.
+
+    If a `checkpoint.CheckpointJournal` is given, every completed page is
+    recorded and pages recorded by an earlier attempt are not fetched
+    again; a page that fails then raises FetchError, so that the retry
+    resumes the category instead of returning partial data.
+    """
+    logger.info(f"Starting to fetch products for category: {cgid}")
+
+    done = {}
+    if checkpoints is not None:
+        done = checkpoints.pages("continente", cgid)
+    if done:
+        logger.info(f"Resuming category {cgid}: {len(done)} pages "
+                    f"checkpointed")
+
+    first_page, total_products = fetch_first_page(
+        cgid, sz, pmin, srule, page_cache, checkpoints, done)
+    if total_products is None:
+        return pd.DataFrame()
+    logger.info(f"Fetched {min(sz, total_products)} of {total_products} "
+                f"products for category {cgid}")
+
+    # Only the offsets not checkpointed by an earlier attempt are fetched
+    offsets = range(sz, total_products, sz)
+    missing = [start for start in offsets if start not in done]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = dict(zip(missing, executor.map(
+            lambda start: fetch_products_at_offset(
+                start, sz, cgid, pmin, srule, total_products, parse_stage,
+                page_cache, checkpoints),
+            missing)))
+
+    pages = [(0, first_page)] + [
+        (start, done[start].batch if start in done else fetched[start])
+        for start in offsets]
+    return collect_pages(cgid, pages, checkpoints)
+
+
+def write_category(category, df, base_path, checkpoints=None):
+    """
+    Writes the products of a category as a snapshot file and marks it as
+    finished in the `checkpoints` journal.
+
+    Returns:
+        str: The path written, or None if there were no products.
+    """
+    if df.empty:
+        logger.warning(f"No data found for category {category}.")
+        return None
+    # Path to save the file; the format is set by storage.DEFAULT_FORMAT
+    file_path = write_snapshot(df, base_path, category,
+                               float_columns=["Price", "Unit Price"])
+    # The same rows in the schema shared by every retailer
+    write_observations(df, "continente", base_path, category)
+    if checkpoints is not None:
+        checkpoints.finish("continente", category, file_path)
+    logger.info(f"Saved data for category '{category}' to {file_path}")
+    return file_path
+
+
+def save_category(category, base_path, parse_stage=None, page_cache=None,
+                  checkpoints=None):
+    """
+    Fetches all products for a category and saves them as a snapshot file.
+
+    Args:
+        category (str): The Continente category id (cgid).
+        base_path (str): The directory where the CSV file is written.
+        parse_stage (pipeline.ParseStage): Optional process pool for parsing.
+        page_cache (page_cache.PageCache): Optional store of unchanged pages.
+        checkpoints (checkpoint.CheckpointJournal): Optional journal of
+            completed pages and categories, to resume an interrupted run.
+    """
+    if checkpoints is not None:
+        file_path = checkpoints.finished("continente", category)
+        if file_path is not None:
+            logger.info(f"Category '{category}' already saved to "
+                        f"{file_path}, skipping")
+            return
+
+    logger.info(f"Processing category: {category}")
+    try:
+        df_category_products = fetch_all_products_for_category(
+            category, parse_stage=parse_stage, page_cache=page_cache,
+            checkpoints=checkpoints)
+        write_category(category, df_category_products, base_path, checkpoints)
+    except Exception as e:
+        logger.error(f"Error processing category {category}: {str(e)}",
+                     exc_info=True)
+
+
+def start_run(pool_size=None, host_concurrency=None, page_cache=None):
+    """
+    Applies the connection settings, resets the run's counters and sends
+    the warm-up request whose cookies the grid requests reuse.
+    """
+    if pool_size is not None:
+        session.configure(pool_size=pool_size)
+    if host_concurrency is not None:
+        engine.set_host_concurrency(CONTINENTE_HOST, host_concurrency)
+    session.stats.reset()
+    if page_cache is not None:
+        page_cache.stats("continente").reset()
+
+    # Warm-up request; the session keeps its cookies for the grid requests,
+    # so it is sent even when the response cache holds a fresh copy
     initial_url = "https://www.continente.pt/"
     try:
-        requests.get(initial_url)
+        session.get(initial_url, use_cache=False)
         logger.info("Successfully hit the initial URL")
     except Exception as e:
         logger.error(f"Failed to hit initial URL: {str(e)}", exc_info=True)
 
-    # Create a timestamp for unique filenames
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def log_run_stats(page_cache=None):
+    """Logs the connection, request rate and page cache counters of the run."""
+    logger.info(f"Connection stats: {session.stats}")
+    logger.info(f"Request rate: {engine.throttle(CONTINENTE_HOST)}")
+    if page_cache is not None:
+        logger.info(f"Page cache stats: {page_cache.stats('continente')}")
+
+
+def process_and_save_categories(base_path="data/raw/continente", max_workers=4,
+                                pool_size=None, host_concurrency=None,
+                                parse_workers=None, page_cache=None,
+                                checkpoints=None, categories=None):
+    """
+    Scrapes every Continente category (`CATEGORIES` by default) into
+    `base_path`/YYYYMMDD.
+
+    With `parse_workers` set, pages after the first are parsed by that many
+    worker processes while the fetcher threads keep downloading. With a
+    `page_cache.PageCache`, unchanged pages reuse the rows of the last run.
+    With a `checkpoint.CheckpointJournal`, a run restarted on the same day
+    skips the saved categories and resumes the others where they stopped.
+    """
+    logger.info("Starting process_and_save_categories")
+    start_run(pool_size, host_concurrency, page_cache)
+
     base_path = base_path + "/" + datetime.now().strftime("%Y%m%d")
 
     # Ensure the base path exists; if not, create it
@@ -218,26 +485,19 @@ def process_and_save_categories(base_path="data/raw/continente"):
         os.makedirs(base_path)
         logger.info(f"Directory '{base_path}' created.")
 
-    # List of categories to fetch
-    CATEGORIES = [
-        "congelados", "frescos", "mercearias", "bebidas", "biologicos",
-        "limpeza", "higiene-beleza", "bebe"
-    ]
+    parse_stage = ParseStage(workers=parse_workers) if parse_workers else None
 
-    # Iterate through categories and fetch/save product data
-    for category in CATEGORIES:
-        logger.info(f"Processing category: {category}")
-        try:
-            df_category_products = fetch_all_products_for_category(category)
-
-            if not df_category_products.empty:
-                filename = f"{category}.csv"
-                file_path = os.path.join(base_path, filename)  # Path to save the file
-                df_category_products.to_csv(file_path, index=False)
-                logger.info(f"Saved data for category '{category}' to {file_path}")
-            else:
-                logger.warning(f"No data found for category {category}.")
-        except Exception as e:
-            logger.error(f"Error processing category {category}: {str(e)}", exc_info=True)
-
-    logger.info("Completed process_and_save_categories")
\ No newline at end of file
+    # Fetch categories concurrently; the engine enforces the host budget
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda category: save_category(
+                    category, base_path, parse_stage, page_cache,
+                    checkpoints),
+                categories or CATEGORIES))
+    finally:
+        if parse_stage is not None:
+            parse_stage.close()
+
+    log_run_stats(page_cache)
+    logger.info("Completed process_and_save_categories")
@@ -1,7 +1,8 @@
-from bs4 import BeautifulSoup
+from html_parser import parse_html
 
-def parse_nutritional_info(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
+
+def parse_nutritional_info(html_content, backend=None):
+    soup = parse_html(html_content, backend)
     
     # Parse reference intake
     reference_intake = soup.find('div', class_='daily-value-intake-reference')
@@ -0,0 +1,372 @@
+"""
+Incremental price-history store built from the daily snapshots.
+
+Consecutive snapshots of a retailer are almost identical, so instead of a
+full copy per day the history keeps, per retailer directory:
+
+- products.parquet: the static attributes (name, brand, category, image
+  and product URLs...) of every product ever seen, stored once per
+  product id plus a new version (with its `since` day) only when one of
+  them changes.
+- changes/<YYYYMMDD>.parquet: for each ingested day, only the products
+  whose tracked fields (prices, promotions) changed, that appeared, or
+  that were delisted (`listed` is False), together with their previous
+  values. "What changed today" is a single small file.
+- state.parquet: the latest tracked values of every product, so that a
+  new day is compared without replaying the changes.
+
+The last ingested day can be ingested again, e.g. once a restarted run has
+saved the categories that were missing: its changes, state and attribute
+versions are replaced, so no product stays wrongly delisted.
+
+`PriceHistory.snapshot(day)` rebuilds the full table of any ingested day by
+taking the latest attributes and change of each product up to that day.
+Products are keyed by (retailer, product id): a product listed under
+several categories on the same day is kept once, with the attributes of its
+first row.
+"""
+import json
+import os
+
+import pandas as pd
+
+from metrics import timed
+from normalize import add_prices
+from storage import list_days, read_snapshots, snapshot_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, but required by PriceHistory
+    pq = None
+
+# Per retailer: the product id column, the fields tracked per day, the
+# tracked fields stored as floats, the per-run columns not stored and the
+# price strings parsed into (price, unit) columns when a snapshot lacks them
+RETAILER_HISTORIES = {
+    "continente": {
+        "key": "Product ID",
+        "tracked": ["Price", "Price per unit", "Unit Price"],
+        "float_columns": ["Price", "Unit Price"],
+        "dropped": ["tracking_date", "source", "day"],
+        "prices": {"Price per unit": ("Unit Price", "Price Unit")},
+    },
+    "auchan": {
+        "key": "product_id",
+        "tracked": ["product_price", "product_promotions"],
+        "float_columns": ["product_price"],
+        "dropped": ["timestamp", "source", "day"],
+    },
+    "pingo_doce": {
+        "key": "product_id",
+        "tracked": ["product_price", "product_price_value"],
+        "float_columns": ["product_price_value"],
+        "dropped": ["timestamp", "source", "day"],
+        "prices": {"product_price": ("product_price_value",
+                                     "product_price_unit")},
+    },
+}
+
+PARQUET_COMPRESSION = "zstd"
+
+LISTED = "listed"
+SINCE = "since"
+PREVIOUS = "previous_"
+
+# Parquet metadata key of the snapshot files a day was ingested from
+SOURCES_KEY = b"sources"
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+
+def _write(df, path, metadata=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), **metadata})
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+
+
+def _differs(left, right):
+    """Element-wise inequality where two missing values are equal."""
+    return (left != right).fillna(True) & ~(left.isna() & right.isna())
+
+
+class PriceHistory:
+    """
+    Price history of one retailer, stored under `path`.
+
+    Args:
+        path (str): The retailer's history directory.
+        key (str): The product id column.
+        tracked (list): Columns whose changes are recorded per day.
+        float_columns (list): Tracked columns stored as float64.
+        dropped (list): Per-run columns that are not stored.
+        prices (dict): Price string column -> (price, unit) columns added by
+            `normalize.add_prices` to snapshots scraped without them.
+
+    Example:
+        >>> history = open_history("auchan")
+        >>> history.append(snapshot_df, "20241125")
+        >>> history.changes("20241125")    # what changed that day
+        >>> history.snapshot("20241120")   # full table of an earlier day
+    """
+
+    def __init__(self, path, key, tracked, float_columns=(), dropped=(),
+                 prices=None):
+        if pq is None:
+            raise ImportError("PriceHistory requires pyarrow")
+        self.path = path
+        self.key = key
+        self.tracked = list(tracked)
+        self.float_columns = list(float_columns)
+        self.dropped = list(dropped)
+        self.prices = prices or {}
+        self.products_path = os.path.join(path, "products.parquet")
+        self.state_path = os.path.join(path, "state.parquet")
+        self.changes_dir = os.path.join(path, "changes")
+
+    def days(self):
+        """Returns the ingested days (YYYYMMDD), oldest first."""
+        if not os.path.isdir(self.changes_dir):
+            return []
+        return sorted(os.path.splitext(name)[0]
+                      for name in os.listdir(self.changes_dir)
+                      if name.endswith(".parquet"))
+
+    def sources(self, day):
+        """
+        Returns the fingerprint of the snapshot files `day` was ingested from
+        (see `snapshot_sources`), or None if unknown.
+        """
+        path = os.path.join(self.changes_dir, f"{day}.parquet")
+        if not os.path.exists(path):
+            return None
+        metadata = pq.read_schema(path).metadata or {}
+        sources = metadata.get(SOURCES_KEY)
+        return sources.decode() if sources is not None else None
+
+    def _replay(self, days):
+        """
+        The latest tracked values and `listed` flag of every product after
+        `days`, from their change files, or None if there are none.
+        """
+        if not days:
+            return None
+        columns = [self.key] + self.tracked + [LISTED]
+        paths = [os.path.join(self.changes_dir, f"{d}.parquet") for d in days]
+        # Days ingested before a field was tracked lack its column
+        changes = pd.concat(
+            [pq.read_table(path, columns=[c for c in columns
+                                          if c in pq.read_schema(path).names])
+             .to_pandas() for path in paths],
+            ignore_index=True)
+        return changes.drop_duplicates(subset=self.key, keep="last")
+
+    def _rollback(self, day):
+        """
+        Undoes the ingestion of the last day `day`: its attribute versions,
+        state and changes. The state is rebuilt from the earlier days, so an
+        interrupted rollback can simply be run again.
+        """
+        state = self._replay([d for d in self.days() if d < day])
+        if state is None:
+            for path in (self.products_path, self.state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            products = _read(self.products_path)
+            _write(products[products[SINCE] < day], self.products_path)
+            for column in self.tracked:
+                if column in state.columns:
+                    dtype = ("float64" if column in self.float_columns
+                             else "string")
+                    state[column] = state[column].astype(dtype)
+            state[LISTED] = state[LISTED].astype(bool)
+            _write(state.reset_index(drop=True), self.state_path)
+        os.remove(os.path.join(self.changes_dir, f"{day}.parquet"))
+
+    def _normalize(self, df):
+        """One row per product, with stable dtypes across CSV and Parquet."""
+        df = df.drop(columns=[c for c in self.dropped if c in df.columns])
+        for column, (price_column, unit_column) in self.prices.items():
+            if column in df.columns and price_column not in df.columns:
+                add_prices(df, column, price_column, unit_column)
+        df = df.dropna(subset=[self.key])
+        df[self.key] = df[self.key].astype("string")
+        df = df.drop_duplicates(subset=self.key, keep="first")
+        for column in df.columns:
+            if column in self.float_columns:
+                df[column] = pd.to_numeric(
+                    df[column], errors="coerce").astype("float64")
+            elif column != self.key:
+                df[column] = df[column].astype("string")
+        for column in self.tracked:
+            if column not in df.columns:
+                dtype = ("float64" if column in self.float_columns
+                         else "string")
+                df[column] = pd.Series(dtype=dtype, index=df.index)
+        return df.reset_index(drop=True)
+
+    def append(self, df, day, sources=None):
+        """
+        Ingests the snapshot of `day` (every category of the retailer).
+
+        Days must be appended in order; the last ingested day replaces its
+        earlier ingestion, and an earlier day raises ValueError.
+
+        Args:
+            df (pd.DataFrame): The day's snapshot rows.
+            day (str): The day, as YYYYMMDD.
+            sources (str): Fingerprint of the snapshot files `df` was read
+                from, stored with the day (see `sources`).
+
+        Returns:
+            pd.DataFrame: The rows written for the day (see `changes`).
+        """
+        days = self.days()
+        if days and day < days[-1]:
+            raise ValueError(f"Day {day} is before the last ingested "
+                             f"day {days[-1]}")
+        if days and day == days[-1]:
+            self._rollback(day)
+
+        os.makedirs(self.changes_dir, exist_ok=True)
+        current = self._normalize(df)
+        static = [c for c in current.columns
+                  if c not in self.tracked and c != self.key]
+
+        # Static attributes: a new version for new or modified products
+        products = _read(self.products_path)
+        incoming = current[[self.key] + static].assign(**{SINCE: day})
+        if products is not None:
+            latest = products.drop_duplicates(subset=self.key, keep="last")
+            merged = incoming.merge(latest, on=self.key, how="left",
+                                    suffixes=("", "_latest"), indicator=True)
+            modified = merged["_merge"] == "left_only"
+            for column in static:
+                if column + "_latest" in merged.columns:
+                    modified |= _differs(merged[column],
+                                         merged[column + "_latest"])
+            incoming = pd.concat([products, incoming[modified.to_numpy()]],
+                                 ignore_index=True)
+        _write(incoming, self.products_path)
+
+        # Tracked fields: compare against the latest state
+        state = _read(self.state_path)
+        current = current[[self.key] + self.tracked].assign(**{LISTED: True})
+        if state is None:
+            state = current.iloc[:0]
+        for column in self.tracked:
+            # Tracked since a later version: unknown before today
+            if column not in state.columns:
+                state[column] = current[column].iloc[:0].reindex(state.index)
+        merged = current.merge(state, on=self.key, how="left",
+                               suffixes=("", "_state"), indicator=True)
+        was_listed = merged[LISTED + "_state"].fillna(False).astype(bool)
+        changed = (merged["_merge"] == "left_only") | ~was_listed
+        for column in self.tracked:
+            changed |= _differs(merged[column], merged[column + "_state"])
+        updates = merged[changed]
+        previous = {PREVIOUS + column: updates[column + "_state"]
+                    for column in self.tracked}
+        updates = updates[[self.key] + self.tracked + [LISTED]].assign(
+            **previous)
+
+        # Products listed before but missing from today's snapshot
+        delisted = state[state[LISTED]
+                         & ~state[self.key].isin(current[self.key])]
+        delisted = delisted.assign(
+            **{PREVIOUS + column: delisted[column] for column in self.tracked},
+            **{LISTED: False})
+
+        changes = pd.concat([updates, delisted], ignore_index=True)
+        metadata = ({SOURCES_KEY: sources.encode()} if sources is not None
+                    else None)
+        _write(changes, os.path.join(self.changes_dir, f"{day}.parquet"),
+               metadata)
+
+        state = pd.concat([state[~state[self.key].isin(changes[self.key])],
+                           changes[[self.key] + self.tracked + [LISTED]]],
+                          ignore_index=True)
+        _write(state, self.state_path)
+        return changes
+
+    def changes(self, day):
+        """
+        Returns what changed on `day`: one row per product that appeared,
+        changed a tracked field (with its `previous_` value) or was
+        delisted (`listed` is False).
+        """
+        return _read(os.path.join(self.changes_dir, f"{day}.parquet"))
+
+    def snapshot(self, day):
+        """
+        Rebuilds the full snapshot of `day`: every product listed that day
+        with its static attributes and that day's tracked values.
+        """
+        latest = self._replay([d for d in self.days() if d <= day])
+        if latest is None:
+            raise ValueError(f"No history at or before {day}")
+        latest = latest[latest[LISTED]].drop(columns=LISTED)
+        products = _read(self.products_path)
+        products = products[products[SINCE] <= day]
+        products = products.drop_duplicates(subset=self.key, keep="last")
+        return products.drop(columns=SINCE).merge(latest, on=self.key,
+                                                  how="inner")
+
+
+def snapshot_sources(base_path, day):
+    """
+    Fingerprint of the snapshot files of `day` in a retailer directory: the
+    file names and sizes, which change when a restarted run saves more
+    categories.
+    """
+    return json.dumps([(os.path.basename(path), os.path.getsize(path))
+                       for _, path in snapshot_files(base_path, days=[day])])
+
+
+def open_history(retailer, base_path="data/history"):
+    """Returns the PriceHistory of a retailer in RETAILER_HISTORIES."""
+    return PriceHistory(os.path.join(base_path, retailer),
+                        **RETAILER_HISTORIES[retailer])
+
+
+@timed("history")
+def update_history(retailer, raw_path="data/raw", history_path="data/history",
+                   logger=None):
+    """
+    Ingests the snapshot days of a retailer not yet in its history, and
+    ingests the last one again if its snapshot files changed since (a
+    restarted run saved the categories that were missing).
+
+    Args:
+        retailer (str): A key of RETAILER_HISTORIES (also the raw directory).
+        raw_path (str): Root of the raw snapshots.
+        history_path (str): Root of the histories.
+        logger (logging.Logger): Optional logger for progress messages.
+
+    Returns:
+        list: The days ingested.
+    """
+    history = open_history(retailer, history_path)
+    base_path = os.path.join(raw_path, retailer)
+    ingested = history.days()
+    last = ingested[-1] if ingested else ""
+    new_days = [day for day in list_days(base_path)
+                if day > last or (day == last and history.sources(day)
+                                  != snapshot_sources(base_path, day))]
+    for day in new_days:
+        snapshot = read_snapshots(base_path, days=[day])
+        changes = history.append(snapshot, day,
+                                 snapshot_sources(base_path, day))
+        if logger is not None:
+            logger.info(f"History {retailer} {day}: {len(snapshot)} rows, "
+                        f"{len(changes)} changes")
+    return new_days
@@ -0,0 +1,270 @@
+"""
+Pluggable HTML parsing backends for the retailer parsers.
+
+The parsers are written against the small subset of the BeautifulSoup `Tag`
+API they need (`find`, `find_all`, `get`, `tag[attr]`, `text`, `get_text`
+and `find_next_sibling`). `parse_html` returns a document exposing that API
+from one of the following backends:
+
+- "html.parser": BeautifulSoup with Python's built-in parser (pure Python).
+- "lxml": lxml's C parser wrapped in `LxmlNode`, several times faster and
+  producing the same output column for column.
+
+The default backend is "lxml" when it is installed, and can be overridden
+with the SCRAPER_PARSER environment variable.
+
+`iter_elements` is the streaming counterpart of `find_all`: it only builds
+the subtrees of the requested elements (e.g. the product tiles) and yields
+each one as soon as it is complete, while the body is still being fed in
+chunks. Everything outside the matches (headers, menus, scripts) is
+discarded as it goes, keeping peak memory per page low.
+"""
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional; fall back to html.parser
+    lxml = None
+
+BACKENDS = ["html.parser"] + (["lxml"] if lxml is not None else [])
+
+DEFAULT_BACKEND = os.getenv("SCRAPER_PARSER",
+                            "lxml" if lxml is not None else "html.parser")
+
+# Elements whose content BeautifulSoup leaves out of `get_text`
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+_xpath_cache = {}
+
+
+def _xpath(tag, class_, attrs):
+    """Builds (and caches) the XPath equivalent of a bs4 `find_all` query."""
+    key = (tag, class_ is not None and " " in class_, class_ is not None,
+           tuple(sorted((name, value is True)
+                        for name, value in attrs.items())))
+    xpath = _xpath_cache.get(key)
+    if xpath is None:
+        predicates = []
+        if class_ is not None:
+            if " " in class_:
+                # bs4 matches a multi-class string against the whole attribute
+                predicates.append("@class=$class_")
+            else:
+                predicates.append(
+                    "contains(concat(' ', normalize-space(@class), ' '), "
+                    "concat(' ', $class_, ' '))")
+        for i, (name, value) in enumerate(sorted(attrs.items())):
+            if value is True:
+                predicates.append(f"@{name}")
+            else:
+                predicates.append(f"@{name}=$attr{i}")
+        query = ".//" + (tag or "*") + "".join(f"[{p}]" for p in predicates)
+        xpath = _xpath_cache[key] = etree.XPath(query)
+    return xpath
+
+
+class LxmlNode:
+    """
+    Wraps an lxml element with the BeautifulSoup-compatible API used by the
+    parsers.
+    """
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    def find_all(self, name=None, class_=None, **attrs):
+        variables = {f"attr{i}": value
+                     for i, (_, value) in enumerate(sorted(attrs.items()))
+                     if value is not True}
+        if class_ is not None:
+            variables["class_"] = class_
+        matches = _xpath(name, class_, attrs)(self.element, **variables)
+        return [LxmlNode(element) for element in matches]
+
+    def find(self, name=None, class_=None, **attrs):
+        matches = self.find_all(name, class_, **attrs)
+        return matches[0] if matches else None
+
+    def find_next_sibling(self, name=None):
+        for sibling in self.element.itersiblings():
+            if isinstance(sibling.tag, str) and name in (None, sibling.tag):
+                return LxmlNode(sibling)
+        return None
+
+    def get(self, key, default=None):
+        return self.element.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.element.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def _strings(self, element=None):
+        element = self.element if element is None else element
+        if element.text and element.tag not in _SKIPPED_TEXT_TAGS:
+            yield element.text
+        for child in element:
+            # Comments and processing instructions have a non-str tag
+            if isinstance(child.tag, str):
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def get_text(self, separator="", strip=False):
+        strings = self._strings()
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+
+def _parse_lxml(html_content):
+    if isinstance(html_content, str) and not html_content.strip():
+        html_content = "<html></html>"
+    try:
+        document = lxml.html.document_fromstring(html_content)
+    except etree.ParserError:
+        document = lxml.html.document_fromstring("<html></html>")
+    return LxmlNode(document)
+
+
+def parse_html(html_content, backend=None):
+    """
+    Parses an HTML document with the selected backend.
+
+    Already parsed documents are returned unchanged, so a response parsed
+    once can be handed to several parsers (e.g. the total-count and the
+    product tile extraction) without being parsed again.
+
+    Args:
+        html_content (str or bytes): The raw HTML, or a parsed document.
+        backend (str): One of BACKENDS. Defaults to DEFAULT_BACKEND.
+
+    Returns:
+        A BeautifulSoup-compatible document object.
+    """
+    if not isinstance(html_content, (str, bytes)):
+        return html_content
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml":
+        return _parse_lxml(html_content)
+    if backend == "html.parser":
+        return BeautifulSoup(html_content, "html.parser")
+    raise ValueError(f"Unknown parser backend: {backend}")
+
+
+def _has_class(element, class_):
+    if class_ is None:
+        return True
+    classes = element.get("class")
+    if classes is None or class_ not in classes:
+        return False
+    if " " in class_:
+        return classes == class_
+    return class_ in classes.split()
+
+
+def _release(element):
+    """
+    Frees a finished match together with everything parsed before it: the
+    preceding siblings of the element and of each of its ancestors are all
+    complete by the time the element's closing tag is read.
+    """
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    while parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+        element, parent = parent, parent.getparent()
+
+
+def _iter_lxml(chunks, name, class_, encoding):
+    parser = etree.HTMLPullParser(events=("end",), tag=name,
+                                  encoding=encoding)
+
+    def matches():
+        for _, element in parser.read_events():
+            if _has_class(element, class_):
+                yield LxmlNode(element)
+                _release(element)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from matches()
+    parser.close()
+    yield from matches()
+
+
+def _iter_strained(chunks, name, class_, encoding):
+    html_content = "".join(
+        chunk.decode(encoding or "utf-8", errors="replace")
+        if isinstance(chunk, bytes) else chunk for chunk in chunks)
+
+    def class_matches(value):
+        # Called with the raw attribute string while parsing
+        if class_ is None:
+            return True
+        if value is None:
+            return False
+        if not isinstance(value, str):
+            value = " ".join(value)
+        return value == class_ if " " in class_ else class_ in value.split()
+
+    strainer = SoupStrainer(
+        name, attrs={"class": class_matches} if class_ else {})
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=strainer)
+    yield from soup.find_all(name, class_=class_)
+
+
+def iter_elements(chunks, name, class_=None, backend=None, encoding=None):
+    """
+    Yields the elements matching `name` and `class_` without building the
+    rest of the page.
+
+    With the lxml backend the chunks are fed to a pull parser and each match
+    is yielded as soon as its closing tag has been read. A yielded node is
+    only valid until the generator is resumed, so extract what you need
+    from it straight away. The html.parser backend restricts the tree to the
+    matches with a SoupStrainer, but needs the whole body first. Matches are
+    assumed not to be nested inside each other.
+
+    Args:
+        chunks (iterable): Pieces of the body (str or bytes), e.g. a single
+            string or the chunks of a streamed response.
+        name (str): The tag name to match.
+        class_ (str): The class to match, with find_all semantics.
+        backend (str): One of BACKENDS. Defaults to DEFAULT_BACKEND.
+        encoding (str): Encoding of byte chunks. Defaults to detection.
+
+    Yields:
+        The matching elements, as BeautifulSoup-compatible nodes.
+    """
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml":
+        return _iter_lxml(chunks, name, class_, encoding)
+    if backend == "html.parser":
+        return _iter_strained(chunks, name, class_, encoding)
+    raise ValueError(f"Unknown parser backend: {backend}")
+
+
+def find_elements(html_content, name, class_=None, backend=None,
+                  encoding=None):
+    """
+    `find_all` over a parsed document, or `iter_elements` over raw HTML so
+    that only the matching elements are ever built.
+    """
+    if isinstance(html_content, (str, bytes)):
+        return iter_elements(html_content, name, class_, backend, encoding)
+    return html_content.find_all(name, class_=class_)
@@ -0,0 +1,790 @@
+"""
+Shared asynchronous HTTP engine used by every retailer scraper.
+
+The engine owns a single asyncio event loop running in a background thread
+and an aiohttp client session. Each host gets its own concurrency budget
+(a semaphore) and a token-bucket rate limit, so pages of different
+categories can be fetched at the same time while the total request rate
+towards a retailer stays polite.
+
+Retailer modules keep their blocking call style: `engine.get(...)` submits
+the request to the background loop and waits for the result, so it can be
+called from any number of worker threads. `engine.get_many(...)` fans a
+batch of requests out concurrently and returns the responses in order.
+
+Each retailer should open its own `RetailerSession` with `engine.session()`:
+a keep-alive connection pool with its own cookie jar and default headers,
+plus counters of new handshakes versus reused connections.
+
+A host configured with a `max_rate` gets an `AdaptiveThrottle` (AIMD):
+its rate grows additively while responses stay fast and successful, and
+is cut multiplicatively on 429/5xx, network errors or latency spikes.
+`engine.throttle(host)` exposes the current rate.
+
+Every host also has a `CircuitBreaker`: after a run of consecutive
+failures (network errors, 429 or 5xx) requests to it fail fast with
+`CircuitOpen` for a cooldown period, whichever function or retry loop
+issued them.
+
+Requests, bytes, latencies and rate-limit waits are recorded in the run's
+`metrics.metrics` registry.
+
+`engine.set_host_override(...)` (or the SCRAPER_HOST_OVERRIDE environment
+variable) sends every request to another server, e.g. a local mock of the
+retailers, while keeping the per-host budgets of the real hosts.
+
+`engine.configure_cache(...)` puts a `response_cache.ResponseCache` in
+front of the network: fresh entries are served without a request (unless
+the request is sent with `use_cache=False`), and in replay mode every
+request is answered from the cache, with `CacheMiss` raised for anything
+that was never recorded.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+from metrics import metrics
+from response_cache import ResponseCache, request_key
+
+try:
+    from aiohttp.compression_utils import HAS_BROTLI, HAS_ZSTD
+except ImportError:  # older aiohttp releases
+    HAS_BROTLI, HAS_ZSTD = False, False
+
+# Base URL that every request is sent to instead of the retailers' hosts,
+# e.g. a local mock server (see benchmarks/mock_retailers.py)
+HOST_OVERRIDE = os.getenv("SCRAPER_HOST_OVERRIDE")
+
+# Content encodings the client is able to decode
+SUPPORTED_ENCODINGS = ["gzip", "deflate"] + (["br"] if HAS_BROTLI else []) \
+    + (["zstd"] if HAS_ZSTD else [])
+
+# Packages that give aiohttp the optional decoders
+DECODER_PACKAGES = {"br": "Brotli", "zstd": "backports.zstd (Python < 3.14)"}
+
+logger = logging.getLogger(__name__)
+
+# Encodings already warned about, so each is only logged once per process
+_dropped_encodings = set()
+
+
+def supported_accept_encoding(value):
+    """
+    Drops the encodings we cannot decode from an Accept-Encoding value, so
+    that a server never answers with a body we are unable to read. Each
+    dropped encoding is logged once as a warning.
+    """
+    encodings = [enc.strip() for enc in value.split(",")]
+    for enc in encodings:
+        name = enc.split(";")[0].strip()
+        if name not in SUPPORTED_ENCODINGS and name not in _dropped_encodings:
+            _dropped_encodings.add(name)
+            package = DECODER_PACKAGES.get(name)
+            hint = f"; install {package} to enable it" if package else ""
+            logger.warning(f"Not advertising the '{name}' content encoding, "
+                           f"aiohttp cannot decode it{hint}")
+    return ", ".join(enc for enc in encodings
+                     if enc.split(";")[0].strip() in SUPPORTED_ENCODINGS)
+
+
+class FetchError(Exception):
+    """
+    Raised when a request fails at the network level or returns an
+    error status code.
+
+    Attributes:
+        url (str): The requested URL.
+        status (int): The HTTP status code, or None for network errors.
+        headers (dict): The response headers, if a response was received.
+    """
+
+    def __init__(self, message, url=None, status=None, headers=None):
+        super().__init__(message)
+        self.url = url
+        self.status = status
+        self.headers = headers or {}
+
+
+class CacheMiss(FetchError):
+    """Raised in replay mode for a request that is not in the cache."""
+
+
+class CircuitOpen(FetchError):
+    """Raised without a request while a host's circuit breaker is open."""
+
+
+# Statuses that count as a server-side failure for the circuit breaker
+FAILURE_STATUSES = {429}
+
+
+class Response:
+    """
+    A fully read HTTP response.
+
+    Attributes:
+        url (str): The final URL of the request.
+        status (int): The HTTP status code.
+        headers (dict): The response headers.
+        body (bytes): The raw (decoded) response body.
+        elapsed (float): Seconds between sending the request and reading
+            the last byte of the body.
+    """
+
+    def __init__(self, url, status, headers, body, elapsed, encoding=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket allowing `rate` requests per second on average and
+    bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        """Changes the rate; tokens earned so far are kept."""
+        self._refill()
+        self.rate = float(rate)
+
+    async def acquire(self):
+        """
+        Waits until a token is available and consumes it.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= 1
+        return waited
+
+
+class AdaptiveThrottle:
+    """
+    AIMD control of a host's request rate.
+
+    Every healthy response adds `increase / rate` requests per second, so
+    the rate climbs by about `increase` per second of traffic, up to
+    `max_rate`. A failure (429, 5xx, network error) or a latency spike
+    (more than `latency_factor` times the moving average) multiplies it by
+    `decrease`, down to `min_rate`, at most once per `hold` seconds so that
+    the requests already in flight do not cut it several times.
+
+    Args:
+        bucket (TokenBucket): The host's token bucket, whose rate is set.
+        min_rate (float): Lowest rate, in requests per second.
+        max_rate (float): Highest rate, in requests per second.
+    """
+
+    def __init__(self, bucket, min_rate, max_rate, increase=0.05,
+                 decrease=0.5, latency_factor=3.0, hold=2.0):
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.hold = hold
+        self.latency = None
+        self.samples = 0
+        self.decreases = 0
+        self.peak_rate = bucket.rate
+        self._decreased_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def record(self, latency, failed=False):
+        """Adjusts the rate after a response that took `latency` seconds."""
+        with self._lock:
+            spike = (self.samples >= 5 and
+                     latency > self.latency_factor * self.latency)
+            self.latency = latency if self.latency is None \
+                else 0.9 * self.latency + 0.1 * latency
+            self.samples += 1
+
+            if failed or spike:
+                now = time.monotonic()
+                if (self._decreased_at is None
+                        or now - self._decreased_at >= self.hold):
+                    self._decreased_at = now
+                    self.decreases += 1
+                    self.bucket.set_rate(max(self.min_rate,
+                                             self.rate * self.decrease))
+            else:
+                rate = min(self.max_rate,
+                           self.rate + self.increase / self.rate)
+                self.bucket.set_rate(rate)
+                self.peak_rate = max(self.peak_rate, rate)
+
+    def as_dict(self):
+        return {
+            "rate": self.rate,
+            "peak_rate": self.peak_rate,
+            "decreases": self.decreases,
+            "latency": self.latency,
+        }
+
+    def __str__(self):
+        latency = f"{self.latency:.2f}s" if self.latency is not None else "n/a"
+        return (f"{self.rate:.2f} req/s (peak {self.peak_rate:.2f}, "
+                f"{self.decreases} decreases, latency {latency})")
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a failing host.
+
+    After `threshold` consecutive failures the breaker opens and `allow`
+    refuses every request for `cooldown` seconds. It then lets a single
+    trial request through (half-open): a success closes it again, a
+    failure reopens it for another cooldown.
+    """
+
+    def __init__(self, threshold=5, cooldown=120.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return False
+            # A trial that never reported back is replaced after a cooldown
+            if (self.trial_at is not None
+                    and now - self.trial_at < self.cooldown):
+                return False
+            self.trial_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_at = None
+
+    def retry_in(self):
+        """Seconds until the breaker lets a trial request through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+class HostLimits:
+    """
+    Politeness budget for a single host.
+
+    Args:
+        concurrency (int): Maximum number of requests in flight at once.
+        rate (float): Average requests per second, or None for no limit.
+        burst (int): Number of requests allowed back to back before the
+            rate limit kicks in.
+        min_rate (float): With `max_rate`, the rate adapts (see
+            `AdaptiveThrottle`) between these bounds, starting at `rate`.
+        max_rate (float): Highest adaptive rate, or None for a fixed rate.
+    """
+
+    def __init__(self, concurrency=4, rate=1.0, burst=1, min_rate=None,
+                 max_rate=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+
+class ConnectionStats:
+    """
+    Counts new TCP/TLS connections (handshakes) versus pooled connections
+    reused by a session.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.handshakes = 0
+        self.reused = 0
+        self.requests = 0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "handshakes": self.handshakes,
+            "reused": self.reused,
+        }
+
+    def __str__(self):
+        return (f"{self.requests} requests, {self.handshakes} handshakes, "
+                f"{self.reused} reused connections")
+
+
+class RetailerSession:
+    """
+    Keep-alive connection pool for a single retailer.
+
+    All requests made through the session share its TCP connector (so
+    connections are reused instead of paying a new TCP+TLS handshake per
+    page), its cookie jar and its default headers.
+
+    Args:
+        engine (FetchEngine): The engine running the requests.
+        name (str): Name of the retailer, used in logs.
+        pool_size (int): Maximum number of pooled connections.
+        headers (dict): Default headers sent with every request.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+    """
+
+    def __init__(self, engine, name, pool_size=8, headers=None,
+                 keepalive_timeout=30):
+        self.engine = engine
+        self.name = name
+        self.pool_size = pool_size
+        self.headers = dict(headers or {})
+        self.keepalive_timeout = keepalive_timeout
+        self.stats = ConnectionStats()
+        self.cookie_jar = None
+        self._client = None
+
+    def _trace_config(self):
+        async def on_create(session, context, params):
+            self.stats.handshakes += 1
+
+        async def on_reuse(session, context, params):
+            self.stats.reused += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def client(self):
+        """Returns the underlying aiohttp session, creating it on first use."""
+        if self._client is None:
+            headers = dict(self.headers)
+            if "Accept-Encoding" in headers:
+                headers["Accept-Encoding"] = supported_accept_encoding(
+                    headers["Accept-Encoding"])
+            if self.cookie_jar is None:
+                self.cookie_jar = aiohttp.CookieJar()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout)
+            self._client = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=self.cookie_jar,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.engine.timeout),
+                trace_configs=[self._trace_config()])
+        return self._client
+
+    def configure(self, pool_size=None, headers=None):
+        """
+        Changes the pool size and/or default headers. The connection pool is
+        rebuilt on the next request; cookies are kept.
+        """
+        if pool_size is not None:
+            self.pool_size = pool_size
+        if headers is not None:
+            self.headers = dict(headers)
+        if self._client is not None:
+            self.engine._run(self._client.close())
+            self._client = None
+
+    def get(self, url, params=None, headers=None, use_cache=True):
+        """Blocking GET through the session's connection pool."""
+        return self.engine._run(
+            self.engine.fetch(url, params=params, headers=headers,
+                              session=self, use_cache=use_cache))
+
+    def get_many(self, requests, return_exceptions=False):
+        """Fetches a batch of requests concurrently through the session."""
+        return self.engine.get_many(
+            [dict(request, session=self) for request in requests],
+            return_exceptions=return_exceptions)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class _HostState:
+    def __init__(self, limits):
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(limits.concurrency)
+        self.bucket = (TokenBucket(limits.rate, limits.burst)
+                       if limits.rate else None)
+        self.throttle = None
+        if self.bucket is not None and limits.max_rate:
+            self.throttle = AdaptiveThrottle(
+                self.bucket, limits.min_rate or limits.rate / 10,
+                limits.max_rate)
+
+    def record(self, latency, failed=False):
+        if self.throttle is not None:
+            self.throttle.record(latency, failed)
+
+
+class FetchEngine:
+    """
+    Concurrent, rate-limited HTTP client shared by the scrapers.
+
+    Args:
+        default_limits (HostLimits): Budget used for hosts that were not
+            configured explicitly.
+        timeout (float): Total timeout for a single request, in seconds.
+    """
+
+    def __init__(self, default_limits=None, timeout=60):
+        self.default_limits = default_limits or HostLimits()
+        self.timeout = timeout
+        self._limits = {}
+        self._hosts = {}
+        self._breakers = {}
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._sessions = {}
+        self._start_lock = threading.Lock()
+        self.cache = None
+        self.host_override = HOST_OVERRIDE
+
+    def session(self, name, pool_size=8, headers=None):
+        """
+        Returns the pooled session registered under `name`, creating it on
+        first use.
+
+        Args:
+            name (str): Name of the retailer.
+            pool_size (int): Maximum number of pooled connections.
+            headers (dict): Default headers sent with every request.
+
+        Returns:
+            RetailerSession: The retailer's session.
+        """
+        session = self._sessions.get(name)
+        if session is None:
+            session = self._sessions[name] = RetailerSession(
+                self, name, pool_size=pool_size, headers=headers)
+        return session
+
+    def configure_cache(self, directory, ttl=None, max_bytes=None,
+                        replay=False, run=None):
+        """
+        Serves responses from an on-disk `ResponseCache` (see
+        `response_cache`). Successful responses fetched from the network
+        are added to it.
+
+        Args:
+            directory (str): The cache directory.
+            ttl (float): Seconds a cached response is reused.
+            max_bytes (int): Size limit of the cache.
+            replay (bool): Never use the network; a request that is not
+                cached raises CacheMiss.
+            run (str): The recorded day (YYYYMMDD) to use, see
+                `ResponseCache`.
+
+        Returns:
+            ResponseCache: The cache, also available as `engine.cache`.
+        """
+        self.cache = ResponseCache(directory, ttl=ttl, max_bytes=max_bytes,
+                                   replay=replay, run=run)
+        return self.cache
+
+    def set_host_override(self, base_url):
+        """
+        Sends every request to `base_url` (scheme and host, e.g.
+        "http://127.0.0.1:8080") instead of the URL's own host, keeping its
+        path and query; None restores the real hosts. Limits, breakers and
+        the response cache still apply per original host and URL.
+        """
+        self.host_override = base_url
+
+    def _target(self, url):
+        """The URL actually requested, after the host override."""
+        if not self.host_override:
+            return url
+        parts = urlsplit(url)
+        base = urlsplit(self.host_override)
+        return urlunsplit((base.scheme, base.netloc, parts.path, parts.query,
+                           parts.fragment))
+
+    def _cached(self, url, params, use_cache=True):
+        """
+        The cached Response of a request, or None if it must be fetched.
+        With `use_cache` False only a replay run answers from the cache.
+        """
+        if self.cache is None or not (use_cache or self.cache.replay):
+            return None
+        key = request_key(url, params)
+        entry = self.cache.get(key)
+        if entry is None:
+            if self.cache.replay:
+                raise CacheMiss(f"{key} is not in the replay cache", url=url)
+            return None
+        metrics.count("cache_hits")
+        metrics.count("pages")
+        return Response(*entry[:4], 0.0, entry[4])
+
+    def _store(self, url, params, response):
+        if self.cache is not None and response.status < 300:
+            self.cache.put(request_key(url, params), response.url,
+                           response.status, response.headers, response.body,
+                           response.encoding)
+
+    def configure_host(self, host, concurrency=4, rate=1.0, burst=1,
+                       min_rate=None, max_rate=None):
+        """
+        Sets the concurrency and rate budget for a host. Takes effect for
+        requests issued after the call. With `max_rate` the rate adapts to
+        the host's health between `min_rate` and `max_rate`.
+        """
+        self._limits[host] = HostLimits(concurrency, rate, burst, min_rate,
+                                        max_rate)
+        self._hosts.pop(host, None)
+
+    def set_host_concurrency(self, host, concurrency):
+        """Changes a host's concurrency cap, keeping its rate limit."""
+        limits = self._limits.get(host, self.default_limits)
+        self.configure_host(host, concurrency, limits.rate, limits.burst,
+                            limits.min_rate, limits.max_rate)
+
+    def host_limits(self, host):
+        """Returns the `HostLimits` of a host (the default ones if not
+        configured)."""
+        return self._limits.get(host, self.default_limits)
+
+    def throttle(self, host):
+        """
+        Returns the `AdaptiveThrottle` of a host (its `rate` is the current
+        request rate), or None if the host has a fixed rate or was not used.
+        """
+        state = self._hosts.get(host)
+        return state.throttle if state is not None else None
+
+    def breaker(self, host):
+        """Returns the `CircuitBreaker` of a host, kept across engine
+        restarts."""
+        with self._start_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker()
+            return breaker
+
+    def _check_breaker(self, url, host):
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpen(f"Circuit open for {host}, retry in "
+                              f"{breaker.retry_in():.0f}s: {url}", url=url)
+        return breaker
+
+    def _host_state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            limits = self._limits.get(host, self.default_limits)
+            state = self._hosts[host] = _HostState(limits)
+        return state
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever,
+                                      name="fetch-engine", daemon=True)
+            thread.start()
+            self._loop, self._thread = loop, thread
+            return loop
+
+    async def _get_session(self):
+        if self._session is None:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(timeout=timeout)
+        return self._session
+
+    async def fetch(self, url, params=None, headers=None, session=None,
+                    use_cache=True):
+        """
+        Performs a GET request within the host's concurrency and rate budget.
+
+        Args:
+            url (str): The URL to fetch.
+            params (dict): Query string parameters.
+            headers (dict): Request headers.
+            session (RetailerSession): Connection pool to use. Defaults to
+                the engine's shared session.
+            use_cache (bool): Serve a fresh response cache entry instead of
+                requesting. False always requests (e.g. a warm-up request
+                whose cookies are needed), except in replay mode; the
+                response is still recorded.
+
+        Returns:
+            Response: The fully read response.
+
+        Raises:
+            FetchError: If the request fails or the status code is >= 400.
+            CacheMiss: In replay mode, if the request is not cached.
+        """
+        cached = self._cached(url, params, use_cache)
+        if cached is not None:
+            return cached
+
+        host = urlsplit(url).hostname
+        breaker = self._check_breaker(url, host)
+        state = self._host_state(host)
+        if session is not None:
+            session.stats.requests += 1
+            client = await session.client()
+        else:
+            client = await self._get_session()
+        if headers and "Accept-Encoding" in headers:
+            headers = dict(headers, **{"Accept-Encoding":
+                           supported_accept_encoding(
+                               headers["Accept-Encoding"])})
+
+        async with state.semaphore:
+            if state.bucket is not None:
+                metrics.slept("rate_limit", await state.bucket.acquire())
+
+            started = time.monotonic()
+            try:
+                async with client.get(self._target(url), params=params,
+                                      headers=headers) as resp:
+                    body = await resp.read()
+                    response = Response(str(resp.url), resp.status,
+                                        dict(resp.headers), body,
+                                        time.monotonic() - started,
+                                        resp.get_encoding())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                state.record(time.monotonic() - started, failed=True)
+                metrics.request(host, time.monotonic() - started, failed=True)
+                raise FetchError(f"Request to {url} failed: {e!r}",
+                                 url=url) from e
+
+        failed = response.status >= 500 or response.status in FAILURE_STATUSES
+        state.record(response.elapsed, failed)
+        metrics.request(host, response.elapsed, len(body), failed)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status >= 400:
+            raise FetchError(
+                f"{response.status} error for url: {response.url}",
+                url=response.url, status=response.status,
+                headers=response.headers)
+        self._store(url, params, response)
+        metrics.count("pages")
+        return response
+
+    def _run(self, coro):
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def get(self, url, params=None, headers=None, use_cache=True):
+        """
+        Blocking wrapper around `fetch`, safe to call from any thread other
+        than the engine's own loop thread.
+        """
+        return self._run(self.fetch(url, params=params, headers=headers,
+                                    use_cache=use_cache))
+
+    def get_many(self, requests, return_exceptions=False):
+        """
+        Fetches a batch of requests concurrently.
+
+        Args:
+            requests (list): Dicts of keyword arguments for `fetch`
+                (`url`, and optionally `params` and `headers`).
+            return_exceptions (bool): If True, failed requests are returned
+                as FetchError instances instead of raising.
+
+        Returns:
+            list: The responses, in the same order as `requests`.
+        """
+        async def gather():
+            return await asyncio.gather(
+                *(self.fetch(**request) for request in requests),
+                return_exceptions=return_exceptions)
+
+        return self._run(gather())
+
+    def close(self):
+        """Closes the HTTP session and stops the background loop."""
+        if self._loop is None:
+            return
+        for session in self._sessions.values():
+            self._run(session.aclose())
+        if self._session is not None:
+            self._run(self._session.close())
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+        self._hosts = {}
+
+
+# Engine shared by all retailer modules
+engine = FetchEngine()
@@ -0,0 +1,257 @@
+"""
+Parallel loader of the snapshot history for analyses.
+
+`storage.read_snapshots` reads one retailer's files one after the other and
+lets pandas infer every column's type. `load` reads the files of any
+retailers over a range of days at once:
+
+- the files are read by a thread pool, with pyarrow's CSV and Parquet
+  readers (which release the GIL while parsing), and only the columns asked
+  for;
+- every column has the type of RAW_DTYPES rather than an inferred one, so
+  ids stay strings and prices floats whatever a day's file contains;
+- repeated strings (CATEGORICAL_COLUMNS) are dictionary-encoded, and
+  `source` (the retailer) and `date` (the snapshot day) are categoricals.
+
+Without pyarrow the files are read with pandas, with the same dtypes.
+With `observations=True` the observation files (see `observations`) are
+loaded instead, in OBSERVATION_SCHEMA's dtypes.
+
+Example:
+    >>> prices = load(["auchan", "pingo_doce"], "20241120", "20241125",
+    ...               columns=["product_id", "product_name"])
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from observations import OBSERVATION_SCHEMA, OBSERVATIONS_DIR, SOURCES, conform
+from storage import EXTENSIONS, snapshot_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; files are then read with pandas
+    pa = None
+
+# Threads reading files (they mostly wait on pyarrow, not on the GIL)
+WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# Per retailer: the dtype of every snapshot column
+RAW_DTYPES = {
+    "continente": {
+        "Product Name": "str",
+        "Product ID": "str",
+        "Price": "float64",
+        "Price per unit": "str",
+        "Unit Price": "float64",
+        "Price Unit": "str",
+        "Brand": "str",
+        "Category": "str",
+        "Image URL": "str",
+        "Minimum Quantity": "str",
+        "Product Link": "str",
+        "cgid": "str",
+        "tracking_date": "str",
+        "source": "str",
+    },
+    "auchan": {
+        "product_id": "str",
+        "product_name": "str",
+        "product_price": "float64",
+        "product_category": "str",
+        "product_category2": "str",
+        "product_category3": "str",
+        "product_image": "str",
+        "product_urls": "str",
+        "product_ratings": "str",
+        "product_labels": "str",
+        "product_promotions": "str",
+        "source": "str",
+        "timestamp": "str",
+    },
+    "pingo_doce": {
+        "product_id": "str",
+        "product_name": "str",
+        "product_price": "str",
+        "product_price_value": "float64",
+        "product_price_unit": "str",
+        "product_image": "str",
+        "product_url": "str",
+        "product_rating": "str",
+        "source": "str",
+        "timestamp": "str",
+    },
+}
+
+# Per retailer: string columns with few distinct values, loaded as
+# categoricals
+CATEGORICAL_COLUMNS = {
+    "continente": ["Price Unit", "Brand", "Category", "Minimum Quantity",
+                   "cgid"],
+    "auchan": ["product_category", "product_category2", "product_category3",
+               "product_labels"],
+    "pingo_doce": ["product_price_unit"],
+}
+
+ARROW_TYPES = {"str": "string", "float64": "float64"}
+
+
+def day_name(value):
+    """A day as YYYYMMDD, from a date or a date string (None stays None)."""
+    if value is None:
+        return None
+    if not isinstance(value, date):
+        value = pd.Timestamp(str(value))
+    return value.strftime("%Y%m%d")
+
+
+def _read_arrow(path, columns, dtypes):
+    """One snapshot file as an Arrow table of `columns` (None: all)."""
+    if path.endswith(EXTENSIONS["parquet"]):
+        if columns is not None:
+            available = pq.read_schema(path).names
+            columns = [column for column in columns if column in available]
+        table = pq.read_table(path, columns=columns)
+        # Older files may hold a column in another type
+        for i, name in enumerate(table.column_names):
+            if name in dtypes and table.schema.field(i).type != dtypes[name]:
+                table = table.set_column(
+                    i, name, table.column(i).cast(dtypes[name]))
+        return table
+    options = pa_csv.ConvertOptions(
+        column_types=dtypes, strings_can_be_null=True,
+        # Columns added since (e.g. "Unit Price") are null in older files
+        include_columns=columns or [],
+        include_missing_columns=columns is not None)
+    return pa_csv.read_csv(path, convert_options=options)
+
+
+def _read_pandas(path, columns, dtypes):
+    """One snapshot file as a DataFrame, when pyarrow is not installed."""
+    usecols = None if columns is None else (lambda column: column in columns)
+    df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+    return df.astype({column: dtype for column, dtype in dtypes.items()
+                      if column in df.columns})
+
+
+def _retailer_frame(tables, days, categoricals):
+    """
+    The tables of one retailer's files as one DataFrame, with a `date`
+    column holding each row's index in `days`.
+    """
+    if pa is not None:
+        table = pa.concat_tables(tables, promote_options="default")
+        for name in categoricals:
+            if name in table.column_names:
+                i = table.column_names.index(name)
+                table = table.set_column(
+                    i, name, table.column(i).dictionary_encode())
+        df = table.to_pandas()
+        lengths = [table.num_rows for table in tables]
+    else:
+        df = pd.concat(tables, ignore_index=True)
+        df = df.astype({name: "category" for name in categoricals
+                        if name in df.columns})
+        lengths = [len(table) for table in tables]
+    df["date"] = np.repeat(days, lengths)
+    return df
+
+
+def _jobs(retailers, days, columns, observations, base_path):
+    """
+    The files to read, as (retailer, day, path, columns, dtypes) tuples.
+    """
+    subdirectory = OBSERVATIONS_DIR if observations else None
+    jobs = []
+    for retailer in retailers:
+        if retailer not in SOURCES:
+            raise ValueError(f"Unknown retailer: {retailer}")
+        dtypes = {} if observations else RAW_DTYPES[retailer]
+        if columns is not None:
+            known = OBSERVATION_SCHEMA if observations else dtypes
+            wanted = [column for column in columns if column in known]
+        else:
+            wanted = None
+        if pa is not None:
+            dtypes = {column: getattr(pa, ARROW_TYPES[dtype])()
+                      for column, dtype in dtypes.items()}
+        for day, path in snapshot_files(os.path.join(base_path, retailer),
+                                        days, subdirectory):
+            jobs.append((retailer, day, path, wanted, dtypes))
+    return jobs
+
+
+def _combine(frames, columns):
+    """The frames of every retailer as one DataFrame (empty if none)."""
+    if frames:
+        return pd.concat(frames, ignore_index=True)
+    return pd.DataFrame(columns=[column for column in columns or []
+                                 if column not in ("date", "source")]
+                        + ["date", "source"])
+
+
+def load(retailers=None, start=None, end=None, columns=None,
+         observations=False, base_path="data/raw", workers=WORKERS):
+    """
+    Loads the snapshots of one or more retailers over a range of days.
+
+    Args:
+        retailers (str or list): Retailers (see SOURCES). Defaults to all.
+        start (str or date): First day, inclusive (YYYYMMDD, YYYY-MM-DD or a
+            date). Defaults to the oldest.
+        end (str or date): Last day, inclusive. Defaults to the latest.
+        columns (list): Columns to load. A retailer's rows are missing the
+            columns it does not have. Defaults to all.
+        observations (bool): Loads the observation files instead, in
+            OBSERVATION_SCHEMA's columns and dtypes.
+        base_path (str): The directory of the retailer directories.
+        workers (int): Threads reading files.
+
+    Returns:
+        pd.DataFrame: The rows of every selected file, with `source` and
+        `date` categorical columns.
+    """
+    if retailers is None:
+        retailers = SOURCES
+    elif isinstance(retailers, str):
+        retailers = [retailers]
+    days = (day_name(start), day_name(end))
+    jobs = _jobs(retailers, days, columns, observations, base_path)
+
+    read = _read_arrow if pa is not None else _read_pandas
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tables = list(executor.map(lambda job: read(*job[2:]), jobs))
+
+    frames = []
+    # `date` holds codes into the sorted days while the frames are built
+    day_names = sorted({job[1] for job in jobs})
+    codes = {day: code for code, day in enumerate(day_names)}
+    for retailer in retailers:
+        selected = [i for i, job in enumerate(jobs) if job[0] == retailer]
+        if not selected:
+            continue
+        frame = _retailer_frame(
+            [tables[i] for i in selected],
+            [codes[jobs[i][1]] for i in selected],
+            [] if observations else CATEGORICAL_COLUMNS[retailer])
+        frame["source"] = retailer
+        frames.append(frame)
+
+    df = _combine(frames, columns)
+    df["date"] = pd.Categorical.from_codes(
+        df["date"].astype("int64"),
+        categories=pd.to_datetime(day_names, format="%Y%m%d"))
+    df["source"] = pd.Categorical(df["source"], categories=SOURCES)
+    if observations:
+        df = conform(df)
+        df["date"] = df["date"].astype("category")
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]
+                + [column for column in ("date", "source")
+                   if column not in columns]]
+    return df
@@ -1,34 +1,134 @@
-from continente.catalog import process_and_save_categories
-from pingo_doce.pingo_doce import parse_and_save_all_categories
-from auchan.auchan import save_data_for_all_cgids
-
-# continente
-process_and_save_categories()
-
-# pingo doce
-# Example usage
-categories = [
-    "pingo-doce-lacticinios", "pingo-doce-bebidas",
-    "pingo-doce-frescos-embalados", "pingo-doce-higiene-e-beleza",
-    "pingo-doce-maquinas-e-capsulas-de-cafe", "pingo-doce-mercearia",
-    "pingo-doce-refeicoes-prontas", "pingo-doce-cozinha-e-limpeza", "pingo-doce-congelados"
-]
-
-parse_and_save_all_categories(categories)
-
-cgid_list = [
-    "alimentacao-", "biologico-e-escolhas-alimentares",
-    "limpeza-da-casa-e-roupa", "bebidas-e-garrafeira", "marcas-auchan",
-    "saude-e-bem-estar/acne/"
-]
-prefn1 = "soldInStores"
-prefv1 = "000"
-sz = 212
-base_url = "https://www.auchan.pt/on/demandware.store/Sites-AuchanPT-Site/pt_PT/Search-UpdateGrid"
-
-save_data_for_all_cgids(cgid_list,
-                       prefn1,
-                       prefv1,
-                       sz,
-                       base_url,
-                       base_path="data/raw/auchan")
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import orchestrator
+from checkpoint import CheckpointJournal
+from history import RETAILER_HISTORIES, update_history
+from http_engine import engine
+from metrics import metrics
+from observations import SOURCES, convert_snapshots
+from page_cache import PageCache
+from price_store import PriceStore
+from response_cache import recorded_runs
+
+# Pages are parsed in the fetcher threads: with the hosts' request rates a
+# page waits far longer on the network than on its parse, so a process
+# pool (--parse-workers, see benchmarks/bench_parse_stage.py) only adds
+# startup time and memory unless the network is fast
+PARSE_WORKERS = None
+
+# On-disk HTTP response cache (see response_cache), off by default. With
+# --record the responses are recorded, per run day, for --replay but not
+# reused, so that a rerun on the same day fetches fresh prices;
+# --cache-ttl also reuses them for that many hours
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", ".cache/http")
+CACHE_TTL_HOURS = 0
+CACHE_SIZE_MIB = 2048
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scrape the retailers' catalogs.")
+    parser.add_argument("--record", action="store_true",
+                        help="record the responses in the response cache, "
+                             "for --replay")
+    parser.add_argument("--replay", action="store_true",
+                        help="run from the response cache only, with no "
+                             "network requests (snapshots go to "
+                             "<data-dir>/replay)")
+    parser.add_argument("--replay-day",
+                        help="recorded day (YYYYMMDD) to replay (default: "
+                             "the latest)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL_HOURS,
+                        help="hours a cached response is reused, within "
+                             "its run day (default: always fetched)")
+    parser.add_argument("--cache-size", type=float, default=CACHE_SIZE_MIB,
+                        help="size limit of the response cache, in MiB")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=orchestrator.WORKERS,
+                        help="size of the worker pool shared by every "
+                             "retailer")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="parse pages in this many worker processes "
+                             "instead of the fetcher threads")
+    parser.add_argument("--prefect", action="store_true",
+                        help="run the scrape as a Prefect flow")
+    parser.add_argument("--host-override",
+                        help="send every request to this base URL, e.g. the "
+                             "local mock retailers "
+                             "(benchmarks/mock_retailers.py)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    metrics.reset()
+    cache = None
+    if args.record or args.replay or args.cache_ttl > 0:
+        cache = engine.configure_cache(
+            args.cache_dir, ttl=args.cache_ttl * 3600,
+            max_bytes=int(args.cache_size * 2 ** 20), replay=args.replay,
+            run=args.replay_day)
+        if args.replay and cache.run not in recorded_runs(args.cache_dir):
+            sys.exit(f"No responses recorded on {cache.run} in "
+                     f"{args.cache_dir}")
+    if args.host_override:
+        engine.set_host_override(args.host_override)
+
+    # A replay re-parses every page and must not overwrite the real
+    # snapshots, the caches or the histories
+    if args.replay:
+        raw_path = os.path.join(args.data_dir, "replay", "raw")
+        page_cache = checkpoints = None
+    else:
+        raw_path = os.path.join(args.data_dir, "raw")
+        # Validators, body hashes and rows of the last run's pages
+        page_cache = PageCache(
+            os.path.join(args.data_dir, "cache", "pages.sqlite3"))
+        # Pages and categories completed today, so a restart resumes
+        checkpoints = CheckpointJournal(
+            os.path.join(args.data_dir, "cache", "checkpoints.sqlite3"))
+
+    timeline_path = os.path.join("logs", f"timeline_{run_id}.json")
+    run = orchestrator.run_flow if args.prefect else orchestrator.run
+    try:
+        run(raw_path=raw_path, workers=args.workers,
+            parse_workers=args.parse_workers,
+            page_cache=page_cache, checkpoints=checkpoints,
+            timeline_path=timeline_path)
+    finally:
+        # Closes the connection pools and stops the engine's loop thread,
+        # also when the run fails
+        engine.close()
+        if not args.replay:
+            page_cache.close()
+            checkpoints.close()
+    if cache is not None:
+        print(f"Response cache: {cache}")
+    if not args.replay:
+        # Append today's snapshots to the incremental price histories
+        for retailer in RETAILER_HISTORIES:
+            update_history(retailer, raw_path=raw_path,
+                           history_path=os.path.join(args.data_dir, "history"))
+
+        # Observations of the days scraped before they were written
+        for source in SOURCES:
+            convert_snapshots(os.path.join(raw_path, source), source)
+
+        # Load the new observations into the price-history database
+        store = PriceStore(os.path.join(args.data_dir, "prices.sqlite3"))
+        store.update(raw_path)
+        store.close()
+
+    # Bytes, throughput, latencies and time per stage, to compare runs
+    print(f"Metrics: {metrics}")
+    metrics.write(os.path.join("logs", f"metrics_{run_id}.json"))
+
+
+# The parse stage spawns worker processes, which re-import this module
+if __name__ == "__main__":
+    main()
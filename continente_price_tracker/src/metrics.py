@@ -0,0 +1,186 @@
+"""
+Per-run timers and counters of the scrape pipeline.
+
+The module-level `metrics` registry is shared by every retailer, like the
+fetch engine. It records:
+
+- stages: the wall time of every call of a pipeline stage ("fetch" for
+  network requests, "parse" for the HTML parse of a page's products,
+  "parse_document" for the document tree of a first page, "frame" for
+  DataFrame building, "save" for snapshot files, "history" for the price
+  histories),
+  timed with the `metrics.timer(stage)` context manager or the
+  `@timed(stage)` decorator;
+- hosts: requests, failures, bytes downloaded and latencies per host, as
+  recorded by the fetch engine;
+- counters: pages fetched, rows saved, cache hits...;
+- sleeps: the time spent waiting on purpose, by reason ("rate_limit" for
+  the engine's token buckets, "retry" for retry backoffs).
+
+`metrics.write(path)` dumps them as JSON, with the derived pages/s, rows/s
+and p50/p95 latencies, so that runs can be compared. Stage times of
+concurrent calls overlap: they add up to more than the run's wall time.
+
+Timers in `pipeline.ParseStage` worker processes would be recorded in the
+worker's copy of the registry; the stage times each parse in the worker
+and records it in the parent's registry instead.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, q):
+    """The `q`-th percentile (0-100) of `values`, by nearest rank, or None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = int(round(q / 100 * len(ordered))) - 1
+    rank = max(0, min(len(ordered) - 1, rank))
+    return ordered[rank]
+
+
+def _summary(samples):
+    return {
+        "calls": len(samples),
+        "seconds": round(sum(samples), 3),
+        "p50": None if not samples else round(percentile(samples, 50), 4),
+        "p95": None if not samples else round(percentile(samples, 95), 4),
+    }
+
+
+class Metrics:
+    """
+    Thread-safe registry of the timers and counters of one run.
+
+    Example:
+        >>> with metrics.timer("save"):
+        ...     df.to_parquet(path)
+        >>> metrics.count("rows", len(df))
+        >>> metrics.write("logs/metrics.json")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Starts a new run: clears every timer and counter."""
+        with self._lock:
+            self.started = time.time()
+            self._clock = time.perf_counter()
+            self._stages = {}
+            self._hosts = {}
+            self._counters = {}
+            self._sleeps = {}
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the enclosed block as one call of `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage, seconds):
+        """Records one call of `stage` that took `seconds`."""
+        with self._lock:
+            self._stages.setdefault(stage, []).append(seconds)
+
+    def count(self, name, n=1):
+        """Adds `n` to the counter `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def slept(self, reason, seconds):
+        """Records time spent waiting on purpose, e.g. a retry backoff."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._sleeps[reason] = self._sleeps.get(reason, 0.0) + seconds
+
+    def request(self, host, latency, nbytes=0, failed=False):
+        """Records a network request to `host` (see `http_engine`)."""
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                "requests": 0, "failed": 0, "bytes": 0, "latencies": []})
+            stats["requests"] += 1
+            stats["failed"] += bool(failed)
+            stats["bytes"] += nbytes
+            stats["latencies"].append(latency)
+            self._stages.setdefault("fetch", []).append(latency)
+
+    def as_dict(self):
+        """The run's metrics, with the derived rates and percentiles."""
+        with self._lock:
+            elapsed = time.perf_counter() - self._clock
+            hosts = {}
+            for host, stats in self._hosts.items():
+                latencies = stats["latencies"]
+                hosts[host] = {
+                    "requests": stats["requests"],
+                    "failed": stats["failed"],
+                    "bytes": stats["bytes"],
+                    "latency_p50": None if not latencies
+                    else round(percentile(latencies, 50), 4),
+                    "latency_p95": None if not latencies
+                    else round(percentile(latencies, 95), 4),
+                }
+            counters = dict(self._counters)
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S",
+                                         time.localtime(self.started)),
+                "elapsed": round(elapsed, 3),
+                "bytes_downloaded": sum(stats["bytes"]
+                                        for stats in self._hosts.values()),
+                "pages_per_s": round(counters.get("pages", 0) / elapsed, 3)
+                if elapsed else None,
+                "rows_per_s": round(counters.get("rows", 0) / elapsed, 3)
+                if elapsed else None,
+                "slept": round(sum(self._sleeps.values()), 3),
+                "sleeps": {reason: round(seconds, 3)
+                           for reason, seconds in self._sleeps.items()},
+                "counters": counters,
+                "stages": {stage: _summary(samples)
+                           for stage, samples in self._stages.items()},
+                "hosts": hosts,
+            }
+
+    def write(self, path):
+        """Writes the run's metrics as JSON and returns the path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=1)
+        return path
+
+    def __str__(self):
+        data = self.as_dict()
+        stages = ", ".join(f"{stage} {summary['seconds']:.1f}s"
+                           for stage, summary in data["stages"].items())
+        return (f"{data['counters'].get('pages', 0)} pages "
+                f"({data['pages_per_s']} pages/s), "
+                f"{data['counters'].get('rows', 0)} rows "
+                f"({data['rows_per_s']} rows/s), "
+                f"{data['bytes_downloaded'] / 2 ** 20:.1f} MiB downloaded, "
+                f"{data['slept']:.1f}s slept; {stages}")
+
+
+def timed(stage):
+    """Decorator timing every call of a function as one call of `stage`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Registry shared by all modules of the run
+metrics = Metrics()
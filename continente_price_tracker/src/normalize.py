@@ -0,0 +1,389 @@
+"""
+Column-wise normalisation of the scraped product tables.
+
+Quantities are read from the product names ("Detergente 4x200g",
+"Cerveja 6x25cl", "Papel de Cozinha 20mt", "Ovos 1 dúzia"...) for a whole
+column at once:
+
+- `parse_quantities` extracts the weight or volume, its unit and the
+  number of units, with the same rules as the row-wise `parse_quantity`:
+  later rules win (units, pairs, doses, lengths, then `6x25cl` volumes,
+  `4x200g` multipacks and plain weights);
+- `standardize_quantities` converts them to grams or millilitres and keeps
+  the quantity of countable units, like `convert_quantities_to_standard`.
+
+Price strings ("€0,28/un", "0,15€ / UN") are parsed by `parse_prices` into
+a float and a unit category, with the rules of the notebooks'
+`process_price`; `add_prices` adds both to a scraped DataFrame.
+
+Names and prices repeat on every day of a history, so each distinct value
+is parsed once and the result is broadcast back to its rows; every rule is
+one vectorized string operation over the distinct values.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # prices are then parsed one distinct value at a time
+    pc = None
+
+# Weight or volume, e.g. 0.75l, 355g
+WEIGHT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(kg|g|l|ml)')
+# Multipack of weights or volumes, e.g. 4x200g
+MULTIPACK_PATTERN = re.compile(r'(\d+)\s*x\s*(\d+(?:\.\d+)?)\s*(kg|g|l|ml)')
+# Multipack of volumes in cl or ml, e.g. 6x25cl
+VOLUME_PATTERN = re.compile(r'(\d+)\s*x\s*(\d+)\s*(cl|ml)')
+# Length, e.g. 20mt
+LENGTH_PATTERN = re.compile(r'(\d+)\s*(mt|m)')
+# Doses, e.g. 60 doses
+DOSE_PATTERN = re.compile(r'(\d+)\s*(doses)')
+# Pairs, e.g. 1par
+PAIR_PATTERN = re.compile(r'(\d+)\s*(par)')
+# Countable units, e.g. 4 un, 12 pieces
+UNIT_PATTERN = re.compile(
+    r'(\d+)\s*(un|pieces|dozen|unit|meia\s*dúzia|par|rolos|doses)')
+
+# Grams or millilitres per unit, and the standard unit
+STANDARD_UNITS = {"kg": (1000, "g"), "g": (1, "g"),
+                  "l": (1000, "ml"), "ml": (1, "ml")}
+# Units whose quantity is kept after standardization
+COUNT_UNITS = ["unit", "un", "par", "pieces", "dozen", "meia dúzia", "rolos",
+               "doses"]
+DOZEN_UNITS = ["dozen", "meia dúzia"]
+
+QUANTITY_COLUMNS = ["weight_value", "weight_unit", "quantity"]
+
+# Unit of a price ("€7,08/kg", "0,15€ / UN") -> unit category
+PRICE_UNITS = {"un": "un", "pack": "pack", "kg": "kg", "gr": "g", "g": "g",
+               "lt": "l", "l": "l", "ml": "ml", "dos": "dose", "doz": "dozen",
+               "duz": "dozen", "m": "m"}
+
+PRICE_COLUMNS = ["price", "price_unit"]
+# Amount and unit of a price, e.g. "0,28/un" (after the currency symbol)
+PRICE_PATTERN = r'^(?P<amount>[^/]*)(?:/(?P<unit>[^/]*))?'
+# Amounts `float()` accepts (after the decimal comma is replaced)
+NUMBER_PATTERN = r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$'
+
+
+def parse_quantity(product_name):
+    """
+    Parses the weight or volume, its unit and the number of units of one
+    product name. Reference for `parse_quantities`, which does the same for
+    a whole column.
+
+    Args:
+        product_name (str): The product name or description.
+
+    Returns:
+        tuple: (weight_value, weight_unit, quantity), or (None, None, None)
+        if the name has no quantity.
+    """
+    weight_value = None
+    weight_unit = None
+    quantity = None
+
+    match = WEIGHT_PATTERN.search(product_name)
+    if match:
+        weight_value = float(match.group(1))
+        weight_unit = match.group(2)
+
+    match = MULTIPACK_PATTERN.search(product_name)
+    if match:
+        quantity = int(match.group(1))
+        weight_value = float(match.group(2))
+        weight_unit = match.group(3)
+
+    match = VOLUME_PATTERN.search(product_name)
+    if match:
+        quantity = int(match.group(1))
+        weight_value = float(match.group(2))
+        weight_unit = match.group(3)
+
+    count = _parse_count(product_name)
+    if count is not None:
+        weight_value, weight_unit, quantity = count
+
+    if weight_value is None and quantity is None:
+        return None, None, None
+    return weight_value, weight_unit, quantity
+
+
+def _parse_count(product_name):
+    """
+    The (weight_value, weight_unit, quantity) of a product name sold by
+    the unit (lengths, doses, pairs, units), from the last count pattern
+    that matches, or None.
+    """
+    count = None
+    # "m" is a length only in names without a volume in ml
+    if 'm' in product_name and 'ml' not in product_name:
+        match = LENGTH_PATTERN.search(product_name)
+        if match:
+            count = None, match.group(2), int(match.group(1))
+
+    match = DOSE_PATTERN.search(product_name)
+    if match:
+        count = None, 'doses', int(match.group(1))
+
+    match = PAIR_PATTERN.search(product_name)
+    if match:
+        count = None, 'par', int(match.group(1))
+
+    match = UNIT_PATTERN.search(product_name)
+    if match:
+        quantity = int(match.group(1))
+        weight_unit = match.group(2)
+        # A dozen counts as 12 items
+        weight_value = quantity * 12 if weight_unit in DOZEN_UNITS else None
+        count = weight_value, weight_unit, quantity
+    return count
+
+
+def convert_quantities_to_standard(product_data):
+    """
+    Converts a parsed (weight_value, weight_unit, quantity) to grams or
+    millilitres; the quantity is kept only for countable units. Reference
+    for `standardize_quantities`.
+    """
+    weight_value, weight_unit, quantity = product_data
+    if weight_unit in STANDARD_UNITS:
+        factor, unit = STANDARD_UNITS[weight_unit]
+        weight_value, weight_unit = weight_value * factor, unit
+    else:
+        weight_value, weight_unit = None, None
+    return weight_value, weight_unit, \
+        quantity if product_data[1] in COUNT_UNITS else None
+
+
+def parse_price(price):
+    """
+    Parses one price string, like the notebooks' `process_price`: the
+    currency symbol is dropped and a comma is the decimal separator (dots
+    are then thousands separators). Reference for `parse_prices`.
+
+    Args:
+        price (str or float): e.g. "€0,28/un", "0,15€ / UN" or 1.99.
+
+    Returns:
+        tuple: (price, price_unit), None where missing or not a number;
+        the unit is one of PRICE_UNITS' categories (or the unit as written,
+        lower-cased, if unknown).
+    """
+    amount, _, unit = str(price).replace('€', '').partition('/')
+    amount = amount.strip()
+    if ',' in amount:
+        amount = amount.replace('.', '').replace(',', '.')
+    try:
+        value = float(amount)
+    except ValueError:
+        value = None
+    unit = unit.split('/')[0].strip().lower()
+    return value, PRICE_UNITS.get(unit, unit) if unit else None
+
+
+# Literals every match of a rule contains: names without them are not searched
+UNIT_WORDS = ("un", "pieces", "dozen", "meia", "par", "rolos", "doses")
+
+
+def _extract(names, pattern, mask=None):
+    """
+    The groups of `pattern` in each name, as float (first group) and
+    object (other groups) arrays, NaN where it does not match. Only the
+    names selected by `mask` are searched.
+    """
+    subset = names if mask is None else names[mask]
+    groups = subset.str.extract(pattern).reindex(names.index)
+    return [groups[0].to_numpy("float64", copy=True)] + \
+        [groups[i].to_numpy(object, copy=True)
+         for i in range(1, groups.shape[1])]
+
+
+def _contains(names, literal):
+    return names.str.contains(literal, regex=False).to_numpy(bool)
+
+
+def _parse_unique(names):
+    """
+    Applies the rules of `parse_quantity` to distinct names (a pd.Series of
+    str), one vectorized pass per rule. Rules are only run on the names
+    containing their literal (the "x" of a multipack, a unit word...).
+    """
+    # Plain weight: no quantity
+    value, unit = _extract(names, WEIGHT_PATTERN)
+    quantity = np.full(len(names), np.nan)
+
+    def apply(matched, new_value, new_unit, new_quantity):
+        value[matched] = (new_value[matched] if np.ndim(new_value)
+                          else new_value)
+        unit[matched] = new_unit[matched] if np.ndim(new_unit) else new_unit
+        quantity[matched] = new_quantity[matched]
+
+    # Each later rule overrides the earlier ones
+    has_x = _contains(names, "x")
+    for pattern in (MULTIPACK_PATTERN, VOLUME_PATTERN):
+        count, size, size_unit = _extract(names, pattern, has_x)
+        apply(~np.isnan(count), size.astype("float64"), size_unit, count)
+
+    is_length = _contains(names, "m") & ~_contains(names, "ml")
+    count, length_unit = _extract(names, LENGTH_PATTERN, is_length)
+    apply(~np.isnan(count), np.nan, length_unit, count)
+
+    for pattern, unit_name in ((DOSE_PATTERN, "doses"), (PAIR_PATTERN, "par")):
+        count, _ = _extract(names, pattern, _contains(names, unit_name))
+        apply(~np.isnan(count), np.nan, unit_name, count)
+
+    has_unit = names.str.contains("|".join(UNIT_WORDS)).to_numpy(bool)
+    count, count_unit = _extract(names, UNIT_PATTERN, has_unit)
+    dozens = np.where(np.isin(count_unit, DOZEN_UNITS), count * 12, np.nan)
+    apply(~np.isnan(count), dozens, count_unit, count)
+
+    return pd.DataFrame({"weight_value": value, "weight_unit": unit,
+                         "quantity": quantity})
+
+
+def _by_value(values, convert):
+    """
+    Runs `convert` on the distinct values of a column (as a pd.Series of
+    str) and broadcasts the frame it returns back to one row per value;
+    missing values give missing rows.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    frame = convert(pd.Series(uniques).astype("str"))
+    # Code -1 (a missing value) takes the appended NaN
+    rows = np.where(codes < 0, len(uniques), codes)
+    columns = {}
+    for column in frame.columns:
+        array = frame[column].to_numpy()
+        array = array if array.dtype.kind == "f" else array.astype(object)
+        columns[column] = np.append(array, np.nan)[rows]
+    return pd.DataFrame(columns)
+
+
+def parse_quantities(names):
+    """
+    Parses the quantity of every product name of a column.
+
+    Args:
+        names (pd.Series): Product names; missing names give missing values.
+
+    Returns:
+        pd.DataFrame: `weight_value` (float), `weight_unit` (str) and
+        `quantity` (float) per row, as `parse_quantity` would return them.
+    """
+    return _by_value(names, _parse_unique)
+
+
+def standardize_quantities(parsed):
+    """
+    Converts parsed quantities to grams or millilitres, column-wise.
+
+    Args:
+        parsed (pd.DataFrame): The output of `parse_quantities`.
+
+    Returns:
+        pd.DataFrame: `weight_value` in g or ml, `weight_unit` ("g" or
+        "ml") and the `quantity` of countable units, as
+        `convert_quantities_to_standard` would return them.
+    """
+    unit = parsed["weight_unit"]
+    factor = unit.map({name: factor
+                       for name, (factor, _) in STANDARD_UNITS.items()})
+    return pd.DataFrame({
+        "weight_value": parsed["weight_value"] * factor,
+        "weight_unit": unit.map({name: standard for name, (_, standard)
+                                 in STANDARD_UNITS.items()}),
+        "quantity": parsed["quantity"].where(unit.isin(COUNT_UNITS)),
+    })
+
+
+def extract_quantities(names):
+    """
+    Standardized quantities of a column of product names: the output of
+    `standardize_quantities(parse_quantities(names))`, converted once per
+    distinct name.
+    """
+    return _by_value(names, lambda unique: standardize_quantities(
+        _parse_unique(unique)))
+
+
+def _parse_unique_prices(prices):
+    """
+    Applies `parse_price` to distinct price strings (a pd.Series of str),
+    with Arrow string kernels.
+    """
+    if pc is None:
+        return pd.DataFrame([parse_price(price) for price in prices],
+                            columns=PRICE_COLUMNS)
+    text = pc.replace_substring(pa.array(prices, pa.string()), "€", "")
+    parts = pc.extract_regex(text, PRICE_PATTERN)
+    amount = pc.utf8_trim_whitespace(pc.struct_field(parts, "amount"))
+    # A comma is the decimal separator; dots are then thousands separators
+    amount = pc.if_else(
+        pc.match_substring(amount, ","),
+        pc.replace_substring(pc.replace_substring(amount, ".", ""), ",", "."),
+        amount)
+    is_number = pc.match_substring_regex(amount, NUMBER_PATTERN)
+    price = pc.cast(pc.if_else(is_number, amount, None), pa.float64())
+    unit = pc.utf8_trim_whitespace(pc.struct_field(parts, "unit"))
+    unit = pc.utf8_lower(unit)
+    unit = pd.Series(pc.if_else(pc.equal(unit, ""), None, unit)
+                     .to_numpy(zero_copy_only=False), dtype=object)
+    return pd.DataFrame({
+        "price": price.to_numpy(zero_copy_only=False),
+        "price_unit": unit.map(PRICE_UNITS).fillna(unit),
+    })
+
+
+def parse_prices(prices):
+    """
+    Parses a column of prices into a float and a unit category, in one pass
+    over its distinct values.
+
+    Args:
+        prices (pd.Series): Price strings such as Continente's "Price per
+            unit" ("€0,28/un") or Pingo Doce's "product_price"
+            ("0,15€ / UN"); numeric columns are taken as they are.
+
+    Returns:
+        pd.DataFrame: `price` (float64) and `price_unit` (category) per row,
+        as `parse_price` would return them.
+    """
+    prices = pd.Series(prices)
+    if pd.api.types.is_numeric_dtype(prices.dtype):
+        return pd.DataFrame({
+            "price": prices.to_numpy("float64"),
+            "price_unit": pd.Categorical([None] * len(prices)),
+        })
+    codes, uniques = pd.factorize(prices)
+    parsed = _parse_unique_prices(pd.Series(uniques).astype("str"))
+    unit_codes, units = pd.factorize(parsed["price_unit"])
+    # Code -1 (a missing price) takes the appended NaN / missing unit
+    rows = np.where(codes < 0, len(uniques), codes)
+    return pd.DataFrame({
+        "price": np.append(parsed["price"].to_numpy("float64"), np.nan)[rows],
+        "price_unit": pd.Categorical.from_codes(
+            np.append(unit_codes, -1)[rows], units),
+    })
+
+
+def add_prices(df, column, price_column, unit_column):
+    """
+    Adds the parsed price and unit of a price string column to a DataFrame.
+
+    Args:
+        df (pd.DataFrame): The products; modified in place.
+        column (str): The price strings, e.g. "Price per unit".
+        price_column (str): Name of the new float64 price column.
+        unit_column (str): Name of the new unit category column.
+
+    Returns:
+        pd.DataFrame: `df`.
+    """
+    parsed = parse_prices(df[column])
+    df[price_column] = parsed["price"].to_numpy()
+    df[unit_column] = parsed["price_unit"].array
+    return df
@@ -0,0 +1,266 @@
+"""
+Canonical product-observation schema shared by every retailer.
+
+Each retailer's snapshots keep the columns of its site (Continente's
+"Product Name" and "Price per unit" strings, Auchan's float
+`product_price`, Pingo Doce's "0,15€ / UN" `product_price`...). Next to
+them, every scraper writes the same products once more in one schema,
+OBSERVATION_SCHEMA, through `write_observations`:
+
+- `date` and `source`, the scrape day and the retailer (a categorical of
+  SOURCES);
+- `category`, the scraped category (Continente and Auchan cgid, Pingo Doce
+  categoria), as a categorical;
+- `product_id`, `product_name`, `brand`, `product_url`, `image_url`;
+- `price` (the shelf price), `unit_price` and `price_unit` (the price per
+  kg, l, un... as shown by the retailer), `promotion`, as float32;
+- `weight_value`, `weight_unit` and `quantity` parsed from the product name
+  (Continente: its pack size) by `normalize.extract_quantities`.
+
+Observation files live in an `observations/` directory of each day
+partition (e.g. data/raw/auchan/20241125/observations/<category>.parquet),
+which `storage.read_snapshots` does not read. `read_observations` loads
+them back with the schema's dtypes, so analyses need no renaming or
+re-parsing. `convert_snapshots` writes the observations of days scraped
+before the schema existed.
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metrics import metrics, timed
+from normalize import QUANTITY_COLUMNS, add_prices, extract_quantities
+from storage import EXTENSIONS, list_days, read_snapshot, snapshot_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; observations are then CSV files
+    pq = None
+
+SOURCES = ["continente", "auchan", "pingo_doce"]
+
+OBSERVATION_SCHEMA = {
+    "date": "datetime64[s]",
+    "source": pd.CategoricalDtype(SOURCES),
+    "category": "category",
+    "product_id": "str",
+    "product_name": "str",
+    "brand": "str",
+    "price": "float32",
+    "unit_price": "float32",
+    "price_unit": "category",
+    "promotion": "float32",
+    "weight_value": "float32",
+    "weight_unit": "category",
+    "quantity": "float32",
+    "product_url": "str",
+    "image_url": "str",
+}
+
+# Per retailer: observation column -> snapshot column, or a function of the
+# snapshot DataFrame. Columns not listed are missing for that retailer.
+COLUMN_MAPS = {
+    "continente": {
+        "category": "cgid",
+        "product_id": "Product ID",
+        "product_name": "Product Name",
+        "brand": "Brand",
+        "price": "Price",
+        "unit_price": "Unit Price",
+        "price_unit": "Price Unit",
+        "product_url": "Product Link",
+        "image_url": "Image URL",
+    },
+    "auchan": {
+        "product_id": "product_id",
+        "product_name": "product_name",
+        "price": "product_price",
+        # product_promotions is the tile's label, e.g. "-25%"
+        "promotion": lambda df: pd.to_numeric(
+            df["product_promotions"].astype("str").str.extract(
+                r"(\d+(?:[.,]\d+)?)\s*%", expand=False).str.replace(",", "."),
+            errors="coerce"),
+        # product_urls is the tile's JSON of URLs
+        "product_url": lambda df: df["product_urls"].astype("str").str.extract(
+            r'"absoluteProductUrl":"([^"]*)"', expand=False),
+        "image_url": "product_image",
+    },
+    # A Pingo Doce listing has a single price, per unit or per kg
+    "pingo_doce": {
+        "product_id": "product_id",
+        "product_name": "product_name",
+        "price": "product_price_value",
+        "unit_price": "product_price_value",
+        "price_unit": "product_price_unit",
+        "product_url": "product_url",
+        "image_url": "product_image",
+    },
+}
+
+# Snapshot column the quantities are parsed from, if not the product name
+# (Continente shows the pack size, "emb. 500 gr", apart from the name)
+QUANTITY_TEXT = {"continente": "Minimum Quantity"}
+
+# Price strings parsed (see `normalize.add_prices`) when a snapshot
+# predates their parsed columns
+PRICE_STRINGS = {
+    "continente": {"Price per unit": ("Unit Price", "Price Unit")},
+    "pingo_doce": {"product_price": ("product_price_value",
+                                     "product_price_unit")},
+}
+
+OBSERVATIONS_DIR = "observations"
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def conform(df):
+    """Casts the columns of `df` to OBSERVATION_SCHEMA, adding missing ones."""
+    columns = {}
+    for column, dtype in OBSERVATION_SCHEMA.items():
+        values = df[column] if column in df.columns \
+            else pd.Series(np.nan, index=df.index)
+        columns[column] = values.astype(dtype)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def to_observations(df, source, category=None, date=None):
+    """
+    Maps the snapshot rows of a retailer to the observation schema.
+
+    Args:
+        df (pd.DataFrame): Rows as scraped by the retailer's module.
+        source (str): One of SOURCES.
+        category (str): The scraped category; defaults to the retailer's
+            category column (Continente's cgid).
+        date (str or datetime): The scrape day. Defaults to today.
+
+    Returns:
+        pd.DataFrame: The observations, with OBSERVATION_SCHEMA's columns
+        and dtypes.
+    """
+    price_strings = PRICE_STRINGS.get(source, {})
+    for column, (price_column, unit_column) in price_strings.items():
+        if column in df.columns and price_column not in df.columns:
+            df = add_prices(df.copy(), column, price_column, unit_column)
+
+    columns = {}
+    for column, origin in COLUMN_MAPS[source].items():
+        if callable(origin):
+            columns[column] = origin(df)
+        elif origin in df.columns:
+            columns[column] = df[origin]
+    observations = pd.DataFrame(columns, index=df.index)
+    observations["date"] = pd.Timestamp(date or datetime.now()).normalize()
+    observations["source"] = source
+    if category is not None:
+        observations["category"] = category
+    text = QUANTITY_TEXT.get(source)
+    names = (df[text] if text in df.columns
+             else observations.get("product_name"))
+    if names is not None:
+        quantities = extract_quantities(names)
+        for column in QUANTITY_COLUMNS:
+            observations[column] = quantities[column].to_numpy()
+    return conform(observations.reset_index(drop=True))
+
+
+@timed("save")
+def write_observations(df, source, directory, name, category=None, date=None):
+    """
+    The shared writer: stores the rows of one category snapshot in the
+    observation schema.
+
+    Args:
+        df (pd.DataFrame): The scraped rows, as written to the snapshot.
+        source (str): One of SOURCES.
+        directory (str): The snapshot's day partition, e.g.
+            data/raw/auchan/20241125; the file goes to its `observations/`.
+        name (str): The file name without extension (usually the category).
+        category (str): See `to_observations`.
+        date (str or datetime): See `to_observations`.
+
+    Returns:
+        str: The path of the written file.
+    """
+    observations = to_observations(df, source, category, date)
+    directory = os.path.join(directory, OBSERVATIONS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    format = "parquet" if pq is not None else "csv"
+    path = os.path.join(directory, name + EXTENSIONS[format])
+    tmp_path = path + ".tmp"
+    if pq is not None:
+        table = pa.Table.from_pandas(observations, preserve_index=False)
+        pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    else:
+        observations.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    metrics.count("observations", len(observations))
+    return path
+
+
+def read_observations(base_path, columns=None, days=None):
+    """
+    Loads the observations of a retailer.
+
+    Args:
+        base_path (str): The retailer directory, e.g. data/raw/auchan.
+        columns (list): Columns to load. Defaults to all.
+        days (iterable or tuple): Days to load, see `storage.snapshot_files`.
+
+    Returns:
+        pd.DataFrame: The observations, with OBSERVATION_SCHEMA's dtypes.
+    """
+    columns = list(OBSERVATION_SCHEMA) if columns is None else list(columns)
+    frames = [read_snapshot(path, columns)
+              for _, path in snapshot_files(base_path, days, OBSERVATIONS_DIR)]
+    if not frames:
+        return conform(pd.DataFrame())[columns]
+    # Categories differ between files; the schema's dtypes are applied once
+    return conform(pd.concat(frames, ignore_index=True))[columns]
+
+
+def category_name(source, stem):
+    """The category of a snapshot file name (Auchan's end with the day)."""
+    if source == "auchan":
+        category, _, day = stem.rpartition("_")
+        if category and len(day) == 8 and day.isdigit():
+            return category
+    return stem
+
+
+def convert_snapshots(base_path, source, logger=None):
+    """
+    Writes the observations of the snapshots that have none yet, e.g. days
+    scraped before the observation schema existed.
+
+    Args:
+        base_path (str): The retailer directory, e.g. data/raw/auchan.
+        source (str): One of SOURCES.
+        logger (logging.Logger): Optional logger for progress messages.
+
+    Returns:
+        list: The paths written.
+    """
+    written = []
+    for day in list_days(base_path):
+        directory = os.path.join(base_path, day)
+        existing = {os.path.splitext(os.path.basename(path))[0]
+                    for _, path in snapshot_files(base_path, [day],
+                                                  OBSERVATIONS_DIR)}
+        for _, path in snapshot_files(base_path, [day]):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            if stem in existing:
+                continue
+            written.append(write_observations(
+                read_snapshot(path), source, directory, stem,
+                category=None if source == "continente"
+                else category_name(source, stem),
+                date=day))
+        if logger is not None and written:
+            logger.info(f"Observations {source} {day}: {len(written)} "
+                        f"files written so far")
+    return written
@@ -0,0 +1,359 @@
+"""
+Single orchestrator of the daily scrape.
+
+Every retailer is expanded into tasks of one job DAG (see `scheduler`):
+
+- Continente and Pingo Doce: a first-page task per category, which learns
+  the number of pages and expands into one task per remaining page plus a
+  save task that depends on them;
+- Auchan: one task per category group, since its page count is only known
+  when a short page comes back (pages are prefetched inside the task).
+
+All tasks share one worker pool. Each host runs at most as many tasks as
+its engine concurrency, so no retailer starves the others. First-page
+tasks run before page tasks, to learn the whole workload early, and larger
+categories run first, to shorten the makespan: first pages by the page
+count in the last run's page cache, page tasks by the count the first page
+just gave. At the end the per-host summary is logged and the
+per-task timeline is written as JSON.
+
+A page task that gives up leaves its page missing; the save task then
+re-fetches the missing pages under `retry.CATEGORY_RETRY`, like the
+category-level retry of the retailer modules, and fails (so the category
+shows up as failed in the summary) only once those retries are used up.
+
+The category lists live in the retailer modules (`CATEGORIES`, `CGIDS`).
+"""
+import os
+from concurrent.futures import Future
+from datetime import datetime
+
+from auchan import auchan
+from continente import catalog
+from http_engine import engine
+from logger import setup_logger
+from pingo_doce import pingo_doce
+from pipeline import ParseStage
+from retry import CATEGORY_RETRY
+from scheduler import Scheduler, Task
+
+try:
+    from prefect import flow
+except ImportError:  # prefect is optional; `run_flow` requires it
+    flow = None
+
+RETAILERS = ("continente", "pingo_doce", "auchan")
+HOSTS = {
+    "continente": catalog.CONTINENTE_HOST,
+    "pingo_doce": pingo_doce.PINGO_DOCE_HOST,
+    "auchan": auchan.AUCHAN_HOST,
+}
+
+# Worker threads shared by every task: the host slots plus room for saves
+WORKERS = 16
+
+# First pages run before any other page, so every category's size is known
+# early
+DISCOVERY_PRIORITY = 1_000_000
+
+logger = setup_logger("logs/orchestrator.log")
+
+
+def estimated_pages(page_cache, retailer, category):
+    """The page count of a category in the last run, or 0 if unknown."""
+    if page_cache is None:
+        return 0
+    return page_cache.page_count(retailer, category)
+
+
+def page_priority(pages, estimate):
+    """
+    The priority of a category's page tasks: its page count as learned from
+    the first page just fetched, or the last run's estimate if unknown.
+    """
+    return pages if pages else estimate
+
+
+def _resolve(pages):
+    """(page, batch or Task) pairs -> (page, batch or Future) pairs."""
+    return [(page, item.result if isinstance(item, Task) else item)
+            for page, item in pages]
+
+
+def _failed(item):
+    """Whether a page is missing: no batch, or a Future that raised."""
+    if isinstance(item, Future):
+        return item.exception() is not None
+    return item is None
+
+
+def collect_category(collect, category, pages, refetch, checkpoints=None):
+    """
+    Collects the pages of a category, re-fetching the missing ones.
+
+    Args:
+        collect (callable): The retailer's `collect_pages`, which raises
+            FetchError on a missing page when `checkpoints` is given.
+        category (str): The category.
+        pages (list): (page, batch, Future or Task) pairs.
+        refetch (callable): Fetches one page again, given its page key.
+        checkpoints (checkpoint.CheckpointJournal): Journal the re-fetched
+            pages are recorded in.
+
+    Returns:
+        pd.DataFrame: The products of the category.
+    """
+    pages = _resolve(pages)
+
+    def collect_missing_pages():
+        for i, (page, item) in enumerate(pages):
+            if _failed(item):
+                logger.info(f"Re-fetching page {page} of category "
+                            f"{category}")
+                pages[i] = (page, refetch(page))
+        return collect(category, pages, checkpoints)
+
+    # The first attempt only collects: the page tasks already fetched once
+    if not any(_failed(item) for _, item in pages):
+        return collect(category, pages, checkpoints)
+    return CATEGORY_RETRY.call(collect_missing_pages)
+
+
+def _save_continente(category, pages, total_products, base_path,
+                     parse_stage, page_cache, checkpoints):
+    sz = catalog.PAGE_SIZE
+    df = collect_category(
+        catalog.collect_pages, category, pages,
+        lambda start: catalog.fetch_products_at_offset(
+            start, sz, category, catalog.PMIN, catalog.SRULE, total_products,
+            parse_stage, page_cache, checkpoints),
+        checkpoints)
+    return catalog.write_category(category, df, base_path, checkpoints)
+
+
+def continente_tasks(category, base_path, parse_stage=None, page_cache=None,
+                     checkpoints=None, priority=0):
+    """
+    Fetches the first page of a Continente category and returns the tasks
+    of its other pages and of its save. `priority` is the last run's page
+    count; the tasks are prioritised by the freshly fetched one.
+    """
+    if checkpoints is None:
+        done = {}
+    elif checkpoints.finished("continente", category):
+        logger.info(f"Continente category '{category}' already saved, "
+                    f"skipping")
+        return []
+    else:
+        done = checkpoints.pages("continente", category)
+    first_page, total_products = catalog.fetch_first_page(
+        category, page_cache=page_cache, checkpoints=checkpoints, done=done)
+    if total_products is None:
+        raise ValueError(f"No product count on the first page of "
+                         f"Continente category '{category}'")
+
+    sz = catalog.PAGE_SIZE
+    priority = page_priority(-(-total_products // sz), priority)
+    pages = [(0, first_page)]
+    tasks = []
+    for start in range(sz, total_products, sz):
+        if start in done:
+            pages.append((start, done[start].batch))
+            continue
+        task = Task(f"continente/{category}/{start}",
+                    catalog.fetch_products_at_offset, start, sz, category,
+                    catalog.PMIN, catalog.SRULE, total_products, parse_stage,
+                    page_cache, checkpoints,
+                    host=catalog.CONTINENTE_HOST, priority=priority)
+        pages.append((start, task))
+        tasks.append(task)
+    tasks.append(Task(f"continente/{category}/save", _save_continente,
+                      category, pages, total_products, base_path,
+                      parse_stage, page_cache, checkpoints,
+                      priority=priority, deps=tasks))
+    return tasks
+
+
+def _save_pingo_doce(categoria, pages, base_path, parse_stage, page_cache,
+                     checkpoints):
+    df = collect_category(
+        pingo_doce.collect_pages, categoria, pages,
+        lambda cp: pingo_doce.fetch_and_parse_page(
+            cp, categoria, parse_stage=parse_stage, page_cache=page_cache,
+            checkpoints=checkpoints),
+        checkpoints)
+    return pingo_doce.write_category(categoria, df, base_path, checkpoints)
+
+
+def pingo_doce_tasks(categoria, base_path, parse_stage=None, page_cache=None,
+                     checkpoints=None, priority=0):
+    """
+    Fetches page 1 of a Pingo Doce category and returns the tasks of its
+    other pages and of its save. `priority` is the last run's page count;
+    the tasks are prioritised by the freshly fetched one.
+    """
+    if checkpoints is None:
+        done = {}
+    elif checkpoints.finished("pingo_doce", categoria):
+        logger.info(f"Pingo Doce category '{categoria}' already saved, "
+                    f"skipping")
+        return []
+    else:
+        done = checkpoints.pages("pingo_doce", categoria)
+    first_page, last_page = pingo_doce.fetch_first_page(
+        categoria, page_cache, checkpoints, done)
+
+    priority = page_priority(last_page, priority)
+    pages = [(1, first_page)]
+    tasks = []
+    for cp in range(2, last_page + 1):
+        if cp in done:
+            pages.append((cp, done[cp].batch))
+            continue
+        task = Task(f"pingo_doce/{categoria}/{cp}",
+                    pingo_doce.fetch_and_parse_page, cp, categoria,
+                    parse_stage=parse_stage, page_cache=page_cache,
+                    checkpoints=checkpoints,
+                    host=pingo_doce.PINGO_DOCE_HOST, priority=priority)
+        pages.append((cp, task))
+        tasks.append(task)
+    tasks.append(Task(f"pingo_doce/{categoria}/save", _save_pingo_doce,
+                      categoria, pages, base_path, parse_stage, page_cache,
+                      checkpoints,
+                      priority=priority, deps=tasks))
+    return tasks
+
+
+def host_slots(retailers):
+    """Maximum running tasks per host: the host's engine concurrency."""
+    return {HOSTS[retailer]: engine.host_limits(HOSTS[retailer]).concurrency
+            for retailer in retailers}
+
+
+def report(scheduler, timeline_path=None):
+    """Logs the per-host summary and slowest tasks, and writes the timeline."""
+    makespan = scheduler.finished - scheduler.started
+    logger.info(f"Scrape finished in {makespan:.1f}s with "
+                f"{len(scheduler.tasks)} tasks")
+    for host, summary in scheduler.summary().items():
+        first_start = summary["first_start"] or 0.0
+        span = (summary["last_finish"] or 0.0) - first_start
+        logger.info(f"  {host}: {summary['tasks']} tasks "
+                    f"({summary['failed']} failed, "
+                    f"{summary['skipped']} skipped), "
+                    f"busy {summary['busy']:.1f}s, "
+                    f"active from {first_start:.1f}s for {span:.1f}s")
+    slowest = sorted((record for record in scheduler.timeline()
+                      if record["duration"] is not None),
+                     key=lambda record: record["duration"], reverse=True)[:10]
+    for record in slowest:
+        logger.info(f"  {record['duration']:>8.2f}s  {record['name']} "
+                    f"[{record['status']}] "
+                    f"started at {record['started']:.1f}s")
+    if timeline_path is not None:
+        path = scheduler.write_timeline(timeline_path)
+        logger.info(f"Timeline written to {path}")
+
+
+def auchan_tasks(base_path, day, parse_stage=None, page_cache=None,
+                 checkpoints=None):
+    """Returns one task per Auchan cgid not saved yet."""
+    auchan_logger = auchan.run_logger(day)
+    tasks = []
+    for cgid in auchan.CGIDS:
+        if checkpoints is not None and checkpoints.finished("auchan", cgid):
+            logger.info(f"Auchan cgid '{cgid}' already saved, skipping")
+            continue
+        tasks.append(Task(
+            f"auchan/{cgid}", auchan.save_data_for_cgid, cgid,
+            auchan.PREFN1, auchan.PREFV1, auchan.PAGE_SIZE, auchan.BASE_URL,
+            base_path, day, auchan_logger, parse_stage, page_cache,
+            checkpoints, host=auchan.AUCHAN_HOST,
+            priority=estimated_pages(page_cache, "auchan", cgid)))
+    return tasks
+
+
+def log_run_stats(retailers, page_cache=None):
+    """Logs the page-cache and fetch statistics of each retailer."""
+    if "continente" in retailers:
+        catalog.log_run_stats(page_cache)
+    if "pingo_doce" in retailers:
+        pingo_doce.log_run_stats(page_cache)
+    if "auchan" in retailers:
+        auchan.log_run_stats(logger, page_cache)
+
+
+def run(raw_path="data/raw", retailers=RETAILERS, workers=WORKERS,
+        parse_workers=None, page_cache=None, checkpoints=None,
+        timeline_path=None):
+    """
+    Scrapes the retailers into `raw_path`/<retailer>/YYYYMMDD as one job
+    DAG.
+
+    Args:
+        raw_path (str): Root of the raw snapshots.
+        retailers (tuple): The retailers to scrape (see RETAILERS).
+        workers (int): Size of the shared worker pool.
+        parse_workers (int): Number of parser processes. Defaults to parsing
+            in the worker threads.
+        page_cache (page_cache.PageCache): Conditional fetching and reuse of
+            unchanged pages; also gives the category sizes for priorities.
+        checkpoints (checkpoint.CheckpointJournal): Journal of completed
+            pages and categories, so that a restarted run resumes.
+        timeline_path (str): Where the per-task timeline JSON is written.
+
+    Returns:
+        scheduler.Scheduler: The finished scheduler, with its timeline.
+    """
+    day = datetime.now().strftime("%Y%m%d")
+    scheduler = Scheduler(workers=workers, host_slots=host_slots(retailers),
+                          logger=logger)
+    parse_stage = ParseStage(workers=parse_workers) if parse_workers else None
+
+    def directory(retailer):
+        path = os.path.join(raw_path, retailer, day)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def add_expanding(retailer, category, plan, base_path):
+        priority = estimated_pages(page_cache, retailer, category)
+        scheduler.add(Task(f"{retailer}/{category}/first", plan, category,
+                           base_path, parse_stage, page_cache, checkpoints,
+                           priority, host=HOSTS[retailer],
+                           priority=DISCOVERY_PRIORITY + priority,
+                           expands=True))
+
+    if "continente" in retailers:
+        catalog.start_run(page_cache=page_cache)
+        base_path = directory("continente")
+        for category in catalog.CATEGORIES:
+            add_expanding("continente", category, continente_tasks, base_path)
+
+    if "pingo_doce" in retailers:
+        pingo_doce.start_run(page_cache=page_cache)
+        base_path = directory("pingo_doce")
+        for categoria in pingo_doce.CATEGORIES:
+            add_expanding("pingo_doce", categoria, pingo_doce_tasks, base_path)
+
+    if "auchan" in retailers:
+        auchan.start_run(page_cache=page_cache)
+        for task in auchan_tasks(directory("auchan"), day, parse_stage,
+                                 page_cache, checkpoints):
+            scheduler.add(task)
+
+    try:
+        scheduler.run()
+    finally:
+        if parse_stage is not None:
+            parse_stage.close()
+
+    log_run_stats(retailers, page_cache)
+    report(scheduler, timeline_path)
+    return scheduler
+
+
+def run_flow(**kwargs):
+    """Runs `run` as a Prefect flow, for its UI and run history."""
+    if flow is None:
+        raise ImportError("run_flow requires prefect")
+    return flow(name="scrape-retailers", log_prints=True)(run)(**kwargs)
@@ -0,0 +1,248 @@
+"""
+Conditional fetching and parsed-row reuse for listing pages.
+
+For every (retailer, category, offset) the `PageCache` keeps, in a SQLite
+file, the ETag and Last-Modified validators of the last response, a hash
+of its body and the column batch it was parsed into. On the next run:
+
+- the request is sent with If-None-Match / If-Modified-Since, and a
+  `304 Not Modified` answer reuses the stored rows without a body;
+- otherwise, if the body hashes to the stored value, the stored rows are
+  reused instead of parsing the page again;
+- only pages that really changed are parsed, and their rows stored.
+
+`PageCacheStats` counts the pages of the run in each case, per retailer.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    retailer TEXT NOT NULL,
+    category TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT NOT NULL,
+    rows BLOB NOT NULL,
+    extra TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (retailer, category, page)
+)
+"""
+
+
+class PageCacheStats:
+    """Counts the pages of a run by how they were obtained."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pages = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.parsed = 0
+
+    @property
+    def skipped(self):
+        return self.not_modified + self.unchanged
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "parsed": self.parsed,
+            "skipped": self.skipped,
+        }
+
+    def __str__(self):
+        return (f"{self.pages} pages, {self.skipped} skipped "
+                f"({self.not_modified} not modified, {self.unchanged} "
+                f"unchanged), {self.parsed} parsed")
+
+
+class PageEntry:
+    """The stored state of one page."""
+
+    def __init__(self, etag, last_modified, body_hash, rows, extra):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self._rows = rows
+        self.extra = json.loads(extra) if extra else {}
+
+    @property
+    def batch(self):
+        """The stored column batch."""
+        return json.loads(zlib.decompress(self._rows))
+
+
+def body_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    """
+    Validators, body hashes and parsed rows of listing pages.
+
+    Args:
+        path (str): The SQLite file. Created on first use.
+
+    Example:
+        >>> page_cache = PageCache("data/cache/pages.sqlite3")
+        >>> batch = page_cache.fetch(("auchan", cgid, start), fetch,
+        ...                          parse_product_columns)
+        >>> print(page_cache.stats("auchan"))
+    """
+
+    def __init__(self, path="data/cache/pages.sqlite3"):
+        self.path = path
+        self._stats = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def stats(self, retailer):
+        """Returns the `PageCacheStats` of a retailer."""
+        with self._lock:
+            return self._stats.setdefault(retailer, PageCacheStats())
+
+    def lookup(self, key):
+        """
+        Returns the stored `PageEntry` for a (retailer, category, page) key,
+        or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body_hash, rows, extra "
+                "FROM pages WHERE retailer = ? AND category = ? AND page = ?",
+                key).fetchone()
+        return PageEntry(*row) if row else None
+
+    def page_count(self, retailer, category):
+        """The number of stored pages of a category, i.e. its size last run."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM pages "
+                "WHERE retailer = ? AND category = ?",
+                (retailer, category)).fetchone()[0]
+
+    @staticmethod
+    def conditional_headers(entry):
+        """The If-None-Match / If-Modified-Since headers for an entry."""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def reuse(self, key, entry, response):
+        """
+        Decides whether the stored rows of `key` still hold for `response`.
+
+        Returns:
+            PageEntry: The entry when the response is a 304 or has the
+            same body hash; None when the page must be parsed.
+        """
+        stats = self.stats(key[0])
+        with self._lock:
+            stats.pages += 1
+            if entry is None:
+                return None
+            if response.status == 304:
+                stats.not_modified += 1
+                return entry
+            if body_hash(response.body) == entry.body_hash:
+                stats.unchanged += 1
+                return entry
+        return None
+
+    def store(self, key, response, batch, extra=None):
+        """Records the validators, body hash and parsed rows of a page."""
+        rows = zlib.compress(json.dumps(batch).encode("utf-8"))
+        stats = self.stats(key[0])
+        with self._lock:
+            stats.parsed += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, response.headers.get("ETag"),
+                 response.headers.get("Last-Modified"),
+                 body_hash(response.body), rows,
+                 json.dumps(extra) if extra else None, time.time()))
+            self._db.commit()
+
+    def fetch(self, key, fetch, parse_func, *args, parse_stage=None, **kwargs):
+        """
+        Fetches a page conditionally and returns its column batch, parsing
+        it only if it changed.
+
+        Args:
+            key (tuple): (retailer, category, page offset or number).
+            fetch (callable): Called with the conditional headers; returns
+                the `http_engine.Response`.
+            parse_func (callable): Top-level parser called as
+                `parse_func(body, *args, encoding=..., **kwargs)`.
+            parse_stage (pipeline.ParseStage): If given, changed pages are
+                parsed in its worker processes and a Future is returned.
+
+        Returns:
+            dict or Future: The column batch, or a Future of it.
+        """
+        entry = self.lookup(key)
+        response = fetch(self.conditional_headers(entry))
+        if self.reuse(key, entry, response) is not None:
+            return entry.batch
+
+        if parse_stage is None:
+            batch = parse_func(response.body, *args,
+                               encoding=response.encoding, **kwargs)
+            self.store(key, response, batch)
+            return batch
+
+        future = parse_stage.submit(parse_func, response.body, *args,
+                                    encoding=response.encoding, **kwargs)
+
+        def store(done):
+            if done.exception() is None:
+                self.store(key, response, done.result())
+
+        future.add_done_callback(store)
+        return future
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def fetch_columns(key, fetch, parse_func, *args, page_cache=None,
+                  parse_stage=None, **kwargs):
+    """
+    Fetches and parses a page into a column batch, through `page_cache`
+    when one is given.
+
+    Without a cache `fetch` is called with no conditional headers; with a
+    `parse_stage` a Future of the batch is returned (see `PageCache.fetch`).
+    """
+    if page_cache is not None:
+        return page_cache.fetch(key, fetch, parse_func, *args,
+                                parse_stage=parse_stage, **kwargs)
+    response = fetch({})
+    if parse_stage is not None:
+        return parse_stage.submit(parse_func, response.body, *args,
+                                  encoding=response.encoding, **kwargs)
+    return parse_func(response.body, *args, encoding=response.encoding,
+                      **kwargs)
@@ -1,7 +1,5 @@
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
 import sys
 import os
 from logger import setup_logger
@@ -12,24 +10,58 @@ src_path = os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 sys.path.append(src_path)
 
-from utils import retry_on_failure
-import time
-
-
-@retry_on_failure(retries=3, delay=60)
-def fetch_html_from_pingodoce(cp, categoria):
+from utils import retry_on_failure, dump_debug_html  # noqa: E402
+from retry import CATEGORY_RETRY, PAGE_RETRY  # noqa: E402
+from http_engine import FetchError, engine  # noqa: E402
+from html_parser import parse_html, find_elements  # noqa: E402
+from metrics import metrics, timed  # noqa: E402
+from pipeline import ColumnBuffer, ParseStage, rows_to_columns  # noqa: E402
+from storage import write_snapshot  # noqa: E402
+from normalize import add_prices  # noqa: E402
+from observations import write_observations  # noqa: E402
+from page_cache import PageCache, fetch_columns  # noqa: E402
+
+PINGO_DOCE_HOST = "www.pingodoce.pt"
+
+# Politeness budget shared by every category fetched in parallel; the rate
+# adapts to the site's latency and errors (see http_engine.AdaptiveThrottle)
+engine.configure_host(PINGO_DOCE_HOST, concurrency=4, rate=1.0, burst=2,
+                      min_rate=0.2, max_rate=4.0)
+
+# Categories scraped every run
+CATEGORIES = [
+    "pingo-doce-lacticinios", "pingo-doce-bebidas",
+    "pingo-doce-frescos-embalados", "pingo-doce-higiene-e-beleza",
+    "pingo-doce-maquinas-e-capsulas-de-cafe", "pingo-doce-mercearia",
+    "pingo-doce-refeicoes-prontas", "pingo-doce-cozinha-e-limpeza",
+    "pingo-doce-congelados"
+]
+
+# Keep-alive pool shared by every request to Pingo Doce
+session = engine.session("pingo-doce", pool_size=4)
+
+
+@retry_on_failure(policy=PAGE_RETRY)
+def fetch_html_from_pingodoce(cp, categoria, raw=False, headers=None):
     """
-    Fetches the HTML content for a specific category page from the Pingo Doce website.
+    Fetches the HTML content for a specific category page from the Pingo
+    Doce website.
 
     Parameters:
     - cp (int): The postal code used to filter the products.
-    - categoria (str): The category of products to fetch (e.g., "pingo-doce-lacticinios").
+    - categoria (str): The category of products to fetch (e.g.,
+      "pingo-doce-lacticinios").
+    - raw (bool): Return the `http_engine.Response` (body bytes and encoding)
+      instead of the decoded text.
+    - headers (dict): Extra request headers, e.g. conditional request
+      headers.
 
     Returns:
     - str: The HTML content of the page.
 
     Raises:
-    - requests.exceptions.HTTPError: If the request to the server fails (non-200 status code).
+    - http_engine.FetchError: If the request to the server fails (status
+      code >= 400).
 
     Example:
     >>> html_content = fetch_html_from_pingodoce(cp=1000, categoria="pingo-doce-lacticinios")
@@ -46,20 +78,18 @@ def fetch_html_from_pingodoce(cp, categoria):
         "novidades": 0
     }
 
-    response = requests.get(url, params=payload)
+    response = session.get(url, params=payload, headers=headers)
+    dump_debug_html(response.body, f"pingo_doce_{categoria}_{cp}")
+    return response if raw else response.text
 
-    if response.status_code == 200:
-        return response.text
-    else:
-        response.raise_for_status()
 
-
-def parse_last_page(html_content):
+def parse_last_page(html_content, backend=None):
     """
     Parses the HTML content to determine the last page number of the product listings.
 
     Parameters:
     - html_content (str): The HTML content of the page to parse.
+    - backend (str): The HTML parser backend (see html_parser.BACKENDS).
 
     Returns:
     - int: The last page number of the product listings (e.g., 5).
@@ -69,24 +99,111 @@ def parse_last_page(html_content):
     >>> last_page = parse_last_page(html_content)
     >>> print(last_page)  # Prints the last page number (e.g., 5).
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-
     # Find all elements with the class 'page js-change-page'
-    pages = soup.find_all('div', class_='page js-change-page')
+    pages = find_elements(html_content, 'div', 'page js-change-page', backend)
 
-    if pages:
-        last_page = pages[-1]['data-page']
+    last_page = None
+    for page in pages:
+        last_page = page['data-page']
+
+    if last_page is not None:
         return int(last_page)
     else:
         return None
 
 
-def parse_products_from_html(html_content):
+def parse_product_card(product):
+    """
+    Extracts one product's details from a `div.product-cards` element.
+
+    Parameters:
+    - product: The product card element (BeautifulSoup-compatible node).
+
+    Returns:
+    - dict: The product's ID, name, price, image URL, URL and rating.
+    """
+    product_data = {}
+
+    # Extract product details
+    product_url = product.find('a', class_='product-cards__link')['href']
+    product_data['product_url'] = product_url
+    product_id = product_url.split('/')[-2]
+    product_data['product_id'] = product_id
+    product_name = product.find(
+        'h3', class_='product-cards__title').text.strip()
+    product_data['product_name'] = product_name
+    product_price = product.find(
+        'span', class_='product-cards_price').text.strip()
+    product_data['product_price'] = product_price
+    product_image = product.find('img',
+                                 class_='product-cards__image')['src']
+    product_data['product_image'] = product_image
+
+    try:
+        product_rating = product.find('div', class_='bv_text').text.strip()
+        product_data['product_rating'] = product_rating
+    except Exception:
+        product_data['product_rating'] = None
+
+    return product_data
+
+
+# Schema of the product details DataFrame
+PRODUCT_SCHEMA = {
+    "product_id": 'str',
+    "product_name": 'str',
+    "product_price": 'str',
+    "product_image": 'str',
+    "product_url": 'str',
+    "product_rating": 'str'
+}
+
+
+@timed("parse")
+def parse_product_columns(html_content, backend=None, encoding=None):
+    """
+    Parses a listing page into a column batch. Top-level so it can run in a
+    `pipeline.ParseStage` worker process.
+
+    Parameters:
+    - html_content (str, bytes or document): The page to parse.
+    - backend (str): The HTML parser backend (see html_parser.BACKENDS).
+    - encoding (str): Encoding of a bytes body.
+
+    Returns:
+    - dict: Column name -> list of values, one column per schema field.
+    """
+    # Raw HTML only builds the product card subtrees
+    products = find_elements(html_content, 'div', 'product-cards', backend,
+                             encoding)
+
+    return rows_to_columns(
+        (parse_product_card(product) for product in products),
+        list(PRODUCT_SCHEMA))
+
+
+def products_to_frame(batch):
+    """
+    Builds the product details DataFrame from a column batch.
+
+    Parameters:
+    - batch (dict): Column batch returned by `parse_product_columns`.
+
+    Returns:
+    - pd.DataFrame: The products, with the columns and dtypes of the
+      schema.
+    """
+    buffer = ColumnBuffer(PRODUCT_SCHEMA, PRODUCT_SCHEMA)
+    return buffer.extend(batch).to_frame()
+
+
+def parse_products_from_html(html_content, backend=None):
     """
     Parses the HTML content to extract product details, including ID, name, price, image URL, and rating.
 
     Parameters:
     - html_content (str): The HTML content of the page to parse.
+    - backend (str): The HTML parser backend (see html_parser.BACKENDS).
 
     Returns:
     - pd.DataFrame: A pandas DataFrame containing product details such as product ID, name, price, 
@@ -96,104 +213,282 @@ def parse_products_from_html(html_content):
     >>> products_df = parse_products_from_html(html_content)
     >>> print(products_df.head())  # Prints the first few rows of the parsed product DataFrame.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    return products_to_frame(parse_product_columns(html_content, backend))
 
-    product_schema = {
-        "product_id": pd.Series(dtype='str'),
-        "product_name": pd.Series(dtype='str'),
-        "product_price": pd.Series(dtype='str'),
-        "product_image": pd.Series(dtype='str'),
-        "product_url": pd.Series(dtype='str'),
-        "product_rating": pd.Series(dtype='str')
-    }
-
-    product_df = pd.DataFrame(product_schema)
-    products = soup.find_all('div', class_='product-cards')
 
-    product_list = []
-
-    for product in products:
-        product_data = {}
+# Assume setup_logger is defined elsewhere
+logger = setup_logger("logs/pingo_doce_scraper.log")
 
-        # Extract product details
-        product_url = product.find('a', class_='product-cards__link')['href']
-        product_data['product_url'] = product_url
-        product_id = product_url.split('/')[-2]
-        product_data['product_id'] = product_id
-        product_name = product.find(
-            'h3', class_='product-cards__title').text.strip()
-        product_data['product_name'] = product_name
-        product_price = product.find(
-            'span', class_='product-cards_price').text.strip()
-        product_data['product_price'] = product_price
-        product_image = product.find('img',
-                                     class_='product-cards__image')['src']
-        product_data['product_image'] = product_image
 
-        try:
-            product_rating = product.find('div', class_='bv_text').text.strip()
-            product_data['product_rating'] = product_rating
-        except:
-            product_data['product_rating'] = None
+def fetch_and_parse_page(cp, categoria, html_content=None, parse_stage=None,
+                         page_cache=None, checkpoints=None):
+    """
+    Fetches (unless `html_content` is given) and parses one listing page.
 
-        product_list.append(product_data)
+    With a `parse_stage` the raw page is handed to its worker processes and
+    a future of the page's column batch is returned instead. With a
+    `page_cache` the request is conditional and an unchanged page reuses
+    its stored rows. With a `checkpoints` journal the fetched page is
+    recorded once parsed.
 
-    # Convert list of products to DataFrame
-    product_df = pd.concat([product_df, pd.DataFrame(product_list)],
-                           ignore_index=True)
-    product_df = product_df.reindex(columns=product_schema.keys())
+    Returns:
+    - dict: The page's products as a column batch, or None if the page
+      failed.
+    """
+    try:
+        if html_content is None:
+            products = fetch_columns(
+                ("pingo_doce", categoria, cp),
+                lambda headers: fetch_html_from_pingodoce(
+                    cp, categoria, raw=True, headers=headers),
+                parse_product_columns,
+                page_cache=page_cache, parse_stage=parse_stage)
+            if checkpoints is not None:
+                checkpoints.track(("pingo_doce", categoria, cp), products)
+            if isinstance(products, Future):
+                logger.info(f"Fetched page {cp} for category {categoria}")
+                return products
+        else:
+            products = parse_product_columns(html_content)
+        logger.info(f"Successfully parsed page {cp} for category {categoria}: "
+                    f"{len(products['product_id'])} products")
+        return products
+    except Exception as e:
+        logger.error(f"Error parsing page {cp} for category {categoria}: "
+                     f"{str(e)}", exc_info=True)
+        return None
 
-    assert list(product_df.columns) == list(
-        product_schema.keys()), "DataFrame structure does not match the schema"
 
-    return product_df
+def fetch_first_page(categoria, page_cache=None, checkpoints=None, done=None):
+    """
+    Fetches and parses page 1 of a category, which also gives its last page.
 
+    Parameters:
+    - categoria (str): The category.
+    - page_cache (page_cache.PageCache): If given, an unchanged page 1
+      reuses its stored rows and page count.
+    - checkpoints (checkpoint.CheckpointJournal): If given, the page is
+      recorded with its page count.
+    - done (dict): Pages checkpointed by an earlier attempt (see
+      `CheckpointJournal.pages`).
 
-# Assume setup_logger is defined elsewhere
-logger = setup_logger("logs/pingo_doce_scraper.log")
+    Returns:
+    - tuple: (column batch or None, last page number).
 
-@retry_on_failure(retries=3, delay=60)
-def parse_all_pages_for_category(categoria):
-    """
-    Fetches and parses all pages for a specific category on the Pingo Doce website.
+    Raises:
+    - http_engine.FetchError: If page 1 cannot be fetched.
     """
-    logger.info(f"Starting to parse all pages for category: {categoria}")
-    first_page_html = fetch_html_from_pingodoce(cp=1, categoria=categoria)
-    last_page = parse_last_page(first_page_html)
+    key = ("pingo_doce", categoria, 1)
+    if done and 1 in done:
+        last_page = done[1].extra.get("last_page")
+        first_page = done[1].batch
+    else:
+        entry = page_cache.lookup(key) if page_cache is not None else None
+        response = fetch_html_from_pingodoce(
+            cp=1, categoria=categoria, raw=True,
+            headers=PageCache.conditional_headers(entry))
+        if page_cache is not None and page_cache.reuse(key, entry, response):
+            # Unchanged first page: its rows and page count still hold
+            last_page = entry.extra.get("last_page")
+            first_page = entry.batch
+        else:
+            with metrics.timer("parse_document"):
+                document = parse_html(response.text)
+            last_page = parse_last_page(document)
+            first_page = fetch_and_parse_page(1, categoria, document)
+            if page_cache is not None and first_page is not None:
+                page_cache.store(key, response, first_page,
+                                 {"last_page": last_page})
+        if checkpoints is not None and first_page is not None:
+            checkpoints.record(key, first_page, {"last_page": last_page})
 
     if last_page is None:
         last_page = 1
-        logger.warning(f"Could not determine last page for category {categoria}. Assuming only 1 page.")
+        logger.warning(f"Could not determine last page for category "
+                       f"{categoria}. Assuming only 1 page.")
     else:
         logger.info(f"Found {last_page} pages for category {categoria}")
+    return first_page, last_page
+
+
+def collect_pages(categoria, pages, checkpoints=None):
+    """
+    Builds the category DataFrame from its pages, in page order.
+
+    Parameters:
+    - categoria (str): The category.
+    - pages (list): (page number, page) pairs, where a page is a column
+      batch, a Future of one, or None for a page that failed.
+    - checkpoints (checkpoint.CheckpointJournal): If given, a failed page
+      raises FetchError instead of returning partial data.
 
-    all_products_df = pd.DataFrame()
-
-    for cp in range(1, last_page + 1):
-        logger.debug(f"Fetching page {cp} of {last_page} for category {categoria}")
-        try:
-            html_content = fetch_html_from_pingodoce(cp, categoria)
-            products_df = parse_products_from_html(html_content)
-            all_products_df = pd.concat([all_products_df, products_df], ignore_index=True)
-            logger.info(f"Successfully parsed page {cp} for category {categoria}. Total products so far: {len(all_products_df)}")
-        except Exception as e:
-            logger.error(f"Error parsing page {cp} for category {categoria}: {str(e)}", exc_info=True)
-        
-        time.sleep(3)
-        logger.debug(f"Waiting 3 seconds before next request")
+    Returns:
+    - pd.DataFrame: The products, with their source and timestamp.
+    """
+    # Pages are appended column-wise and materialised once per category
+    products = ColumnBuffer(PRODUCT_SCHEMA, PRODUCT_SCHEMA)
+    failed = 0
+    for cp, page in pages:
+        if isinstance(page, Future):
+            try:
+                page = page.result()
+                logger.info(f"Successfully parsed page {cp} for category "
+                            f"{categoria}: {len(page['product_id'])} "
+                            f"products")
+            except Exception as e:
+                logger.error(f"Error parsing page {cp} for category "
+                             f"{categoria}: {str(e)}", exc_info=True)
+                page = None
+        if page is not None:
+            products.extend(page)
+        else:
+            failed += 1
+
+    if failed and checkpoints is not None:
+        raise FetchError(f"{failed} pages of category {categoria} failed; "
+                         f"the completed pages are checkpointed")
+
+    all_products_df = products.to_frame()
+    # "0,15€ / UN" as a number and its unit
+    add_prices(all_products_df, "product_price", "product_price_value",
+               "product_price_unit")
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     all_products_df["source"] = "pingo-doce"
     all_products_df["timestamp"] = timestamp
 
-    logger.info(f"Completed parsing all pages for category {categoria}. Total products: {len(all_products_df)}")
+    logger.info(f"Completed parsing all pages for category {categoria}. "
+                f"Total products: {len(all_products_df)}")
     return all_products_df
 
-def parse_and_save_all_categories(categories, base_path="data/raw/pingo_doce"):
+
+@retry_on_failure(policy=CATEGORY_RETRY)
+def parse_all_pages_for_category(categoria, max_workers=4, parse_stage=None,
+                                 page_cache=None, checkpoints=None):
+    """
+    Fetches and parses all pages for a specific category on the Pingo Doce
+    website.
+
+    Page 1 is fetched once to find the last page and is reused as the first
+    result. Pages 2..N are then downloaded concurrently by up to
+    `max_workers` threads (`max_workers=1` walks them serially) and put back
+    in page order. With a `parse_stage` they are parsed in its worker
+    processes; with a `page_cache` unchanged pages are not parsed again.
+
+    With a `checkpoints` journal, completed pages are recorded and those of
+    an earlier attempt are not fetched again; a failed page then raises
+    FetchError so that the retry resumes the category.
+    """
+    logger.info(f"Starting to parse all pages for category: {categoria}")
+    done = {}
+    if checkpoints is not None:
+        done = checkpoints.pages("pingo_doce", categoria)
+    if done:
+        logger.info(f"Resuming category {categoria}: {len(done)} pages "
+                    f"checkpointed")
+
+    first_page, last_page = fetch_first_page(categoria, page_cache,
+                                             checkpoints, done)
+
+    # Only the pages not checkpointed by an earlier attempt are fetched
+    missing = [cp for cp in range(2, last_page + 1) if cp not in done]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = dict(zip(missing, executor.map(
+            lambda cp: fetch_and_parse_page(
+                cp, categoria, parse_stage=parse_stage,
+                page_cache=page_cache, checkpoints=checkpoints),
+            missing)))
+
+    pages = [(1, first_page)] + [
+        (cp, done[cp].batch if cp in done else fetched[cp])
+        for cp in range(2, last_page + 1)]
+    return collect_pages(categoria, pages, checkpoints)
+
+
+def write_category(categoria, all_products_df, base_path, checkpoints=None):
+    """
+    Writes the products of a category as a snapshot file and marks it as
+    finished in the `checkpoints` journal. Returns the path written, or None
+    if there were no products.
+    """
+    if all_products_df.empty:
+        logger.warning(f"No data found for category '{categoria}'. "
+                       f"Skipping...")
+        return None
+    file_path = write_snapshot(all_products_df, base_path,
+                               categoria.replace(' ', '_'),
+                               float_columns=["product_price_value"])
+    # The same rows in the schema shared by every retailer
+    write_observations(all_products_df, "pingo_doce", base_path,
+                       categoria.replace(' ', '_'), category=categoria)
+    if checkpoints is not None:
+        checkpoints.finish("pingo_doce", categoria, file_path)
+    logger.info(f"Saved data for category '{categoria}' to '{file_path}'. "
+                f"Total products: {len(all_products_df)}")
+    return file_path
+
+
+def save_category(categoria, base_path, parse_stage=None, page_cache=None,
+                  checkpoints=None):
     """
-    Parses and saves the product data for multiple categories as CSV files.
+    Parses and saves the product data for a single category as a snapshot
+    file. A category already saved in this run of the `checkpoints` journal
+    is skipped.
     """
-    logger.info(f"Starting to parse and save data for {len(categories)} categories")
+    if checkpoints is not None:
+        file_path = checkpoints.finished("pingo_doce", categoria)
+        if file_path is not None:
+            logger.info(f"Category '{categoria}' already saved to "
+                        f"'{file_path}', skipping")
+            return
+
+    logger.info(f"Processing category: {categoria}")
+    try:
+        all_products_df = parse_all_pages_for_category(
+            categoria, parse_stage=parse_stage, page_cache=page_cache,
+            checkpoints=checkpoints)
+        write_category(categoria, all_products_df, base_path, checkpoints)
+    except Exception as e:
+        logger.error(f"Error processing category {categoria}: {str(e)}",
+                     exc_info=True)
+
+
+def start_run(pool_size=None, page_cache=None):
+    """Applies the connection settings and resets the run's counters."""
+    if pool_size is not None:
+        session.configure(pool_size=pool_size)
+    session.stats.reset()
+    if page_cache is not None:
+        page_cache.stats("pingo_doce").reset()
+
+
+def log_run_stats(page_cache=None):
+    """Logs the connection, request rate and page cache counters of the run."""
+    logger.info(f"Connection stats: {session.stats}")
+    logger.info(f"Request rate: {engine.throttle(PINGO_DOCE_HOST)}")
+    if page_cache is not None:
+        logger.info(f"Page cache stats: {page_cache.stats('pingo_doce')}")
+
+
+def parse_and_save_all_categories(categories=None,
+                                  base_path="data/raw/pingo_doce",
+                                  max_workers=4, pool_size=None,
+                                  parse_workers=None, page_cache=None,
+                                  checkpoints=None):
+    """
+    Parses and saves the product data for multiple categories (`CATEGORIES`
+    by default) as snapshot files.
+    Categories are fetched concurrently by `max_workers` threads over a
+    keep-alive pool of `pool_size` connections. With `parse_workers` set,
+    pages are parsed by that many worker processes. With a
+    `page_cache.PageCache`, unchanged pages reuse the rows of the last run.
+    With a `checkpoint.CheckpointJournal`, a run restarted on the same day
+    skips the saved categories and resumes the others where they stopped.
+    """
+    categories = categories or CATEGORIES
+    logger.info(f"Starting to parse and save data for {len(categories)} "
+                f"categories")
+    start_run(pool_size, page_cache)
 
     base_path = base_path + "/" + datetime.now().strftime("%Y%m%d")
 
@@ -201,31 +496,22 @@ def parse_and_save_all_categories(categories, base_path="data/raw/pingo_doce"):
         os.makedirs(base_path)
         logger.info(f"Created directory: {base_path}")
 
-    for categoria in categories:
-        logger.info(f"Processing category: {categoria}")
-        try:
-            all_products_df = parse_all_pages_for_category(categoria)
-
-            if not all_products_df.empty:
-                csv_filename = f"{categoria.replace(' ', '_')}.csv"
-                file_path = os.path.join(base_path, csv_filename)
-                all_products_df.to_csv(file_path, index=False)
-                logger.info(f"Saved data for category '{categoria}' to '{file_path}'. Total products: {len(all_products_df)}")
-            else:
-                logger.warning(f"No data found for category '{categoria}'. Skipping...")
-        except Exception as e:
-            logger.error(f"Error processing category {categoria}: {str(e)}", exc_info=True)
-
+    parse_stage = ParseStage(workers=parse_workers) if parse_workers else None
+
+    # Fetch categories concurrently; the engine enforces the host budget
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda categoria: save_category(
+                    categoria, base_path, parse_stage, page_cache,
+                    checkpoints),
+                categories))
+    finally:
+        if parse_stage is not None:
+            parse_stage.close()
+
+    log_run_stats(page_cache)
     logger.info("Completed parsing and saving data for all categories")
 
-
 if __name__ == "__main__":
-    # Example usage
-    categories = [
-        "pingo-doce-lacticinios", "pingo-doce-bebidas",
-        "pingo-doce-frescos-embalados", "pingo-doce-higiene-e-beleza",
-        "pingo-doce-maquinas-e-capsulas-de-cafe", "pingo-doce-mercearia",
-        "pingo-doce-refeicoes-prontas", "pingo-doce-cozinha-e-limpeza", "pingo-doce-congelados"
-    ]
-
-    parse_and_save_all_categories(categories)
+    parse_and_save_all_categories()
@@ -0,0 +1,175 @@
+"""
+Process-pool parse stage decoupled from the network fetch.
+
+Fetcher threads stay I/O-bound: they hand the raw response bytes of each
+page to a `ParseStage` and move on to the next request. The stage keeps a
+bounded number of pages pending (a full queue blocks the fetchers, so a
+slow parse stage throttles the downloads instead of buffering pages without
+limit) and parses them on a `ProcessPoolExecutor`, so parse throughput
+scales with the number of cores instead of being serialised by the GIL.
+
+Parse functions must be importable top-level functions; they receive the
+raw bytes and return a column batch: a dict mapping column names to lists
+of values, which is cheap to pickle back to the parent process. The batches
+of a category are collected in a `ColumnBuffer` and materialised as a single
+DataFrame once the category is complete. Parse times (measured in the
+workers) and frame building times are recorded in `metrics.metrics`.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pandas as pd
+
+from metrics import metrics
+
+
+def rows_to_columns(rows, columns):
+    """
+    Turns an iterable of row dicts into a column batch.
+
+    Args:
+        rows (iterable): Dicts keyed by column name.
+        columns (list): The column names, in output order.
+
+    Returns:
+        dict: Column name -> list of values.
+    """
+    return ColumnBuffer(columns).append_rows(rows).columns
+
+
+class ColumnBuffer:
+    """
+    Per-column append buffers for the rows of one category.
+
+    Pages are appended as they are parsed (row by row or as whole column
+    batches) and the DataFrame is built once at the end, so the cost of a
+    category is linear in its number of pages instead of copying the
+    accumulated frame on every page.
+
+    Args:
+        columns (list): The column names, in output order.
+        dtypes (dict): Optional column name -> dtype applied when the frame
+            is built. Columns without a dtype are inferred.
+
+    Example:
+        >>> buffer = ColumnBuffer(["product_id", "product_price"],
+        ...                       {"product_price": "float"})
+        >>> buffer.extend({"product_id": ["1"], "product_price": [0.99]})
+        >>> df = buffer.to_frame()
+    """
+
+    def __init__(self, columns, dtypes=None):
+        self.columns = {column: [] for column in columns}
+        self.dtypes = dtypes or {}
+
+    def append_rows(self, rows):
+        """Appends row dicts; missing fields are stored as None."""
+        appends = [(column, values.append)
+                   for column, values in self.columns.items()]
+        for row in rows:
+            for column, append in appends:
+                append(row.get(column))
+        return self
+
+    def extend(self, batch):
+        """Appends a column batch, e.g. one page from `ParseStage`."""
+        length = len(batch[next(iter(batch))]) if batch else 0
+        for column, values in self.columns.items():
+            values.extend(batch.get(column, [None] * length))
+        return self
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def to_frame(self):
+        """Builds the DataFrame, one column at a time."""
+        with metrics.timer("frame"):
+            return pd.DataFrame({
+                column: pd.Series(values, dtype=self.dtypes.get(column))
+                for column, values in self.columns.items()
+            })
+
+
+def _timed_call(func, *args, **kwargs):
+    """Runs `func` in a worker process and returns (result, seconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+class ParseStage:
+    """
+    Bounded queue of raw pages parsed by a pool of worker processes.
+
+    Args:
+        workers (int): Number of parser processes. Defaults to the number
+            of CPUs.
+        queue_size (int): Maximum number of pages submitted but not yet
+            parsed; `submit` blocks while the queue is full.
+
+    Example:
+        >>> with ParseStage(workers=4) as stage:
+        ...     future = stage.submit(parse_product_columns, body, cgid)
+        ...     batch = future.result()
+    """
+
+    def __init__(self, workers=None, queue_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 4 * self.workers
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        # spawn avoids forking the fetch engine's event-loop thread
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, parse_func, body, *args, **kwargs):
+        """
+        Queues a raw page for parsing, blocking while the queue is full.
+
+        Args:
+            parse_func (callable): Top-level function called as
+                `parse_func(body, *args, **kwargs)` in a worker process.
+            body (bytes): The raw response body.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the column batch.
+        """
+        self._slots.acquire()
+        try:
+            timed = self._executor.submit(_timed_call, parse_func, body,
+                                          *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # The parse time is measured in the worker and recorded here
+        future = Future()
+
+        def done(timed):
+            self._slots.release()
+            if timed.cancelled():
+                future.cancel()
+                return
+            error = timed.exception()
+            if error is not None:
+                future.set_exception(error)
+                return
+            batch, seconds = timed.result()
+            metrics.observe("parse", seconds)
+            future.set_result(batch)
+
+        timed.add_done_callback(done)
+        return future
+
+    def close(self):
+        """Waits for the queued pages and stops the worker processes."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
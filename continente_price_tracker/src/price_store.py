@@ -0,0 +1,293 @@
+"""
+Embedded price-history database for queries over every scraped day.
+
+The `PriceStore` keeps, in a SQLite file, one row per (source, product_id,
+date) with the price columns of the observation files (see
+`observations`). It is filled incrementally: `update` loads only the
+observation files it has not seen, or that were rewritten since, so after a
+run it costs the new day's rows only.
+
+Rows are stored clustered on their (source, product_id, date) key, and the
+category and date indexes cover the price, so the queries behind
+`price_series`, `daily_min_max` and `promo_windows` read a few index pages
+instead of loading the snapshot files into pandas.
+
+A product listed in several categories of a day is stored once, in the
+category of the last file loaded.
+"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from metrics import metrics, timed
+from observations import OBSERVATIONS_DIR, SOURCES, conform
+from storage import read_snapshot, snapshot_files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    source TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    category TEXT,
+    product_name TEXT,
+    brand TEXT,
+    price REAL,
+    unit_price REAL,
+    price_unit TEXT,
+    promotion REAL,
+    PRIMARY KEY (source, product_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_category
+    ON prices (category, date, source, price);
+CREATE INDEX IF NOT EXISTS prices_date
+    ON prices (date, source, category, price);
+CREATE TABLE IF NOT EXISTS days (
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (source, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    modified REAL NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+# Observation columns stored, in the order of the prices table
+COLUMNS = ["source", "product_id", "date", "category", "product_name", "brand",
+           "price", "unit_price", "price_unit", "promotion"]
+
+# Decimals kept of the float32 observation prices
+ROUND_DIGITS = 4
+
+# Minimum drop below a product's highest price of the period counted as a
+# promotion when the retailer shows no promotion
+PROMO_DISCOUNT = 0.05
+
+
+def _date(value):
+    """A date bound as YYYY-MM-DD (None stays None)."""
+    if value is None:
+        return None
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _where(conditions):
+    """A WHERE clause and its parameters from (sql, value) pairs, skipping
+    None values."""
+    conditions = [(sql, value) for sql, value in conditions
+                  if value is not None]
+    if not conditions:
+        return "", []
+    return ("WHERE " + " AND ".join(sql for sql, _ in conditions),
+            [value for _, value in conditions])
+
+
+class PriceStore:
+    """
+    Price history of every retailer, loaded from the observation files.
+
+    Args:
+        path (str): The SQLite file. Created on first use.
+
+    Example:
+        >>> store = PriceStore("data/prices.sqlite3")
+        >>> store.update("data/raw")                   # after each run
+        >>> store.price_series("auchan", "255397", start="2024-11-01")
+        >>> store.daily_min_max("bebidas-e-garrafeira")
+        >>> store.promo_windows(source="auchan")
+    """
+
+    def __init__(self, path="data/prices.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    @timed("store")
+    def update(self, raw_path, sources=SOURCES, logger=None):
+        """
+        Loads the observation files not loaded yet, or rewritten since.
+
+        Args:
+            raw_path (str): The directory of the retailer directories, e.g.
+                data/raw.
+            sources (list): Retailers to load.
+            logger (logging.Logger): Optional logger for progress messages.
+
+        Returns:
+            int: The rows loaded.
+        """
+        with self._lock:
+            loaded = dict(self._db.execute("SELECT path, modified FROM files"))
+        total = 0
+        for source in sources:
+            for _, path in snapshot_files(os.path.join(raw_path, source),
+                                          subdirectory=OBSERVATIONS_DIR):
+                modified = os.path.getmtime(path)
+                if loaded.get(path) == modified:
+                    continue
+                rows = self._rows(path)
+                with self._lock:
+                    with self._db:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO prices VALUES "
+                            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                        self._db.executemany(
+                            "INSERT OR IGNORE INTO days VALUES (?, ?)",
+                            {(row[0], row[2]) for row in rows})
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                            (path, modified, len(rows)))
+                total += len(rows)
+        if logger is not None:
+            logger.info(f"Price store {self.path}: {total} rows loaded")
+        metrics.count("stored", total)
+        return total
+
+    @staticmethod
+    def _rows(path):
+        """The rows of one observation file, as tuples of the prices table."""
+        df = conform(read_snapshot(path, COLUMNS))
+        df = df[df["product_id"].notna()]
+        columns = []
+        for column in COLUMNS:
+            values = df[column]
+            if column == "date":
+                values = values.dt.strftime("%Y-%m-%d")
+            elif values.dtype.kind == "f":
+                # float32 prices as their shortest decimals (4.79, not
+                # 4.789999961853027)
+                values = values.astype("float64").round(ROUND_DIGITS)
+            values = values.astype(object)
+            columns.append(values.where(values.notna(), None))
+        return list(zip(*columns))
+
+    def query(self, sql, params=()):
+        """Runs a SELECT on the store and returns its rows as a DataFrame."""
+        with self._lock:
+            df = pd.read_sql_query(sql, self._db, params=params)
+        for column in ("date", "start", "end"):
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], format="%Y-%m-%d")
+        return df
+
+    def price_series(self, source, product_id, start=None, end=None):
+        """
+        The prices of one product, one row per scraped day.
+
+        Args:
+            source (str): One of SOURCES.
+            product_id (str): The retailer's product id.
+            start (str or date): First day, inclusive. Defaults to the oldest.
+            end (str or date): Last day, inclusive. Defaults to the latest.
+
+        Returns:
+            pd.DataFrame: date, price, unit_price, price_unit and promotion.
+        """
+        where, params = _where([("source = ?", source),
+                                ("product_id = ?", str(product_id)),
+                                ("date >= ?", _date(start)),
+                                ("date <= ?", _date(end))])
+        return self.query(
+            "SELECT date, price, unit_price, price_unit, promotion "
+            f"FROM prices {where} ORDER BY date", params)
+
+    def daily_min_max(self, category=None, source=None, start=None, end=None):
+        """
+        The lowest and highest price of each category, day and retailer.
+
+        Args:
+            category (str): Only this category. Defaults to all.
+            source (str): Only this retailer. Defaults to all.
+            start (str or date): First day, inclusive.
+            end (str or date): Last day, inclusive.
+
+        Returns:
+            pd.DataFrame: date, source, category, min_price, max_price and
+            products.
+        """
+        where, params = _where([("category = ?", category),
+                                ("source = ?", source),
+                                ("date >= ?", _date(start)),
+                                ("date <= ?", _date(end))])
+        return self.query(
+            "SELECT date, source, category, MIN(price) AS min_price, "
+            "MAX(price) AS max_price, COUNT(price) AS products "
+            f"FROM prices {where} GROUP BY date, source, category "
+            "ORDER BY date, source, category", params)
+
+    def promo_windows(self, source=None, product_id=None, start=None, end=None,
+                      min_discount=PROMO_DISCOUNT):
+        """
+        The periods a product was on promotion: consecutive scraped days of
+        its retailer on which it had a promotion, or a price at least
+        `min_discount` below its highest price of the period.
+
+        Args:
+            source (str): Only this retailer. Defaults to all.
+            product_id (str): Only this product (with `source`).
+            start (str or date): First day, inclusive.
+            end (str or date): Last day, inclusive.
+            min_discount (float): Price drop counted as a promotion.
+
+        Returns:
+            pd.DataFrame: source, product_id, start, end, days, min_price,
+            regular_price and promotion (the largest shown).
+        """
+        if product_id is not None:
+            product_id = str(product_id)
+        where, params = _where([("p.source = ?", source),
+                                ("p.product_id = ?", product_id),
+                                ("p.date >= ?", _date(start)),
+                                ("p.date <= ?", _date(end))])
+        days_where, days_params = _where([("source = ?", source),
+                                          ("date >= ?", _date(start)),
+                                          ("date <= ?", _date(end))])
+        promo_where = f"{where} AND" if where else "WHERE"
+        # A window is a run of promotion days whose numbers among the
+        # retailer's scraped days are consecutive (gaps and islands)
+        sql = f"""
+            WITH day_numbers AS (
+                SELECT source, date,
+                       ROW_NUMBER() OVER (PARTITION BY source ORDER BY date)
+                           AS n
+                FROM days {days_where}
+            ), regular AS (
+                SELECT source, product_id, MAX(price) AS regular_price
+                FROM prices p {where}
+                GROUP BY source, product_id
+            ), promos AS (
+                SELECT p.source, p.product_id, p.date, p.price, p.promotion,
+                       r.regular_price,
+                       d.n - ROW_NUMBER() OVER (
+                           PARTITION BY p.source, p.product_id ORDER BY p.date)
+                           AS island
+                -- CROSS JOIN keeps this order: one primary-key range of
+                -- prices per product
+                FROM regular r
+                CROSS JOIN prices p
+                    ON p.source = r.source AND p.product_id = r.product_id
+                CROSS JOIN day_numbers d
+                    ON d.source = p.source AND d.date = p.date
+                {promo_where} (p.promotion > 0
+                               OR p.price <= r.regular_price * (1 - ?))
+            )
+            SELECT source, product_id, MIN(date) AS start, MAX(date) AS "end",
+                   COUNT(*) AS days, MIN(price) AS min_price,
+                   MAX(regular_price) AS regular_price,
+                   MAX(promotion) AS promotion
+            FROM promos
+            GROUP BY source, product_id, island
+            ORDER BY source, product_id, start"""
+        return self.query(sql, days_params + params + params + [min_discount])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,184 @@
+"""
+On-disk HTTP response cache for the fetch engine.
+
+Responses are keyed by their run day and request: under a YYYYMMDD
+directory per run day, the SHA-256 of the URL and its sorted query
+parameters names a zlib-compressed file holding the status, headers,
+encoding and body. A run only reuses responses recorded on its own day, so
+each day's recording stays intact for replay. Entries older than the TTL
+are refetched, and when the cache grows past its size limit the least
+recently used entries (by file modification time, refreshed on every hit)
+are evicted, i.e. the oldest days first.
+
+In replay mode the engine answers every request from the recording of one
+day (the latest by default), whatever the age of the entry, and never
+touches the network; a request that was never recorded raises `CacheMiss`.
+This makes it possible to re-run the whole pipeline of any recorded day
+(e.g. while working on a parser) in seconds.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from urllib.parse import urlencode
+
+COMPRESSION_LEVEL = 6
+
+_HEADER_END = b"\n"
+
+
+def request_key(url, params=None):
+    """The canonical text of a GET request, used as the cache key."""
+    if params:
+        items = sorted((str(k), str(v)) for k, v in params.items())
+        url = url + ("&" if "?" in url else "?") + urlencode(items)
+    return url
+
+
+def recorded_runs(directory):
+    """The run days (YYYYMMDD) recorded under `directory`, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(run for run in os.listdir(directory)
+                  if len(run) == 8 and run.isdigit()
+                  and os.path.isdir(os.path.join(directory, run)))
+
+
+class ResponseCache:
+    """
+    Compressed store of HTTP responses, keyed by the hash of the request.
+
+    Args:
+        directory (str): Where the entries are written.
+        ttl (float): Seconds an entry is served before being refetched.
+            None keeps entries forever; 0 only records responses, for
+            replay runs.
+        max_bytes (int): Size limit of the directory; the least recently
+            used entries are evicted beyond it. None disables eviction.
+        replay (bool): Serve every request from the cache, ignoring the
+            TTL, and never use the network.
+        run (str): The run day (YYYYMMDD) whose entries are read and
+            written. Defaults to today, or to the latest recorded day in
+            replay mode.
+    """
+
+    def __init__(self, directory, ttl=None, max_bytes=None, replay=False,
+                 run=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        if run is None and replay:
+            run = (recorded_runs(directory) or [None])[-1]
+        self.run = run or datetime.now().strftime("%Y%m%d")
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, self.run, digest[:2],
+                            digest + ".z")
+
+    def get(self, key):
+        """
+        Returns the cached (url, status, headers, body, encoding) of a
+        request, or None if it is missing or expired (outside replay mode).
+        """
+        if not self.replay and self.ttl == 0:
+            # Recording only: nothing is served outside replay mode
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        header, body = data.split(_HEADER_END, 1)
+        meta = json.loads(header)
+        if not self.replay and self.ttl is not None \
+                and time.time() - meta["fetched"] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Refresh the LRU position
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return (meta["url"], meta["status"], meta["headers"], body,
+                meta["encoding"])
+
+    def put(self, key, url, status, headers, body, encoding):
+        """Stores a response, then evicts entries beyond the size limit."""
+        meta = json.dumps({"url": url, "status": status, "headers": headers,
+                           "encoding": encoding, "fetched": time.time()})
+        data = zlib.compress(meta.encode("utf-8") + _HEADER_END + body,
+                             COMPRESSION_LEVEL)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            if self._size is not None:
+                self._size += len(data) - old_size
+        if self.max_bytes is not None:
+            self.evict()
+
+    def _entries(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".z"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def size(self):
+        """Total size of the cached entries, in bytes."""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def evict(self):
+        """Deletes the least recently used entries beyond `max_bytes`."""
+        if self.max_bytes is None or self.size() <= self.max_bytes:
+            return 0
+        evicted = 0
+        with self._lock:
+            for _, size, path in sorted(self._entries()):
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                evicted += 1
+        return evicted
+
+    def __str__(self):
+        mode = "replay" if self.replay else f"ttl={self.ttl}s"
+        mode = f"{mode}, run {self.run}"
+        return (f"{self.hits} hits, {self.misses} misses, "
+                f"{self.size() / 2 ** 20:.1f} MiB ({mode})")
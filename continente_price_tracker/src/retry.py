@@ -0,0 +1,142 @@
+"""
+Retry policies for the scrapers.
+
+A `RetryPolicy` decides whether a failed call is worth repeating and how
+long to wait first:
+
+- network errors, timeouts, 408, 425, 429 and 5xx responses are retried;
+  any other 4xx (a bad request, a missing page) fails immediately, as do
+  `CacheMiss` in replay runs and `CircuitOpen` from the engine's per-host
+  circuit breaker;
+- the wait grows exponentially from `base_delay`, capped at `max_delay`,
+  with full jitter so that parallel workers do not retry in lockstep;
+- a `Retry-After` header is honoured when it asks for no more than
+  `max_delay`; a longer request gives up instead of hammering the host.
+
+The time a call can spend sleeping is therefore at most
+`retries * max_delay` (see `RetryPolicy.worst_case`). An error that has
+already exhausted a policy is marked, so that an outer retry loop (a
+category wrapping its pages) does not retry it again: nested policies do
+not multiply.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from http_engine import CacheMiss, CircuitOpen, FetchError
+from metrics import metrics
+
+# Statuses worth retrying besides 5xx
+RETRY_STATUSES = {408, 425, 429}
+
+
+def error_status(error):
+    """The HTTP status of a failed request, or None for network errors."""
+    if isinstance(error, FetchError):
+        return error.status
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after(error):
+    """The Retry-After delay of a failed response, in seconds, or None."""
+    if isinstance(error, FetchError):
+        headers = error.headers
+    else:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient request failures.
+
+    Args:
+        retries (int): Retries after the first attempt.
+        base_delay (float): Upper bound of the first wait, in seconds.
+        max_delay (float): Cap of any single wait, including Retry-After.
+        jitter (bool): Wait a random time up to the backoff rather than
+            exactly the backoff.
+
+    Example:
+        >>> policy = RetryPolicy(retries=3, base_delay=2, max_delay=30)
+        >>> policy.call(fetch_page, 0, 216, "bebe", "0.01", "FRESH-Peixaria")
+    """
+
+    def __init__(self, retries=3, base_delay=2.0, max_delay=60.0, jitter=True):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def retryable(self, error):
+        """Whether a failed call may succeed if repeated."""
+        if isinstance(error, (CacheMiss, CircuitOpen)):
+            return False
+        if not isinstance(error, (FetchError, requests.RequestException)):
+            return False
+        if getattr(error, "retries_exhausted", False):
+            return False
+        status = error_status(error)
+        return status is None or status >= 500 or status in RETRY_STATUSES
+
+    def delay(self, attempt, error=None):
+        """
+        The wait before retry number `attempt` (0-based), or None if the
+        server asked for a longer wait than `max_delay`.
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return requested if requested <= self.max_delay else None
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+    def worst_case(self):
+        """Upper bound of the time a call spends waiting, in seconds."""
+        return self.retries * self.max_delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func`, retrying transient failures. The last error is
+        re-raised, marked with `retries_exhausted`, once the retries are
+        used up or the error is not retryable.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self.retryable(e) or attempt >= self.retries:
+                    if attempt:
+                        e.retries_exhausted = True
+                    raise
+                delay = self.delay(attempt, e)
+                if delay is None:
+                    e.retries_exhausted = True
+                    raise
+                attempt += 1
+                print(f"{func.__name__} failed: {e}. "
+                      f"Retry {attempt}/{self.retries} "
+                      f"in {delay:.1f} seconds...")
+                time.sleep(delay)
+                metrics.slept("retry", delay)
+
+
+# A single page: quick retries, the breaker stops a failing host
+PAGE_RETRY = RetryPolicy(retries=3, base_delay=2.0, max_delay=30.0)
+
+# A whole category (after its pages' own retries): resumes the missing pages
+CATEGORY_RETRY = RetryPolicy(retries=2, base_delay=30.0, max_delay=120.0)
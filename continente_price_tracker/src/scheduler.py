@@ -0,0 +1,249 @@
+"""
+A small in-process job DAG for the scrapers.
+
+A `Task` wraps a call; it runs once all the tasks it depends on have
+finished, on a worker pool shared by every retailer. Among the ready tasks
+the one with the highest priority starts first, and at most
+`host_slots[host]` tasks of a host run at the same time, so that one slow
+retailer cannot occupy every worker while the others wait.
+
+A task created with `expands=True` returns new tasks, which are added to
+the graph when it finishes (e.g. the first page of a category, which tells
+how many pages follow). A task whose dependency failed is skipped.
+
+Every task records when it was queued, started and finished;
+`Scheduler.timeline()` returns them for the end-of-run report.
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Task:
+    """
+    One unit of work of the scrape.
+
+    Args:
+        name (str): Unique, readable name, e.g. "continente/bebe/216".
+        func (callable): Called as `func(*args, **kwargs)` on a worker.
+        host (str): The host the task sends requests to, if any.
+        priority (float): Higher runs first among the ready tasks.
+        deps (list): Tasks that must be done before this one starts.
+        expands (bool): `func` returns a list of new tasks to schedule.
+    """
+
+    def __init__(self, name, func, *args, host=None, priority=0, deps=(),
+                 expands=False, **kwargs):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.host = host
+        self.priority = priority
+        self.deps = list(deps)
+        self.expands = expands
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.queued = self.started = self.finished = None
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def __repr__(self):
+        return f"Task({self.name!r}, {self.status})"
+
+
+class Scheduler:
+    """
+    Runs a graph of tasks on a shared thread pool.
+
+    Args:
+        workers (int): Size of the worker pool.
+        host_slots (dict): Maximum number of running tasks per host.
+        logger (logging.Logger): Optional logger for task failures.
+
+    Example:
+        >>> scheduler = Scheduler(workers=8, host_slots={"www.auchan.pt": 4})
+        >>> scheduler.add(Task("auchan/bebe", save_cgid, "bebe",
+        ...                    host="www.auchan.pt", priority=12))
+        >>> scheduler.run()
+        >>> scheduler.write_timeline("logs/timeline.json")
+    """
+
+    def __init__(self, workers=8, host_slots=None, logger=None):
+        self.workers = workers
+        self.host_slots = dict(host_slots or {})
+        self.logger = logger
+        self.tasks = []
+        self._ready = []
+        self._waiting = []
+        self._running = {}
+        self._host_running = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.started = self.finished = None
+
+    def add(self, task):
+        """Adds a task (and returns it); it starts once its deps are done."""
+        with self._lock:
+            task.queued = time.monotonic()
+            self.tasks.append(task)
+            self._waiting.append(task)
+        return task
+
+    def _promote(self):
+        """Moves the tasks whose deps are resolved to the ready queue."""
+        waiting = []
+        for task in self._waiting:
+            if any(dep.status in (FAILED, SKIPPED) for dep in task.deps):
+                task.status = SKIPPED
+                task.started = task.finished = time.monotonic()
+            elif all(dep.status == DONE for dep in task.deps):
+                heapq.heappush(self._ready,
+                               (-task.priority, next(self._counter), task))
+            else:
+                waiting.append(task)
+        self._waiting = waiting
+
+    def _next_task(self):
+        """Pops the highest-priority ready task whose host has a free slot."""
+        blocked = []
+        task = None
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            candidate = entry[2]
+            slots = self.host_slots.get(candidate.host)
+            running = self._host_running.get(candidate.host, 0)
+            if slots is None or running < slots:
+                task = candidate
+                break
+            blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self._ready, entry)
+        return task
+
+    def _execute(self, task):
+        task.started = time.monotonic()
+        try:
+            return task.func(*task.args, **task.kwargs)
+        finally:
+            task.finished = time.monotonic()
+
+    def _submit_ready(self, executor):
+        """Submits ready tasks while workers are free (holding the lock)."""
+        self._promote()
+        while len(self._running) < self.workers:
+            task = self._next_task()
+            if task is None:
+                break
+            task.status = RUNNING
+            self._host_running[task.host] = \
+                self._host_running.get(task.host, 0) + 1
+            self._running[executor.submit(self._execute, task)] = task
+
+    def _complete(self, future):
+        """Records the outcome of a finished task and adds its expansion."""
+        with self._lock:
+            task = self._running.pop(future)
+            self._host_running[task.host] -= 1
+        try:
+            task.result = future.result()
+            task.status = DONE
+        except Exception as e:
+            task.status = FAILED
+            task.error = e
+            if self.logger is not None:
+                self.logger.error(f"Task {task.name} failed: {e}",
+                                  exc_info=True)
+            return
+        if task.expands:
+            for new_task in task.result or []:
+                self.add(new_task)
+
+    def run(self):
+        """Runs every task, including those added while running."""
+        self.started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                with self._lock:
+                    self._submit_ready(executor)
+                    if not self._running:
+                        break
+                    running = list(self._running)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._complete(future)
+        # Tasks left waiting on tasks that were never added
+        for task in self._waiting:
+            task.status = SKIPPED
+        self.finished = time.monotonic()
+
+    def timeline(self):
+        """
+        Returns one record per task: its name, host, status and its queued,
+        started and finished times in seconds since the start of the run.
+        """
+        def offset(t):
+            return None if t is None else round(t - self.started, 3)
+
+        return [{
+            "name": task.name,
+            "host": task.host,
+            "priority": task.priority,
+            "status": task.status,
+            "queued": offset(task.queued),
+            "started": offset(task.started),
+            "finished": offset(task.finished),
+            "duration": (None if task.duration is None
+                         else round(task.duration, 3)),
+            "error": None if task.error is None else str(task.error),
+        } for task in self.tasks]
+
+    def summary(self):
+        """Per-host task counts, busy time and span of the run."""
+        hosts = {}
+        for record in self.timeline():
+            host = hosts.setdefault(record["host"] or "-", {
+                "tasks": 0, "failed": 0, "skipped": 0, "busy": 0.0,
+                "first_start": None, "last_finish": None})
+            host["tasks"] += 1
+            if record["status"] == FAILED:
+                host["failed"] += 1
+            if record["status"] == SKIPPED:
+                host["skipped"] += 1
+            if record["started"] is not None and record["status"] != SKIPPED:
+                host["busy"] += record["duration"] or 0.0
+                if host["first_start"] is None:
+                    host["first_start"] = record["started"]
+                host["first_start"] = min(host["first_start"],
+                                          record["started"])
+                host["last_finish"] = max(host["last_finish"] or 0.0,
+                                          record["finished"])
+        return hosts
+
+    def write_timeline(self, path):
+        """Writes the timeline and summary of the run as JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"makespan": round(self.finished - self.started, 3),
+                       "workers": self.workers,
+                       "hosts": self.summary(),
+                       "tasks": self.timeline()}, f, indent=1)
+        return path
@@ -0,0 +1,178 @@
+"""
+Snapshot storage for the scraped product tables.
+
+Each scraper run writes one snapshot per category under
+`<base_path>/<YYYYMMDD>/`, where `base_path` is the retailer's directory
+(e.g. data/raw/continente), so snapshots are partitioned by retailer and
+day. The supported formats are:
+
+- "parquet": zstd-compressed Parquet with dictionary-encoded columns. The
+  URL, label and category strings repeated on every row are stored once
+  per row group, and price columns are written as float64.
+- "csv": the original plain CSV files.
+
+The default format is "parquet" when pyarrow is installed, and can be
+overridden with the SCRAPER_STORAGE_FORMAT environment variable.
+`read_snapshots` loads either format back, restricted to the columns and
+days asked for.
+"""
+import glob
+import os
+
+import pandas as pd
+
+from metrics import metrics, timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to CSV
+    pq = None
+
+FORMATS = ["csv"] + (["parquet"] if pq is not None else [])
+
+DEFAULT_FORMAT = os.getenv("SCRAPER_STORAGE_FORMAT",
+                           "parquet" if pq is not None else "csv")
+
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+
+PARQUET_COMPRESSION = "zstd"
+PARQUET_COMPRESSION_LEVEL = 9
+
+
+@timed("save")
+def write_snapshot(df, directory, name, float_columns=(), format=None):
+    """
+    Writes one category snapshot.
+
+    Args:
+        df (pd.DataFrame): The scraped products.
+        directory (str): The day partition, e.g. data/raw/auchan/20241125.
+        name (str): The file name without extension (usually the category).
+        float_columns (iterable): Columns stored as float64 (e.g. prices);
+            values that are not numbers are stored as missing.
+        format (str): One of FORMATS. Defaults to DEFAULT_FORMAT.
+
+    Returns:
+        str: The path of the written file.
+    """
+    format = format or DEFAULT_FORMAT
+    if format not in EXTENSIONS:
+        raise ValueError(f"Unknown storage format: {format}")
+
+    df = df.copy()
+    for column in float_columns:
+        if column in df.columns:
+            df[column] = pd.to_numeric(
+                df[column], errors="coerce").astype("float64")
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + EXTENSIONS[format])
+    if format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, path, compression=PARQUET_COMPRESSION,
+                       compression_level=PARQUET_COMPRESSION_LEVEL,
+                       use_dictionary=True)
+    metrics.count("rows", len(df))
+    return path
+
+
+def list_days(base_path):
+    """
+    Lists the day partitions of a retailer directory.
+
+    Args:
+        base_path (str): The retailer directory, e.g. data/raw/continente.
+
+    Returns:
+        list: The YYYYMMDD directory names, sorted.
+    """
+    if not os.path.isdir(base_path):
+        return []
+    return sorted(day for day in os.listdir(base_path)
+                  if len(day) == 8 and day.isdigit()
+                  and os.path.isdir(os.path.join(base_path, day)))
+
+
+def snapshot_files(base_path, days=None, subdirectory=None):
+    """
+    Lists the snapshot files of a retailer, oldest day first.
+
+    When a category was saved in both formats on the same day, the Parquet
+    file is used.
+
+    Args:
+        base_path (str): The retailer directory, e.g. data/raw/continente.
+        days (iterable or tuple): Day names to include, or a (first, last)
+            YYYYMMDD tuple (inclusive; either end may be None). Defaults to
+            every day.
+        subdirectory (str): Lists the files of this directory of each day
+            partition instead, e.g. "observations".
+
+    Returns:
+        list: (day, path) tuples.
+    """
+    selected = list_days(base_path)
+    if isinstance(days, tuple):
+        first, last = days
+        selected = [day for day in selected
+                    if (first is None or day >= first)
+                    and (last is None or day <= last)]
+    elif days is not None:
+        wanted = set(days)
+        selected = [day for day in selected if day in wanted]
+
+    files = []
+    for day in selected:
+        paths = {}
+        for format in ("csv", "parquet"):
+            pattern = os.path.join(base_path, day, subdirectory or "",
+                                   "*" + EXTENSIONS[format])
+            for path in glob.glob(pattern):
+                paths[os.path.splitext(path)[0]] = path
+        files.extend((day, paths[stem]) for stem in sorted(paths))
+    return files
+
+
+def read_snapshot(path, columns=None):
+    """
+    Reads one snapshot file (CSV or Parquet), optionally only `columns`.
+    Columns missing from the file are skipped.
+    """
+    if path.endswith(EXTENSIONS["parquet"]):
+        if columns is not None:
+            available = pq.read_schema(path).names
+            columns = [column for column in columns if column in available]
+        return pq.read_table(path, columns=columns).to_pandas()
+    usecols = None if columns is None else (lambda column: column in columns)
+    return pd.read_csv(path, usecols=usecols)
+
+
+def read_snapshots(base_path, columns=None, days=None):
+    """
+    Loads the snapshots of a retailer into one DataFrame.
+
+    Args:
+        base_path (str): The retailer directory, e.g. data/raw/auchan.
+        columns (list): Columns to load. Defaults to all.
+        days (iterable or tuple): Days to load, see `snapshot_files`.
+
+    Returns:
+        pd.DataFrame: The rows of every selected snapshot, with a `day`
+            column holding the partition name.
+
+    Example:
+        >>> prices = read_snapshots("data/raw/auchan",
+        ...                         columns=["product_id", "product_price"],
+        ...                         days=("20241120", "20241125"))
+    """
+    frames = []
+    for day, path in snapshot_files(base_path, days):
+        frame = read_snapshot(path, columns)
+        frame["day"] = day
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=(columns or []) + ["day"])
+    return pd.concat(frames, ignore_index=True)
@@ -1,25 +1,67 @@
-# Decorator for retrying a function call
 from functools import wraps
-import requests
-import time
+from datetime import datetime
+import os
+import random
+import re
+from retry import RetryPolicy
+
+# Opt-in dumps of raw responses for debugging parsers
+DEBUG_HTML_DIR = os.getenv("SCRAPER_DEBUG_HTML_DIR")
+DEBUG_HTML_SAMPLE_RATE = float(
+    os.getenv("SCRAPER_DEBUG_HTML_SAMPLE_RATE", "0.05"))
+
+
+def dump_debug_html(html_content, name, directory=None, sample_rate=None):
+    """
+    Writes a sample of raw responses to disk for parser debugging.
+
+    Dumps are off unless a directory is given or SCRAPER_DEBUG_HTML_DIR is
+    set, and only a `sample_rate` fraction of responses is written
+    (SCRAPER_DEBUG_HTML_SAMPLE_RATE, 5% by default). Pass the body bytes
+    rather than the decoded text, so that pages that are not dumped are not
+    decoded for nothing.
 
+    Args:
+        html_content (bytes or str): The raw response body.
+        name (str): A short label for the response, used in the filename.
+        directory (str): Where dumps are written. Defaults to DEBUG_HTML_DIR.
+        sample_rate (float): Fraction of calls that write a dump.
+
+    Returns:
+        str: The path of the written file, or None if nothing was written.
+    """
+    directory = directory or DEBUG_HTML_DIR
+    if sample_rate is None:
+        sample_rate = DEBUG_HTML_SAMPLE_RATE
+    if not directory or random.random() >= sample_rate:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    file_path = os.path.join(directory, f"{safe_name}_{timestamp}.html")
+    if isinstance(html_content, str):
+        html_content = html_content.encode("utf-8")
+    with open(file_path, "wb") as f:
+        f.write(html_content)
+    return file_path
+
+
+# Decorator for retrying a function call
+def retry_on_failure(retries=3, delay=60, policy=None):
+    """
+    Retries transient request failures of the decorated function (see
+    `retry.RetryPolicy`). Without a `policy`, up to `retries` retries with
+    waits of at most `delay` seconds.
+    """
+    policy = policy or RetryPolicy(retries=retries, max_delay=delay)
 
-def retry_on_failure(retries=3, delay=60):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            attempts = retries
-            while attempts > 0:
-                try:
-                    return func(*args, **kwargs)
-                except requests.RequestException as e:
-                    attempts -= 1
-                    print(
-                        f"Request failed: {e}. Retrying in {delay} seconds...")
-                    time.sleep(delay)
-            raise Exception(
-                f"Failed to complete {func.__name__} after {retries} retries.")
+            return policy.call(func, *args, **kwargs)
 
+        wrapper.policy = policy
         return wrapper
 
     return decorator